@@ -0,0 +1,22 @@
+"""Учётные данные, общие для тестов и бенчмарков"""
+
+# Участник -> (username, password); anonymous — без заголовка, bad_token — заведомо неверный токен
+PRINCIPALS = {
+    "root": ("root", "root"),
+    "rool1": ("rool1", "qwerty"),
+    "rool2": ("rool2", "qwerty"),
+    "rool3": ("rool3", "qwerty"),
+    "rool4": ("rool4", "qwerty"),
+    "rool5": ("rool5", "qwerty"),
+    "anonymous": None,
+    "bad_token": None,
+}
+BAD_TOKEN = "invalid_token_12345"
+
+# Входы, которые должны быть отклонены
+users_negative = [
+    {"username": "root", "password": "wrongpass"},
+    {"username": "not_exist", "password": "123456"},
+    {"username": "", "password": ""},
+    {"username": "a" * 256, "password": "a" * 256},
+]
@@ -0,0 +1,243 @@
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+import codec
+from records import PageMeta
+
+
+BASE_URL = "https://etirof.cmspace.uz/api"
+
+class ClientStats:
+    """Счётчики клиента за прогон: сетевые запросы и склеенные GET"""
+
+    def __init__(self):
+        self.requests = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def report(self) -> str:
+        return f"Network requests: {self.requests}, coalesced GETs: {self.coalesced}"
+
+
+STATS = ClientStats()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Склейка одинаковых одновременных запросов: в сеть уходит один, результат общий"""
+
+    def __init__(self):
+        self._calls: Dict[tuple, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: tuple, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            STATS.add("coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_inflight = SingleFlight()
+
+
+def _flight_key(url: str, params: Optional[Dict], headers) -> tuple:
+    return (
+        url,
+        tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        (headers or {}).get("Authorization"),
+    )
+
+
+def get(url: str, params: Optional[Dict] = None,
+        headers: Optional[Dict] = None) -> requests.Response:
+    """requests.get со склейкой одинаковых одновременных запросов"""
+    def fetch():
+        STATS.add("requests")
+        return requests.get(url, params=params, headers=headers)
+    return _inflight.do(_flight_key(url, params, headers), fetch)
+
+
+class ApiClient:
+    """Общий клиент e-tirof API для инструментов и тестов"""
+
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None,
+                 base_url: str = BASE_URL, json_codec: Optional[str] = None):
+        self.username = username
+        self.password = password
+        self.base_url = base_url
+        self.token: Optional[str] = None
+        self.role: Optional[str] = None
+        self.codec = codec.get_codec(json_codec)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Content-Type': 'application/json'
+        })
+
+    def login(self) -> str:
+        """Авторизация и установка Bearer токена в сессию"""
+        url = f"{self.base_url}/auth/login"
+        payload = {
+            "username": self.username,
+            "password": self.password
+        }
+
+        response = self.session.post(url, json=payload)
+        assert response.status_code == 200, f"Login failed: {response.text}"
+
+        data = response.json()
+        self.token = data.get('token')
+        self.role = data.get('role')
+        assert self.token, "Token not found in response"
+
+        self.set_token(self.token)
+        return self.token
+
+    def set_token(self, token: str):
+        self.token = token
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}'
+        })
+
+    def enable_http_cache(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        """Дисковый HTTP-кэш для документов (governor_decree, screenshot)"""
+        import httpcache
+        return httpcache.install(self.session, directory, max_bytes, prefix=self.base_url)
+
+    def url(self, endpoint: str) -> str:
+        return f"{self.base_url}{endpoint}"
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        label = codec.endpoint_label(method, url, self.base_url)
+        if kwargs.get("json") is not None:
+            # Тело кодируем сами: выбранный кодек и учёт времени по эндпоинту
+            kwargs["data"] = codec.encode(self.codec, kwargs.pop("json"), label)
+        STATS.add("requests")
+        return codec.wrap(self.session.request(method, url, **kwargs), self.codec, label)
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        url = self.url(endpoint)
+        if method == "GET" and set(kwargs) <= {"params"}:
+            key = _flight_key(url, kwargs.get("params"), self.session.headers)
+            return _inflight.do(key, lambda: self._send(method, url, **kwargs))
+        return self._send(method, url, **kwargs)
+
+    def get(self, endpoint: str, params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """GET; одинаковые одновременные запросы склеиваются в один"""
+        return self.request("GET", endpoint, params=params, **kwargs)
+
+    def post(self, endpoint: str, data: Optional[Dict] = None,
+             files: Optional[Dict] = None) -> requests.Response:
+        if files:
+            # Для multipart/form-data убираем Content-Type заголовок
+            headers = {'Authorization': f'Bearer {self.token}'}
+            STATS.add("requests")
+            url = self.url(endpoint)
+            response = requests.post(url, data=data, files=files, headers=headers)
+            return codec.wrap(response, self.codec, codec.endpoint_label("POST", url, self.base_url))
+        return self.request("POST", endpoint, json=data)
+
+    def patch(self, endpoint: str, data: Dict) -> requests.Response:
+        return self.request("PATCH", endpoint, json=data)
+
+    def put(self, endpoint: str, data: Dict) -> requests.Response:
+        return self.request("PUT", endpoint, json=data)
+
+    def delete(self, endpoint: str) -> requests.Response:
+        return self.request("DELETE", endpoint)
+
+    def request_without_auth(self, method: str, endpoint: str) -> requests.Response:
+        return requests.request(method, self.url(endpoint))
+
+    def iter_pages(self, endpoint: str, params: Optional[Dict] = None,
+                   page_size: int = 100) -> Iterator[List[Dict]]:
+        """Постраничный обход списка (data/meta) до последней страницы"""
+        params = dict(params or {})
+        params["page_size"] = page_size
+        page = params.pop("page", 1)
+        while True:
+            response = self.get(endpoint, params={**params, "page": page})
+            assert response.status_code == 200, f"List {endpoint} failed: {response.text}"
+            body = response.json()
+            items = body.get("data") or []
+            if not items:
+                return
+            yield items
+
+            total_pages = PageMeta.from_dict(body.get("meta") or {}).total_pages
+            if total_pages is not None and page >= total_pages:
+                return
+            page += 1
+
+    def stream_list(self, endpoint: str, params: Optional[Dict] = None, key: str = "data"):
+        """Список с потоковым разбором data[]: элементы по одному, пока тело ещё качается"""
+        from jsonstream import ResponseStream
+        response = self._send("GET", self.url(endpoint), params=params, stream=True)
+        return ResponseStream(response, key)
+
+    def iter_items(self, endpoint: str, params: Optional[Dict] = None,
+                   page_size: int = 100) -> Iterator[Dict]:
+        for items in self.iter_pages(endpoint, params, page_size):
+            yield from items
+
+
+class UserApiClient(ApiClient):
+    """Класс для работы с User Management API"""
+
+    def __init__(self, token: str):
+        super().__init__(base_url=BASE_URL)
+        self.set_token(token)
+
+    def create_user(self, payload: Dict) -> requests.Response:
+        """Создание пользователя"""
+        return self.post("/users", payload)
+
+    def get_user(self, user_id: int) -> requests.Response:
+        """Получение пользователя по ID"""
+        return self.get(f"/users/{user_id}")
+
+    def update_user(self, user_id: int, payload: Dict) -> requests.Response:
+        """Обновление пользователя"""
+        return self.put(f"/users/{user_id}", payload)
+
+    def delete_user(self, user_id: int) -> requests.Response:
+        """Удаление пользователя"""
+        return self.delete(f"/users/{user_id}")
+
+    def toggle_active(self, user_id: int) -> requests.Response:
+        """Переключение статуса active"""
+        return self.request("PATCH", f"/users/{user_id}/toggle-active")
+
+    def list_users(self, params: Optional[Dict] = None) -> requests.Response:
+        """Получение списка пользователей"""
+        return self.get("/users", params=params)
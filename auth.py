@@ -1,19 +1,16 @@
 import pytest
 import requests
 
+from accounts import users_negative
+from authbench import LoginStorm, login_cases
+
 BASE_URL = "https://etirof.cmspace.uz/api"
 
 users_positive = [
     {"username": "root", "password": "root"},  
 ]
 
-users_negative = [
-    {"username": "root", "password": "wrongpass"},     
-    {"username": "not_exist", "password": "123456"},    
-    {"username": "", "password": ""},                  
-    {"username": "a" * 256, "password": "a" * 256},    
-]
-
+@pytest.mark.request_budget(requests=1)
 @pytest.mark.parametrize("user", users_positive)
 def test_login_success(user):
     url = f"{BASE_URL}/auth/login"
@@ -25,6 +22,7 @@ def test_login_success(user):
     print(f" {user['username']} вошёл как {data['role']}")
 
 
+@pytest.mark.request_budget(requests=1)
 @pytest.mark.parametrize("user", users_negative)
 def test_login_fail(user):
     url = f"{BASE_URL}/auth/login"
@@ -35,9 +33,23 @@ def test_login_fail(user):
 
     print(f" Проверка неуспешного входа {user['username']} прошла — код {response.status_code}")
 
+@pytest.mark.request_budget(requests=1)
 def test_login_invalid_json():
     url = f"{BASE_URL}/auth/login"
     response = requests.post(url, data="{invalid_json")
 
     assert response.status_code in [400, 422], f"Ожидали ошибку, но получили {response.status_code}"
     print(" Проверка с невалидным JSON прошла успешно")
+
+
+def test_login_storm_keeps_results():
+    cases = login_cases()
+    storm = LoginStorm(BASE_URL)
+    result = storm.run(cases, per_case=3, workers=16)
+    for name, _ in cases:
+        statuses = storm.statuses[name]
+        if name.startswith("neg:"):
+            assert set(statuses) <= {400, 401, 404, 422}, f"{name} под нагрузкой: {dict(statuses)}"
+        else:
+            assert statuses[200] == 3, f"{name} под нагрузкой: {dict(statuses)}"
+    print(f" {result['calls']} одновременных входов, {result['logins_per_s']:.1f}/s")
@@ -0,0 +1,176 @@
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from accounts import BAD_TOKEN, PRINCIPALS, users_negative
+from apiclient import BASE_URL
+from perfstats import LatencyStats, bar_chart, throughput
+
+
+# Эндпоинт для сравнения стоимости проверки токена: с валидным токеном — 404 без работы с данными
+PROBE_PATH = "/cadastre/999999999"
+# Во сколько раз неуспешный вход существующего пользователя дольше входа несуществующего,
+# чтобы считать, что время входа определяет хэширование пароля
+HASHING_RATIO = 3.0
+
+
+def login_cases() -> List[Tuple[str, Dict]]:
+    """Учётные записи ролей и негативные случаи из accounts.users_negative"""
+    cases = [(name, {"username": creds[0], "password": creds[1]})
+             for name, creds in PRINCIPALS.items() if creds]
+    labels = ("wrong password", "unknown user", "empty", "256 chars")
+    cases += [(f"neg: {label}", user) for label, user in zip(labels, users_negative)]
+    return cases
+
+
+class LoginStorm:
+    """Одновременные входы по всем случаям: пропускная способность, задержки и коды ответов"""
+
+    def __init__(self, base_url: str = BASE_URL):
+        self.url = f"{base_url}/auth/login"
+        self.session = requests.Session()
+        self.latency: Dict[str, LatencyStats] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def _login(self, case: Tuple[str, Dict]):
+        name, creds = case
+        start = time.perf_counter()
+        try:
+            status = self.session.post(self.url, json=creds).status_code
+        except requests.RequestException:
+            # Обрыв соединения под нагрузкой — тоже результат, но без задержки
+            status = "error"
+        else:
+            self.latency[name].add(time.perf_counter() - start)
+        with self._lock:
+            self.statuses[name][status] += 1
+
+    def run(self, cases: List[Tuple[str, Dict]], per_case: int, workers: int) -> Dict:
+        for name, _ in cases:
+            self.latency[name] = LatencyStats(name)
+            self.statuses[name] = Counter()
+        # Случаи перемешаны по кругу, чтобы нагрузка шла на все учётные записи одновременно
+        calls = [case for _ in range(per_case) for case in cases]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(self._login, calls))
+        elapsed = time.perf_counter() - start
+        return {"calls": len(calls), "elapsed": elapsed, "logins_per_s": throughput(len(calls), elapsed)}
+
+    def hashing_ratio(self) -> Optional[float]:
+        """p50 неверного пароля к p50 несуществующего пользователя"""
+        wrong = self.latency.get("neg: wrong password")
+        unknown = self.latency.get("neg: unknown user")
+        if not wrong or not unknown or not wrong.count or not unknown.count:
+            return None
+        base = unknown.summary()["p50"]
+        return wrong.summary()["p50"] / base if base > 0 else None
+
+
+class TokenCost:
+    """Одинаковые GET с валидным, неверным токеном и без токена, вперемешку по раундам.
+
+    Разница «неверный − без токена» — проверка подписи/сессии в middleware,
+    «валидный − неверный» — всё, что после авторизации (поиск пользователя, обработчик).
+    """
+    MODES = ("no token", "invalid token", "valid token")
+
+    def __init__(self, token: str, base_url: str = BASE_URL, path: str = PROBE_PATH):
+        self.url = base_url + path
+        self.session = requests.Session()
+        self.headers = {
+            "no token": {},
+            "invalid token": {"Authorization": f"Bearer {BAD_TOKEN}"},
+            "valid token": {"Authorization": f"Bearer {token}"},
+        }
+        self.latency = {mode: LatencyStats(mode) for mode in self.MODES}
+        self.statuses = {mode: Counter() for mode in self.MODES}
+        self._lock = threading.Lock()
+
+    def _get(self, mode: str):
+        start = time.perf_counter()
+        try:
+            status = self.session.get(self.url, headers=self.headers[mode]).status_code
+        except requests.RequestException:
+            status = "error"
+        else:
+            self.latency[mode].add(time.perf_counter() - start)
+        with self._lock:
+            self.statuses[mode][status] += 1
+
+    def run(self, rounds: int, workers: int = 1):
+        # Прогрев соединения, чтобы TLS-рукопожатие не попало в первую выборку
+        self.session.get(self.url)
+        calls = [mode for _ in range(rounds) for mode in self.MODES]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(self._get, calls))
+
+    def overhead(self) -> Dict[str, float]:
+        p50 = {mode: self.latency[mode].summary().get("p50", 0.0) for mode in self.MODES}
+        return {
+            "middleware": p50["invalid token"] - p50["no token"],
+            "authorized": p50["valid token"] - p50["invalid token"],
+        }
+
+
+def _codes(statuses: Counter) -> str:
+    return ", ".join(f"{code}×{n}" for code, n in sorted(statuses.items(), key=lambda kv: str(kv[0])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login storm and token validation overhead benchmark")
+    parser.add_argument("--per-case", type=int, default=10, help="Входов на каждый случай")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=50, help="Раундов GET на каждый режим токена")
+    parser.add_argument("--get-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    cases = login_cases()
+    storm = LoginStorm()
+    result = storm.run(cases, args.per_case, args.workers)
+    print(f"✓ Login storm: {result['calls']} logins in {result['elapsed']:.2f}s "
+          f"({result['logins_per_s']:.1f}/s, {args.workers} workers)")
+    for name, _ in cases:
+        print(f"  {storm.latency[name].format()} [{_codes(storm.statuses[name])}]")
+    for name, _ in cases:
+        accepted = storm.statuses[name][200]
+        if name.startswith("neg:") and accepted:
+            print(f"⚠ {name}: accepted {accepted}x under load")
+        elif not name.startswith("neg:") and accepted < args.per_case:
+            print(f"⚠ {name}: only {accepted}/{args.per_case} logins succeeded")
+    print("\nLogin p50 (ms):")
+    print(bar_chart([(name, storm.latency[name].summary().get("p50", 0.0) * 1000)
+                     for name, _ in cases], unit="ms"))
+
+    ratio = storm.hashing_ratio()
+    if ratio is not None:
+        verdict = "password hashing dominates login time" if ratio >= HASHING_RATIO \
+            else "password hashing is not the main login cost"
+        print(f"\n  wrong password / unknown user p50: {ratio:.1f}x — {verdict}")
+
+    response = requests.post(f"{BASE_URL}/auth/login", json=cases[0][1])
+    if response.status_code != 200:
+        raise SystemExit(f"Login as {cases[0][0]} failed: {response.status_code}")
+    cost = TokenCost(response.json()["token"])
+    cost.run(args.rounds, args.get_workers)
+    print(f"\n✓ Token validation on GET {PROBE_PATH} ({args.rounds} rounds):")
+    for mode in TokenCost.MODES:
+        print(f"  {cost.latency[mode].format()} [{_codes(cost.statuses[mode])}]")
+    overhead = cost.overhead()
+    print(f"  middleware (invalid − none): {overhead['middleware'] * 1000:+.1f}ms, "
+          f"after auth (valid − invalid): {overhead['authorized'] * 1000:+.1f}ms")
+    # Сравнение с полной задержкой отказа по неверному токену, а не с разностью p50 (она бывает ≈0 или <0)
+    login_p50 = storm.latency[cases[0][0]].summary().get("p50")
+    check_p50 = cost.latency["invalid token"].summary().get("p50")
+    if login_p50 and check_p50:
+        print(f"  login p50 is {login_p50 / check_p50:.1f}x a rejected-token request")
+
+
+if __name__ == "__main__":
+    main()
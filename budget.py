@@ -0,0 +1,303 @@
+"""Учёт HTTP-запросов по тестам и фикстурам: бюджеты и отчёт о повторах.
+
+Подключается из conftest.py (pytest_plugins). Все запросы набора проходят через
+requests.Session.send (и requests.get/post, и клиенты apiclient), поэтому перехват
+там видит каждый запрос, в том числе из потоков, запущенных тестом.
+
+    @pytest.mark.request_budget(requests=3, bytes=200_000, seconds=2.0)
+    def test_something(...): ...
+
+Бюджет проверяется по запросам фазы call; запросы фикстур учитываются отдельно,
+под именем фикстуры. --request-budget=N задаёт лимит запросов для тестов без маркера.
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import pytest
+import requests
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Модули обвязки: место вызова ищется выше них по стеку
+INFRA = {os.path.join(ROOT, name) for name in ("budget.py", "apiclient.py", "codec.py", "httpcache.py",
+                                                "jsonstream.py")}
+LIMITS = ("requests", "bytes", "seconds")
+
+
+def request_key(request: requests.PreparedRequest) -> Tuple[str, str, str, str]:
+    """Одинаковые запросы: метод, URL с упорядоченным query, тело и токен (разные роли — разные запросы)"""
+    parts = urlsplit(request.url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha1(body).hexdigest()[:12] if isinstance(body, bytes) and body else ""
+    auth = request.headers.get("Authorization", "")
+    principal = hashlib.sha1(auth.encode()).hexdigest()[:8] if auth else ""
+    return request.method, url, digest, principal
+
+
+def call_site() -> str:
+    """Первый кадр кода набора выше библиотек и обвязки: «thirdrole.py:25 _get_first_cadastre»"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(ROOT + os.sep) and filename not in INFRA:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _size(request: requests.PreparedRequest, response: requests.Response, stream: bool) -> int:
+    body = request.body or b""
+    sent = len(body) if isinstance(body, (bytes, str)) else 0
+    if stream:
+        # Тело потокового ответа ещё не прочитано — только объявленная длина
+        received = int(response.headers.get("Content-Length") or 0)
+    else:
+        received = len(response.content or b"")
+    return sent + received
+
+
+@dataclass
+class Usage:
+    """Расход одного владельца (фаза теста или фикстура)"""
+    owner: str
+    requests: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    calls: Counter = field(default_factory=Counter)
+    sites: Dict[tuple, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def add(self, key: tuple, site: str, size: int, seconds: float):
+        self.requests += 1
+        self.bytes += size
+        self.seconds += seconds
+        self.calls[key] += 1
+        self.sites[key][site] += 1
+
+
+class RequestLedger:
+    """Учёт запросов по текущему владельцу; владелец общий для всех потоков процесса"""
+
+    def __init__(self):
+        self.usage: Dict[str, Usage] = {}
+        self._owners: List[str] = []
+        self._lock = threading.Lock()
+        self._send = None
+
+    @property
+    def owner(self) -> str:
+        return self._owners[-1] if self._owners else "session"
+
+    def push(self, owner: str):
+        self._owners.append(owner)
+
+    def pop(self):
+        self._owners.pop()
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response,
+               seconds: float, stream: bool, site: str):
+        key = request_key(request)
+        size = _size(request, response, stream)
+        with self._lock:
+            owner = self.owner
+            if owner not in self.usage:
+                self.usage[owner] = Usage(owner)
+            self.usage[owner].add(key, site, size, seconds)
+
+    def install(self):
+        """Обёртка requests.Session.send на время прогона"""
+        ledger, send = self, requests.Session.send
+        self._send = send
+
+        def counted_send(session, request, **kwargs):
+            site = call_site()
+            start = time.perf_counter()
+            response = send(session, request, **kwargs)
+            ledger.record(request, response, time.perf_counter() - start, kwargs.get("stream", False), site)
+            return response
+
+        requests.Session.send = counted_send
+
+    def uninstall(self):
+        if self._send is not None:
+            requests.Session.send = self._send
+            self._send = None
+
+    def get(self, owner: str) -> Usage:
+        with self._lock:
+            return self.usage.get(owner) or Usage(owner)
+
+    def duplicates_within(self) -> List[Tuple[str, tuple, int, Counter]]:
+        """Повторы одного запроса внутри владельца: (владелец, ключ, раз, места вызова)"""
+        found = [(usage.owner, key, count, usage.sites[key])
+                 for usage in self.usage.values() for key, count in usage.calls.items() if count > 1]
+        return sorted(found, key=lambda row: -row[2])
+
+    def duplicates_across(self) -> List[Tuple[tuple, List[str], int, Counter]]:
+        """Один и тот же GET в нескольких владельцах: (ключ, владельцы, всего раз, места вызова)"""
+        owners: Dict[tuple, List[str]] = defaultdict(list)
+        totals: Counter = Counter()
+        sites: Dict[tuple, Counter] = defaultdict(Counter)
+        for usage in self.usage.values():
+            for key, count in usage.calls.items():
+                if key[0] != "GET":
+                    continue
+                owners[key].append(usage.owner)
+                totals[key] += count
+                sites[key].update(usage.sites[key])
+        found = [(key, names, totals[key], sites[key]) for key, names in owners.items() if len(names) > 1]
+        return sorted(found, key=lambda row: -row[2])
+
+    def totals(self) -> Usage:
+        total = Usage("total")
+        for usage in self.usage.values():
+            total.requests += usage.requests
+            total.bytes += usage.bytes
+            total.seconds += usage.seconds
+        return total
+
+
+def _describe(key: tuple) -> str:
+    method, url, digest, principal = key
+    path = urlsplit(url)
+    text = f"{method} {path.path}" + (f"?{path.query}" if path.query else "")
+    if digest:
+        text += f" body#{digest}"
+    if principal:
+        text += f" token#{principal}"
+    return text
+
+
+def _sites(sites: Counter) -> str:
+    return ", ".join(f"{site} ×{count}" for site, count in sites.most_common(3))
+
+
+def over_budget(usage: Usage, budget: Dict[str, float]) -> List[str]:
+    exceeded = []
+    for name in LIMITS:
+        limit = budget.get(name)
+        spent = getattr(usage, name)
+        if limit is not None and spent > limit:
+            exceeded.append(f"{name} {spent:.3g} > {limit:g}" if name == "seconds" else f"{name} {spent} > {limit}")
+    return exceeded
+
+
+LEDGER = pytest.StashKey[RequestLedger]()
+
+
+def _ledger(config) -> Optional[RequestLedger]:
+    return config.stash.get(LEDGER, None)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("request budget")
+    group.addoption("--request-budget", type=int, default=None,
+                    help="Лимит HTTP-запросов на тест без маркера request_budget")
+    group.addoption("--budget-report", type=int, default=10,
+                    help="Сколько строк показывать в разделах отчёта о запросах (0 — без отчёта)")
+    group.addoption("--no-request-ledger", action="store_true",
+                    help="Не перехватывать requests (без учёта и бюджетов)")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "request_budget(requests=None, bytes=None, seconds=None): "
+                                       "лимиты HTTP-запросов для фазы call теста")
+    if config.getoption("--no-request-ledger"):
+        return
+    ledger = RequestLedger()
+    ledger.install()
+    config.stash[LEDGER] = ledger
+
+
+def pytest_unconfigure(config):
+    ledger = config.stash.get(LEDGER, None)
+    if ledger is not None:
+        ledger.uninstall()
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    ledger = _ledger(request.config)
+    if ledger is None:
+        return (yield)
+    ledger.push(f"fixture {fixturedef.argname} ({fixturedef.scope})")
+    try:
+        return (yield)
+    finally:
+        ledger.pop()
+
+
+def _phase(item, when: str):
+    ledger = _ledger(item.config)
+    if ledger is None:
+        return (yield)
+    ledger.push(item.nodeid if when == "call" else f"{item.nodeid} [{when}]")
+    try:
+        return (yield)
+    finally:
+        ledger.pop()
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_setup(item):
+    return (yield from _phase(item, "setup"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    return (yield from _phase(item, "teardown"))
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    ledger = _ledger(item.config)
+    result = yield from _phase(item, "call")
+    if ledger is None:
+        return result
+    marker = item.get_closest_marker("request_budget")
+    budget = dict(marker.kwargs) if marker else {}
+    if not marker and item.config.getoption("--request-budget") is not None:
+        budget["requests"] = item.config.getoption("--request-budget")
+    exceeded = over_budget(ledger.get(item.nodeid), budget)
+    if exceeded:
+        pytest.fail("Request budget exceeded: " + ", ".join(exceeded), pytrace=False)
+    return result
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    ledger = _ledger(config)
+    limit = config.getoption("--budget-report")
+    if ledger is None or not limit or not ledger.usage:
+        return
+    write = terminalreporter.write_line
+    terminalreporter.write_sep("-", "HTTP request budget")
+    total = ledger.totals()
+    write(f"Total: {total.requests} requests, {total.bytes / 1024:.1f} KiB, {total.seconds:.2f}s network")
+
+    write("Most expensive tests and fixtures:")
+    for usage in sorted(ledger.usage.values(), key=lambda u: -u.requests)[:limit]:
+        write(f"  {usage.requests:5d} req {usage.bytes / 1024:8.1f} KiB {usage.seconds:7.2f}s  {usage.owner}")
+
+    within = ledger.duplicates_within()
+    if within:
+        wasted = sum(count - 1 for _, _, count, _ in within)
+        write(f"⚠ Repeated within one test/fixture ({wasted} redundant requests):")
+        for owner, key, count, sites in within[:limit]:
+            write(f"  {count}x {_describe(key)} in {owner} — {_sites(sites)}")
+
+    across = ledger.duplicates_across()
+    if across:
+        wasted = sum(count - 1 for _, _, count, _ in across)
+        write(f"⚠ Same GET across tests/fixtures ({wasted} redundant requests):")
+        for key, owners, count, sites in across[:limit]:
+            write(f"  {count}x in {len(owners)} owners {_describe(key)} — {_sites(sites)}")
@@ -0,0 +1,136 @@
+import argparse
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from apiclient import ApiClient
+from records import UserRecord, iter_records
+
+
+# Префиксы username, которые создают тесты и пул пользователей
+TEST_PREFIXES = ("testuser_", "role_", "inactive_", "pool_")
+# Моложе этого возраста не трогаем: пользователь может принадлежать идущему прогону
+ORPHAN_MIN_AGE = 3600.0
+WORKERS = 8
+
+
+class CleanupQueue:
+    """Очередь отложенных DELETE: удаления уходят в фоновый пул, тест не ждёт ответа.
+
+    drain() дожидается всех удалений (конец сессии) и возвращает неудачные.
+    Удаление уже отсутствующей сущности (404) считается успешным.
+    """
+
+    def __init__(self, client: ApiClient, workers: int = WORKERS):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cleanup")
+        self.pending: List[Tuple[str, Future]] = []
+        self.deleted = 0
+        self.failed: List[Tuple[str, object]] = []
+        self._lock = threading.Lock()
+
+    def defer(self, endpoint: str):
+        future = self.executor.submit(self.client.delete, endpoint)
+        with self._lock:
+            self.pending.append((endpoint, future))
+
+    def delete_user(self, user_id: int):
+        self.defer(f"/users/{user_id}")
+
+    def drain(self) -> List[Tuple[str, object]]:
+        with self._lock:
+            pending, self.pending = self.pending, []
+        for endpoint, future in pending:
+            try:
+                status = future.result().status_code
+            except Exception as error:
+                status = error
+            with self._lock:
+                if status in (200, 204, 404):
+                    self.deleted += 1
+                else:
+                    self.failed.append((endpoint, status))
+        return list(self.failed)
+
+    def close(self) -> List[Tuple[str, object]]:
+        failed = self.drain()
+        self.executor.shutdown(wait=True)
+        return failed
+
+    def report(self) -> str:
+        return f"Cleanup: {self.deleted} deleted, {len(self.failed)} failed"
+
+
+def _age(record: UserRecord, now: datetime) -> Optional[float]:
+    if not isinstance(record.created_at, str):
+        return None
+    try:
+        created = datetime.fromisoformat(record.created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return (now - created).total_seconds()
+
+
+def find_orphans(client: ApiClient, prefixes: Iterable[str] = TEST_PREFIXES,
+                 min_age: float = ORPHAN_MIN_AGE, page_size: int = 100) -> List[UserRecord]:
+    """Пользователи с тестовыми префиксами старше min_age.
+
+    Без разборчивой даты создания возраст неизвестен — такой пользователь может
+    принадлежать идущему прогону, поэтому он пропускается.
+    """
+    prefixes = tuple(prefixes)
+    now = datetime.now(timezone.utc)
+    orphans = []
+    for record in iter_records(client.iter_items("/users", page_size=page_size), UserRecord):
+        if not isinstance(record.username, str) or not record.username.startswith(prefixes):
+            continue
+        age = _age(record, now)
+        if age is not None and age >= min_age:
+            orphans.append(record)
+    return orphans
+
+
+def sweep(client: ApiClient, prefixes: Iterable[str] = TEST_PREFIXES, min_age: float = ORPHAN_MIN_AGE,
+          workers: int = WORKERS, dry_run: bool = False) -> dict:
+    """Поиск и параллельное удаление брошенных тестовых пользователей"""
+    start = time.perf_counter()
+    orphans = find_orphans(client, prefixes, min_age)
+    summary = {"found": len(orphans), "deleted": 0, "failed": 0}
+    if not dry_run and orphans:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(client.delete, f"/users/{record.id}") for record in orphans]
+            for future in as_completed(futures):
+                try:
+                    ok = future.result().status_code in (200, 204, 404)
+                except Exception:
+                    ok = False
+                summary["deleted" if ok else "failed"] += 1
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete test users left behind by failed runs")
+    parser.add_argument("--prefix", action="append", help="По умолчанию " + ", ".join(TEST_PREFIXES))
+    parser.add_argument("--min-age", type=float, default=ORPHAN_MIN_AGE,
+                        help="Минимальный возраст пользователя в секундах")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--username", default="root")
+    parser.add_argument("--password", default="root")
+    args = parser.parse_args()
+
+    client = ApiClient(args.username, args.password)
+    client.login()
+    summary = sweep(client, args.prefix or TEST_PREFIXES, args.min_age, args.workers, args.dry_run)
+
+    print(f"✓ Sweep finished in {summary['elapsed']:.2f}s")
+    print(f"  Orphans: {summary['found']}, deleted: {summary['deleted']}, failed: {summary['failed']}")
+
+
+if __name__ == "__main__":
+    main()
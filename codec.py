@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
+
+class JsonCodec:
+    """Кодек JSON: dumps -> bytes, loads из bytes/str"""
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, allow_nan=False).encode()
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data) -> Any:
+        return orjson.loads(data)
+
+
+CODECS: Dict[str, Callable[[], JsonCodec]] = {"json": JsonCodec}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Кодек по имени; по умолчанию из ETIROF_JSON_CODEC, иначе stdlib json"""
+    name = name or os.environ.get("ETIROF_JSON_CODEC", "json")
+    if name not in CODECS:
+        raise ValueError(f"JSON codec {name!r} is not available (installed: {', '.join(CODECS)})")
+    return CODECS[name]()
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(method: str, url: str, base_url: str = "") -> str:
+    path = url[len(base_url):] if base_url and url.startswith(base_url) else url
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])}"
+
+
+class CodecStats:
+    """Время и объём кодирования/декодирования JSON по эндпоинтам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+
+    def record(self, kind: str, endpoint: str, size: int, seconds: float):
+        with self._lock:
+            entry = self.entries[(kind, endpoint)]
+            entry[0] += 1
+            entry[1] += size
+            entry[2] += seconds
+
+    def total(self, kind: str) -> float:
+        return sum(e[2] for (k, _), e in self.entries.items() if k == kind)
+
+    def report(self, top: int = 10) -> str:
+        if not self.entries:
+            return "JSON: nothing encoded or decoded"
+        lines = [f"JSON ({get_codec().name}): decode {self.total('decode') * 1000:.0f}ms, "
+                 f"encode {self.total('encode') * 1000:.0f}ms"]
+        ranked = sorted(self.entries.items(), key=lambda kv: kv[1][2], reverse=True)
+        for (kind, endpoint), (count, size, seconds) in ranked[:top]:
+            lines.append(f"  {kind:<6} {endpoint}: {count}x, {size / 1024:.0f} KB, "
+                         f"{seconds * 1000:.1f}ms ({size / 1e6 / seconds if seconds else 0:.0f} MB/s)")
+        return "\n".join(lines)
+
+
+STATS = CodecStats()
+
+
+class ApiResponse(requests.Response):
+    """requests.Response, у которого json() идёт через выбранный кодек с учётом времени"""
+    codec: JsonCodec = JsonCodec()
+    endpoint: str = ""
+
+    def json(self, **kwargs) -> Any:
+        if kwargs:
+            return super().json(**kwargs)
+        content = self.content
+        start = time.perf_counter()
+        try:
+            return self.codec.loads(content)
+        finally:
+            STATS.record("decode", self.endpoint, len(content), time.perf_counter() - start)
+
+
+def wrap(response: requests.Response, codec: JsonCodec, endpoint: str) -> requests.Response:
+    """Подменить класс ответа на ApiResponse (тот же объект, без копирования тела)"""
+    response.__class__ = ApiResponse
+    response.codec = codec
+    response.endpoint = endpoint
+    return response
+
+
+def encode(codec: JsonCodec, obj: Any, endpoint: str) -> bytes:
+    start = time.perf_counter()
+    data = codec.dumps(obj)
+    STATS.record("encode", endpoint, len(data), time.perf_counter() - start)
+    return data
+
+
+def capture(client, endpoint: str, directory: str, pages: int = 3,
+            page_size: int = 100) -> List[str]:
+    """Сохранить сырые тела страниц списка для bench"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for page in range(1, pages + 1):
+        response = client.get(endpoint, params={"page": page, "page_size": page_size})
+        assert response.status_code == 200, f"List {endpoint} failed: {response.text}"
+        path = os.path.join(directory, f"{endpoint.strip('/').replace('/', '_')}_{page_size}_{page}.json")
+        with open(path, "wb") as f:
+            f.write(response.content)
+        paths.append(path)
+    return paths
+
+
+def bench(paths: List[str], repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """Лучшее время decode/encode всех тел каждым доступным кодеком"""
+    bodies = []
+    for path in paths:
+        with open(path, "rb") as f:
+            bodies.append(f.read())
+    results = {}
+    for name in CODECS:
+        codec = get_codec(name)
+        decode_s = encode_s = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            objects = [codec.loads(body) for body in bodies]
+            decode_s = min(decode_s, time.perf_counter() - start)
+            start = time.perf_counter()
+            for obj in objects:
+                codec.dumps(obj)
+            encode_s = min(encode_s, time.perf_counter() - start)
+        results[name] = {"decode_s": decode_s, "encode_s": encode_s,
+                         "bytes": sum(len(b) for b in bodies)}
+    return results
+
+
+def main():
+    from apiclient import ApiClient
+    from perfstats import bar_chart
+
+    parser = argparse.ArgumentParser(description="Capture API responses and benchmark JSON codecs")
+    parser.add_argument("directory")
+    parser.add_argument("--capture", action="store_true", help="Сначала сохранить страницы из API")
+    parser.add_argument("--endpoint", default="/cadastre")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+
+    if args.capture:
+        client = ApiClient(args.username, args.password)
+        client.login()
+        paths = capture(client, args.endpoint, args.directory, args.pages, args.page_size)
+        print(f"✓ Captured {len(paths)} pages into {args.directory}")
+    paths = sorted(os.path.join(args.directory, name) for name in os.listdir(args.directory)
+                   if name.endswith(".json"))
+    if not paths:
+        raise SystemExit(f"No captured .json bodies in {args.directory}")
+
+    results = bench(paths, args.repeat)
+    size_mb = next(iter(results.values()))["bytes"] / 1e6
+    print(f"✓ {len(paths)} bodies, {size_mb:.1f} MB, backends: {', '.join(results)}")
+    print("\nDecode (ms):")
+    print(bar_chart([(name, r["decode_s"] * 1000) for name, r in results.items()], unit="ms"))
+    print("\nEncode (ms):")
+    print(bar_chart([(name, r["encode_s"] * 1000) for name, r in results.items()], unit="ms"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apiclient import ApiClient
+from records import CadastreRecord, Record, UserRecord, iter_records
+
+
+# Начальная ёмкость колонок; при заполнении удваивается
+INITIAL_CAPACITY = 1024
+
+
+class Categorical:
+    """Колонка со словарным кодированием: коды int32 + список значений (None — код -1)"""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.values: List = []
+        self._index: Dict = {}
+
+    def encode(self, values: Sequence) -> np.ndarray:
+        index = self._index
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+    def code(self, value) -> int:
+        """Код значения; -2, если значения в колонке нет (ничему не равен)"""
+        if value is None:
+            return -1
+        return self._index.get(value, -2)
+
+    def decode(self, codes: np.ndarray) -> List:
+        return [self.values[c] if c >= 0 else None for c in codes]
+
+
+class ColumnTable:
+    """Колоночная таблица записей списка: NumPy-массивы вместо списка dict.
+
+    Числовые поля — float64 (NaN для пустых), int64 для ID, флаги — bool;
+    категориальные поля хранятся кодами int32 со словарём значений.
+    Заполняется страницами (append), фильтр возвращает булеву маску,
+    group_by считает агрегаты через np.bincount по составному коду.
+    """
+    RECORD = CadastreRecord
+    IDS = "id"
+    NUMERIC: Tuple[str, ...] = ("move_distance",)
+    CATEGORICAL: Tuple[str, ...] = ("status", "region_soato", "district_soato")
+    # Флаг -> поле записи, непустота которого проверяется
+    FLAGS: Dict[str, str] = {
+        "has_screenshot": "screenshot",
+        "has_decree": "governor_decree",
+        "has_fixed": "fixed_geojson",
+    }
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self.capacity = capacity
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.numeric = {name: np.empty(capacity, dtype=np.float64) for name in self.NUMERIC}
+        self.flags = {name: np.empty(capacity, dtype=bool) for name in self.FLAGS}
+        self.categorical = {name: Categorical(capacity) for name in self.CATEGORICAL}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            return grown
+
+        self.ids = grow(self.ids)
+        self.numeric = {name: grow(array) for name, array in self.numeric.items()}
+        self.flags = {name: grow(array) for name, array in self.flags.items()}
+        for column in self.categorical.values():
+            column.codes = grow(column.codes)
+        self.capacity = capacity
+
+    def append(self, items: Iterable[Dict]):
+        """Добавление страницы сырых записей API"""
+        records: List[Record] = list(iter_records(items, self.RECORD))
+        count = len(records)
+        if not count:
+            return
+        self._reserve(count)
+        start, end = self.size, self.size + count
+
+        self.ids[start:end] = [-1 if r.id is None else r.id for r in records]
+        for name, array in self.numeric.items():
+            array[start:end] = [_number(getattr(r, name)) for r in records]
+        for name, field in self.FLAGS.items():
+            self.flags[name][start:end] = [bool(getattr(r, field)) for r in records]
+        for name, column in self.categorical.items():
+            column.codes[start:end] = column.encode([getattr(r, name) for r in records])
+        self.size = end
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[List[Dict]]) -> "ColumnTable":
+        table = cls()
+        for items in pages:
+            table.append(items)
+        return table
+
+    def column(self, name: str) -> np.ndarray:
+        """Массив колонки длиной len(table); для категориальных — коды"""
+        if name == self.IDS:
+            return self.ids[:self.size]
+        if name in self.numeric:
+            return self.numeric[name][:self.size]
+        if name in self.flags:
+            return self.flags[name][:self.size]
+        if name in self.categorical:
+            return self.categorical[name].codes[:self.size]
+        raise KeyError(f"Unknown column {name!r}")
+
+    def mask(self, **conditions) -> np.ndarray:
+        """Булева маска: status="approved", region_soato=("1726", "1703"), has_decree=True"""
+        result = np.ones(self.size, dtype=bool)
+        for name, expected in conditions.items():
+            values = self.column(name)
+            if name in self.categorical:
+                column = self.categorical[name]
+                if isinstance(expected, (list, tuple, set, frozenset)):
+                    result &= np.isin(values, [column.code(v) for v in expected])
+                else:
+                    result &= values == column.code(expected)
+            elif isinstance(expected, (list, tuple, set, frozenset)):
+                result &= np.isin(values, list(expected))
+            else:
+                result &= values == expected
+        return result
+
+    def select(self, mask: Optional[np.ndarray] = None, **conditions) -> np.ndarray:
+        """ID записей, прошедших фильтр"""
+        if mask is None:
+            mask = self.mask(**conditions)
+        return self.column(self.IDS)[mask]
+
+    def group_by(self, *keys: str, value: Optional[str] = None,
+                 mask: Optional[np.ndarray] = None) -> Dict[tuple, Dict[str, float]]:
+        """Группировка по категориальным колонкам: count, а для value — sum и mean (без NaN)"""
+        if not keys:
+            raise ValueError("group_by needs at least one key")
+        columns = [self.categorical[key] for key in keys]
+        # Код -1 (пусто) сдвигаем в 0, чтобы None был отдельной группой
+        codes = [column.codes[:self.size] + 1 for column in columns]
+        shape = tuple(len(column.values) + 1 for column in columns)
+        combined = np.ravel_multi_index(codes, shape) if len(codes) > 1 else codes[0]
+        weights = None
+        if mask is not None:
+            combined = combined[mask]
+
+        size = int(np.prod(shape))
+        counts = np.bincount(combined, minlength=size)
+        if value is not None:
+            values = self.column(value)
+            if mask is not None:
+                values = values[mask]
+            present = ~np.isnan(values) if values.dtype.kind == "f" else np.ones(len(values), dtype=bool)
+            weights = np.bincount(combined[present], weights=values[present].astype(np.float64), minlength=size)
+            filled = np.bincount(combined[present], minlength=size)
+
+        result = {}
+        for flat in np.flatnonzero(counts):
+            index = np.unravel_index(flat, shape) if len(shape) > 1 else (flat,)
+            group = tuple(column.values[i - 1] if i else None for column, i in zip(columns, index))
+            row = {"count": int(counts[flat])}
+            if weights is not None:
+                row["sum"] = float(weights[flat])
+                row["mean"] = float(weights[flat] / filled[flat]) if filled[flat] else float("nan")
+            result[group] = row
+        return result
+
+    def nbytes(self) -> int:
+        """Память колонок и словарей категорий (без запаса ёмкости)"""
+        total = self.size * (self.ids.itemsize
+                             + sum(a.itemsize for a in self.numeric.values())
+                             + sum(a.itemsize for a in self.flags.values())
+                             + 4 * len(self.categorical))
+        for column in self.categorical.values():
+            total += sum(sys.getsizeof(v) for v in column.values)
+        return total
+
+
+class UserTable(ColumnTable):
+    RECORD = UserRecord
+    NUMERIC = ()
+    CATEGORICAL = ("role",)
+    FLAGS = {"active": "active"}
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or value is None:
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def deep_size(value) -> int:
+    """Оценка памяти вложенных dict/list (sys.getsizeof рекурсивно)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k) + deep_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_size(v) for v in value)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a list endpoint into a columnar table and aggregate it")
+    parser.add_argument("--endpoint", choices=("cadastre", "users"), default="cadastre")
+    parser.add_argument("--status")
+    parser.add_argument("--region-soato")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--by", action="append", help="Ключ группировки (по умолчанию status, region_soato)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Держать также список dict и сравнить память")
+    parser.add_argument("--username", help="По умолчанию root для users, rool4 для cadastre")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+    default_user = ("root", "root") if args.endpoint == "users" else ("rool4", "qwerty")
+    username = args.username or default_user[0]
+    password = args.password or (default_user[1] if not args.username else None)
+    if password is None:
+        parser.error("--password is required with --username")
+
+    cls = UserTable if args.endpoint == "users" else ColumnTable
+    keys = args.by or (["role"] if args.endpoint == "users" else ["status", "region_soato"])
+    params = {k: v for k, v in (("status", args.status), ("region_soato", args.region_soato)) if v}
+
+    client = ApiClient(username, password)
+    client.login()
+    table, raw = cls(), []
+    start = time.perf_counter()
+    for items in client.iter_pages(f"/{args.endpoint}", params, args.page_size):
+        table.append(items)
+        if args.compare:
+            raw.extend(items)
+    crawl = time.perf_counter() - start
+
+    start = time.perf_counter()
+    groups = table.group_by(*keys, value="move_distance" if "move_distance" in table.numeric else None)
+    aggregate = time.perf_counter() - start
+
+    print(f"✓ {len(table)} records in {crawl:.2f}s; group_by({', '.join(keys)}) in {aggregate * 1000:.2f}ms")
+    for group, row in sorted(groups.items(), key=lambda kv: -kv[1]["count"]):
+        extra = f", mean move_distance {row['mean']:.2f}" if "mean" in row and row["mean"] == row["mean"] else ""
+        print(f"  {' / '.join(str(g) for g in group)}: {row['count']}{extra}")
+    print(f"  Columnar memory: {table.nbytes() / 1024:.1f} KB")
+    if args.compare:
+        dict_bytes = deep_size(raw)
+        print(f"  List of dicts: {dict_bytes / 1024:.1f} KB ({table.nbytes() / max(dict_bytes, 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
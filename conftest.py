@@ -0,0 +1,23 @@
+import pytest
+
+import apiclient
+import codec
+from snapquery import Finder
+
+# Учёт HTTP-запросов по тестам, бюджеты request_budget и отчёт о повторах
+pytest_plugins = ["budget"]
+
+
+@pytest.fixture(scope="session")
+def cadastre_finder():
+    """Выбор тестовых записей по локальному снимку (snapshot.py), без снимка — обходом API"""
+    finder = Finder.open()
+    yield finder
+    finder.close()
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Отчёт клиента API в конце прогона"""
+    terminalreporter.write_sep("-", "API client report")
+    for line in apiclient.STATS.report().splitlines() + codec.STATS.report().splitlines():
+        terminalreporter.write_line(line)
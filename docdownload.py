@@ -0,0 +1,220 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import requests
+
+from apiclient import ApiClient
+
+
+DOCUMENTS = ("governor_decree", "screenshot")
+CHUNK_SIZE = 64 * 1024
+MIN_PART_SIZE = 256 * 1024
+
+
+@dataclass
+class RangeProbe:
+    url: str
+    status_code: int
+    accept_ranges: Optional[str]
+    content_length: Optional[int]
+    honors_ranges: bool
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    size: int
+    elapsed: float
+    parts: int
+    data: Optional[bytearray] = None
+    path: Optional[str] = None
+
+
+def document_url(client: ApiClient, item_id: int, document: str) -> str:
+    """URL документа кадастра: governor_decree или screenshot"""
+    if document not in DOCUMENTS:
+        raise ValueError(f"Unknown document: {document}")
+    return client.url(f"/cadastre/{item_id}/{document}")
+
+
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    # "bytes 0-0/12345" -> (0, 12345)
+    if not value or not value.startswith("bytes "):
+        return None, None
+    span, _, total = value[6:].partition("/")
+    start = span.partition("-")[0]
+    return (int(start) if start.isdigit() else None,
+            int(total) if total.isdigit() else None)
+
+
+def probe_ranges(session: requests.Session, url: str) -> RangeProbe:
+    """Проверка поддержки Range: Accept-Ranges/Content-Length и реальный ответ на bytes=0-0"""
+    headers = {"Range": "bytes=0-0", "Accept-Encoding": "identity"}
+    with session.get(url, headers=headers, stream=True) as response:
+        accept_ranges = response.headers.get("Accept-Ranges")
+        content_length = response.headers.get("Content-Length")
+        length = int(content_length) if content_length and content_length.isdigit() else None
+
+        honors = False
+        if response.status_code == 206:
+            start, total = _parse_content_range(response.headers.get("Content-Range"))
+            honors = start == 0 and total is not None
+            length = total
+        return RangeProbe(url, response.status_code, accept_ranges, length, honors)
+
+
+def _read_into(response: requests.Response, view: memoryview) -> int:
+    received = 0
+    while received < len(view):
+        n = response.raw.readinto(view[received:received + CHUNK_SIZE])
+        if not n:
+            break
+        received += n
+    return received
+
+
+def download(session: requests.Session, url: str, dest: Optional[str] = None) -> DownloadResult:
+    """Обычная загрузка одним GET (базовая линия для сравнения)"""
+    start = time.perf_counter()
+    with session.get(url, headers={"Accept-Encoding": "identity"}, stream=True) as response:
+        response.raise_for_status()
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit():
+            data = bytearray(int(content_length))
+            size = _read_into(response, memoryview(data))
+            del data[size:]
+        else:
+            data = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                data += chunk
+            size = len(data)
+
+    if dest:
+        with open(dest, "wb") as f:
+            f.write(data)
+        return DownloadResult(url, size, time.perf_counter() - start, 1, path=dest)
+    return DownloadResult(url, size, time.perf_counter() - start, 1, data=data)
+
+
+def _split(size: int, parts: int) -> List[Tuple[int, int]]:
+    parts = max(1, min(parts, size // MIN_PART_SIZE or 1))
+    step = -(-size // parts)
+    return [(offset, min(offset + step, size) - 1) for offset in range(0, size, step)]
+
+
+def _fetch_range(session: requests.Session, url: str, first: int, last: int,
+                 view: Optional[memoryview], fd: Optional[int]) -> int:
+    headers = {"Range": f"bytes={first}-{last}", "Accept-Encoding": "identity"}
+    with session.get(url, headers=headers, stream=True) as response:
+        start, _ = _parse_content_range(response.headers.get("Content-Range"))
+        if response.status_code != 206 or start != first:
+            raise RuntimeError(
+                f"Range {first}-{last} not honored: {response.status_code} "
+                f"{response.headers.get('Content-Range')}"
+            )
+        expected = last - first + 1
+        if view is not None:
+            received = _read_into(response, view[first:last + 1])
+        else:
+            # Один переиспользуемый буфер на поток, запись по смещению без склейки
+            buffer = bytearray(CHUNK_SIZE)
+            chunk = memoryview(buffer)
+            received = 0
+            while received < expected:
+                n = response.raw.readinto(chunk[:min(CHUNK_SIZE, expected - received)])
+                if not n:
+                    break
+                os.pwrite(fd, chunk[:n], first + received)
+                received += n
+        if received != expected:
+            raise RuntimeError(f"Range {first}-{last}: got {received} of {expected} bytes")
+        return received
+
+
+def ranged_download(session: requests.Session, url: str, parts: int = 4,
+                    dest: Optional[str] = None,
+                    probe: Optional[RangeProbe] = None) -> DownloadResult:
+    """Параллельная загрузка диапазонами в заранее выделенный буфер или файл"""
+    probe = probe or probe_ranges(session, url)
+    if not probe.honors_ranges or not probe.content_length:
+        return download(session, url, dest)
+
+    size = probe.content_length
+    spans = _split(size, parts)
+    start = time.perf_counter()
+
+    data = None
+    fd = None
+    view = None
+    if dest:
+        fd = os.open(dest, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(fd, size)
+    else:
+        data = bytearray(size)
+        view = memoryview(data)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(spans)) as pool:
+            futures = [pool.submit(_fetch_range, session, url, first, last, view, fd)
+                       for first, last in spans]
+            received = sum(f.result() for f in futures)
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+    elapsed = time.perf_counter() - start
+    return DownloadResult(url, received, elapsed, len(spans), data=data, path=dest)
+
+
+def compare(session: requests.Session, url: str, parts: int = 4) -> dict:
+    """Замер: поддерживает ли сервер Range и во сколько раз быстрее параллельная загрузка"""
+    probe = probe_ranges(session, url)
+    single = download(session, url)
+    ranged = ranged_download(session, url, parts=parts, probe=probe)
+    return {
+        "url": url,
+        "accept_ranges": probe.accept_ranges,
+        "content_length": probe.content_length,
+        "honors_ranges": probe.honors_ranges,
+        "size": single.size,
+        "parts": ranged.parts,
+        "single_s": single.elapsed,
+        "ranged_s": ranged.elapsed,
+        "speedup": single.elapsed / ranged.elapsed if ranged.elapsed else None,
+        "identical": ranged.data is not None and single.data == ranged.data,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranged download of cadastre documents")
+    parser.add_argument("item_id", type=int)
+    parser.add_argument("--document", choices=DOCUMENTS, default="governor_decree")
+    parser.add_argument("--parts", type=int, default=4)
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    parser.add_argument("--output", help="Сохранить файл вместо сравнения скорости")
+    args = parser.parse_args()
+
+    client = ApiClient(args.username, args.password)
+    client.login()
+    url = document_url(client, args.item_id, args.document)
+
+    if args.output:
+        result = ranged_download(client.session, url, parts=args.parts, dest=args.output)
+        print(f"✓ Saved {result.size} bytes to {result.path} "
+              f"in {result.elapsed:.2f}s ({result.parts} parts)")
+        return
+
+    report = compare(client.session, url, parts=args.parts)
+    print(f"  Accept-Ranges: {report['accept_ranges']}, Content-Length: {report['content_length']}")
+    print(f"  Server honors ranges: {report['honors_ranges']}")
+    print(f"  Single GET: {report['single_s']:.2f}s, ranged ({report['parts']} parts): "
+          f"{report['ranged_s']:.2f}s, speedup x{report['speedup'] or 0:.2f}")
+
+
+if __name__ == "__main__":
+    main()
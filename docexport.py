@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from apiclient import ApiClient
+from records import iter_records
+
+
+CHUNK_SIZE = 64 * 1024
+MANIFEST_NAME = "manifest.jsonl"
+
+# Документы; одноимённое поле записи непусто, если файл загружен
+DOCUMENTS = ("governor_decree", "screenshot")
+
+EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+}
+
+_blob_lock = threading.Lock()
+
+
+class Manifest:
+    """Журнал экспорта (JSON lines): одна строка на документ, дозапись после каждой загрузки"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[Tuple[int, str], Dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Последняя строка могла оборваться при прерывании
+                        continue
+                    self._remember(entry)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _remember(self, entry: Dict):
+        self.entries[(entry["id"], entry["document"])] = entry
+
+    def done(self, item_id: int, document: str) -> bool:
+        return (item_id, document) in self.entries
+
+    def add(self, entry: Dict):
+        with self._lock:
+            self._remember(entry)
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def select_items(client: ApiClient, filters: Dict, page_size: int = 100) -> Iterator[Dict]:
+    """Элементы кадастра по фильтрам списка, например region_soato или status"""
+    return client.iter_items("/cadastre", params=filters, page_size=page_size)
+
+
+def document_tasks(items: Iterable[Dict], documents: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    for record in iter_records(items):
+        for document in documents:
+            if getattr(record, document):
+                yield record.id, document
+
+
+def _blob_path(out_dir: str, sha256: str, content_type: Optional[str]) -> str:
+    ext = EXTENSIONS.get((content_type or "").split(";")[0].strip(), ".bin")
+    return os.path.join(out_dir, "blobs", sha256[:2], sha256 + ext)
+
+
+def export_document(client: ApiClient, out_dir: str, item_id: int, document: str,
+                    manifest: Manifest) -> Dict:
+    """Потоковая загрузка документа во временный файл с хешированием и дедупликацией по sha256"""
+    url = client.url(f"/cadastre/{item_id}/{document}")
+    entry = {"id": item_id, "document": document}
+
+    with client.session.get(url, stream=True) as response:
+        entry["status_code"] = response.status_code
+        if response.status_code != 200:
+            entry["status"] = "missing" if response.status_code == 404 else "error"
+            if entry["status"] == "missing":
+                manifest.add(entry)
+            return entry
+
+        content_type = response.headers.get("Content-Type")
+        digest = hashlib.sha256()
+        size = 0
+        tmp_dir = os.path.join(out_dir, "tmp")
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = _blob_path(out_dir, sha256, content_type)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with _blob_lock:
+                if os.path.exists(path):
+                    entry["status"] = "duplicate"
+                    os.remove(tmp_path)
+                else:
+                    entry["status"] = "downloaded"
+                    os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    entry.update({
+        "sha256": sha256,
+        "size": size,
+        "content_type": content_type,
+        "path": os.path.relpath(path, out_dir),
+    })
+    manifest.add(entry)
+    return entry
+
+
+def export(client: ApiClient, out_dir: str, filters: Dict,
+           documents: Iterable[str] = DOCUMENTS, workers: int = 8) -> Dict:
+    """Экспорт документов выбранных элементов с продолжением по manifest.jsonl"""
+    os.makedirs(os.path.join(out_dir, "tmp"), exist_ok=True)
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+    summary = {"downloaded": 0, "duplicate": 0, "missing": 0, "error": 0,
+               "skipped": 0, "bytes": 0}
+    start = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for item_id, document in document_tasks(select_items(client, filters), documents):
+                if manifest.done(item_id, document):
+                    summary["skipped"] += 1
+                    continue
+                futures.append(pool.submit(export_document, client, out_dir,
+                                           item_id, document, manifest))
+
+            for future in as_completed(futures):
+                entry = future.result()
+                summary[entry["status"]] += 1
+                if entry["status"] == "downloaded":
+                    summary["bytes"] += entry["size"]
+                elif entry["status"] == "error":
+                    print(f"⚠ {entry['document']} for ID {entry['id']} "
+                          f"returned status {entry['status_code']}")
+    finally:
+        manifest.close()
+
+    summary["elapsed"] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export governor decrees and screenshots")
+    parser.add_argument("out_dir")
+    parser.add_argument("--region-soato")
+    parser.add_argument("--status")
+    parser.add_argument("--document", action="append", choices=DOCUMENTS,
+                        help="По умолчанию все документы")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--cache-dir", help="Дисковый HTTP-кэш документов между запусками")
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+
+    filters = {}
+    if args.region_soato:
+        filters["region_soato"] = args.region_soato
+    if args.status:
+        filters["status"] = args.status
+
+    client = ApiClient(args.username, args.password)
+    client.login()
+    cache = client.enable_http_cache(args.cache_dir) if args.cache_dir else None
+    summary = export(client, args.out_dir, filters,
+                     documents=args.document or DOCUMENTS, workers=args.workers)
+
+    print(f"✓ Export finished in {summary['elapsed']:.2f}s")
+    print(f"  Downloaded: {summary['downloaded']} ({summary['bytes']} bytes), "
+          f"duplicates: {summary['duplicate']}, missing: {summary['missing']}, "
+          f"errors: {summary['error']}, already in manifest: {summary['skipped']}")
+    if cache:
+        print(cache.stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -6,66 +6,27 @@ from typing import Dict, Optional
 from datetime import datetime
 import time
 
+from apiclient import ApiClient
+from records import CadastreRecord, item_id
+
 BASE_URL = "https://etirof.cmspace.uz/api"
 USERNAME = "rool5"
 PASSWORD = "qwerty"
 
 
-class ApiTestRunner:
+class ApiTestRunner(ApiClient):
     
     def __init__(self):
-        self.token: Optional[str] = None
-        self.role: Optional[str] = None
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json'
-        })
+        super().__init__(USERNAME, PASSWORD, BASE_URL)
     
     def login(self) -> str:
-        url = f"{BASE_URL}/auth/login"
-        payload = {
-            "username": USERNAME,
-            "password": PASSWORD
-        }
-        
-        response = self.session.post(url, json=payload)
-        assert response.status_code == 200, f"Login failed: {response.text}"
-        
-        data = response.json()
-        self.token = data.get('token')
-        self.role = data.get('role')
-        
-        assert self.token, "Token not found in response"
+        super().login()
         assert self.role, "Role not found in response"
         
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.token}'
-        })
-        
         print(f"✓ Login successful as {USERNAME}")
         print(f"  Role: {self.role}")
         print(f"  Token: {self.token[:20]}...")
         return self.token
-    
-    def get(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.get(url, params=params)
-    
-    def post(self, endpoint: str, data: Optional[Dict] = None, 
-             files: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        if files:
-            headers = {'Authorization': f'Bearer {self.token}'}
-            return requests.post(url, data=data, files=files, headers=headers)
-        return self.session.post(url, json=data)
-    
-    def patch(self, endpoint: str, data: Dict) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.patch(url, json=data)
-    
-    def request_without_auth(self, method: str, endpoint: str) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return requests.request(method, url)
 
 
 @pytest.fixture(scope="session")
@@ -82,7 +43,7 @@ def sample_cadastre_id(test_runner):
     
     data = response.json()
     if data['data']:
-        return data['data'][0].get('ID') or data['data'][0].get('id')
+        return item_id(data['data'][0])
     return None
 
 
@@ -156,9 +117,9 @@ class TestGeometryFix:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/geometry-fix", payload)
         
         if response.status_code == 200:
-            result = response.json()
+            result = CadastreRecord.from_dict(response.json())
             print(f"✓ Geometry updated successfully for ID: {sample_cadastre_id}")
-            location = result.get('Location', result.get('location'))
+            location = result.location
             if location:
                 print(f"  New location: {location.get('type')}")
         else:
@@ -218,8 +179,8 @@ class TestEditNote:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/geometry-fix", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            edit_note = result.get('EditNote', result.get('edit_note'))
+            result = CadastreRecord.from_dict(response.json())
+            edit_note = result.edit_note
             print(f"✓ Geometry updated with edit_note for ID: {sample_cadastre_id}")
             print(f"  Edit note: {edit_note}")
         else:
@@ -252,8 +213,8 @@ class TestEditNote:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/geometry-fix", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            edit_note = result.get('EditNote', result.get('edit_note'))
+            result = CadastreRecord.from_dict(response.json())
+            edit_note = result.edit_note
             print(f"✓ Detailed edit_note saved for ID: {sample_cadastre_id}")
             print(f"  Edit note length: {len(edit_note) if edit_note else 0} chars")
         else:
@@ -410,8 +371,8 @@ class TestEditOperations:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/edit", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            status = result.get('Status', result.get('status'))
+            result = CadastreRecord.from_dict(response.json())
+            status = result.status
             print(f"✓ Status set to 'edit' for ID: {sample_cadastre_id}")
             print(f"  New status: {status}")
         else:
@@ -431,8 +392,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is True
             print(f"✓ Building presence updated to TRUE for ID: {sample_cadastre_id}")
         else:
@@ -449,8 +410,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is False
             print(f"✓ Building presence updated to FALSE for ID: {sample_cadastre_id}")
         else:
@@ -487,8 +448,8 @@ class TestScreenshotOperations:
                                    data=data, files=files)
         
         if response.status_code == 200:
-            result = response.json()
-            screenshot = result.get('Screenshot', result.get('screenshot'))
+            result = CadastreRecord.from_dict(response.json())
+            screenshot = result.screenshot
             
             assert screenshot
             print(f"✓ Screenshot uploaded successfully for ID: {sample_cadastre_id}")
@@ -496,19 +457,8 @@ class TestScreenshotOperations:
         else:
             print(f"⚠ Upload screenshot returned status {response.status_code}: {response.text}")
     
-    def test_02_get_screenshot(self, test_runner):
-        params = {"page_size": 100}
-        response = test_runner.get("/cadastre", params=params)
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        test_id = None
-        for item in data['data']:
-            screenshot = item.get('Screenshot', item.get('screenshot'))
-            if screenshot:
-                test_id = item.get('ID', item.get('id'))
-                break
+    def test_02_get_screenshot(self, test_runner, cadastre_finder):
+        test_id = cadastre_finder.find(test_runner, screenshot=True)
         
         if not test_id:
             pytest.skip("No items with screenshots available")
@@ -555,8 +505,8 @@ class TestStatusOperations:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/into_moderation", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            status = result.get('Status', result.get('status'))
+            result = CadastreRecord.from_dict(response.json())
+            status = result.status
             print(f"✓ Status updated to moderation for ID: {sample_cadastre_id}")
             print(f"  New status: {status}")
         else:
@@ -600,12 +550,11 @@ class TestGetOperations:
         response = test_runner.get(f"/cadastre/{sample_cadastre_id}")
         
         assert response.status_code == 200
-        data = response.json()
+        record = CadastreRecord.from_dict(response.json())
         
-        item_id = data.get('ID', data.get('id'))
-        assert item_id == sample_cadastre_id
+        assert record.id == sample_cadastre_id
         
-        print(f"✓ Retrieved item ID: {item_id}")
+        print(f"✓ Retrieved item ID: {record.id}")
     
     def test_02_get_by_invalid_id(self, test_runner):
         response = test_runner.get("/cadastre/999999999")
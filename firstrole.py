@@ -6,62 +6,24 @@ from typing import Dict, Optional, List
 from datetime import datetime
 import time
 
+from apiclient import ApiClient
+from records import CadastreRecord, PageMeta, item_id
+import geomcheck
+
 
 BASE_URL = "https://etirof.cmspace.uz/api"
 USERNAME = "rool1"
 PASSWORD = "qwerty"
 
 
-class TestRunner:
+class TestRunner(ApiClient):
     def __init__(self):
-        self.token: Optional[str] = None
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json'
-        })
+        super().__init__(USERNAME, PASSWORD, BASE_URL)
     
     def login(self) -> str:
-        url = f"{BASE_URL}/auth/login"
-        payload = {
-            "username": USERNAME,
-            "password": PASSWORD
-        }
-        
-        response = self.session.post(url, json=payload)
-        assert response.status_code == 200, f"Login failed: {response.text}"
-        
-        data = response.json()
-        self.token = data.get('token')
-        assert self.token, "Token not found in response"
-        
-        # Обновляем заголовки с токеном
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.token}'
-        })
-        
+        super().login()
         print(f"✓ Login successful. Token: {self.token[:20]}...")
         return self.token
-    
-    def get(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.get(url, params=params)
-    
-    def post(self, endpoint: str, data: Optional[Dict] = None, 
-             files: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        if files:
-            # Для multipart/form-data убираем Content-Type заголовок
-            headers = {'Authorization': f'Bearer {self.token}'}
-            return requests.post(url, data=data, files=files, headers=headers)
-        return self.session.post(url, json=data)
-    
-    def patch(self, endpoint: str, data: Dict) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.patch(url, json=data)
-    
-    def request_without_auth(self, method: str, endpoint: str) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return requests.request(method, url)
 
 
 @pytest.fixture(scope="session")
@@ -79,7 +41,7 @@ def sample_cadastre_id(test_runner):
     data = response.json()
     if data['data']:
         # API возвращает поля с PascalCase
-        return data['data'][0].get('ID') or data['data'][0].get('id')
+        return item_id(data['data'][0])
     return None
 
 
@@ -135,22 +97,18 @@ class TestListOperations:
         assert 'meta' in data
         assert isinstance(data['data'], list)
         
-        meta = data['meta']
-        assert 'page' in meta
-        assert 'pageSize' in meta or 'page_size' in meta
-        assert 'total' in meta
-        assert 'totalPages' in meta or 'total_pages' in meta
+        meta = PageMeta.from_dict(data['meta'])
+        assert meta.page is not None
+        assert meta.page_size is not None
+        assert meta.total is not None
+        assert meta.total_pages is not None
         
-        print(f"✓ Total cadastre items: {meta['total']}")
-        page_size = meta.get('pageSize', meta.get('page_size', 'N/A'))
-        total_pages = meta.get('totalPages', meta.get('total_pages', 'N/A'))
-        print(f"✓ Page: {meta['page']}, PageSize: {page_size}, TotalPages: {total_pages}")
+        print(f"✓ Total cadastre items: {meta.total}")
+        print(f"✓ Page: {meta.page}, PageSize: {meta.page_size}, TotalPages: {meta.total_pages}")
         
         if data['data']:
-            first_item = data['data'][0]
-            item_id = first_item.get('ID', first_item.get('id'))
-            status = first_item.get('Status', first_item.get('status'))
-            print(f"✓ First item ID: {item_id}, Status: {status}")
+            first_item = CadastreRecord.from_dict(data['data'][0])
+            print(f"✓ First item ID: {first_item.id}, Status: {first_item.status}")
     
     def test_02_list_with_pagination(self, test_runner):
         params = {
@@ -209,15 +167,14 @@ class TestGetOperations:
         response = test_runner.get(f"/cadastre/{sample_cadastre_id}")
         
         assert response.status_code == 200
-        data = response.json()
+        record = CadastreRecord.from_dict(response.json())
         
-        item_id = data.get('ID', data.get('id'))
-        assert item_id == sample_cadastre_id
+        assert record.id == sample_cadastre_id
         
-        cadastre_id = data.get('CadastreID', data.get('cadastre_id', 'N/A'))
-        status = data.get('Status', data.get('status', 'N/A'))
+        cadastre_id = record.get('cadastre_id', 'N/A')
+        status = record.get('status', 'N/A')
         
-        print(f"✓ Retrieved item ID: {item_id}, CadastreID: {cadastre_id}, Status: {status}")
+        print(f"✓ Retrieved item ID: {record.id}, CadastreID: {cadastre_id}, Status: {status}")
     
     def test_02_get_by_invalid_id(self, test_runner):
         response = test_runner.get("/cadastre/999999999")
@@ -229,20 +186,17 @@ class TestGetOperations:
         if not sample_cadastre_data:
             pytest.skip("No cadastre items available")
         
-        cadastre_id = sample_cadastre_data.get('CadastreID', sample_cadastre_data.get('cadastre_id'))
+        cadastre_id = CadastreRecord.from_dict(sample_cadastre_data).cadastre_id
         if not cadastre_id:
             pytest.skip("No cadastre_id available in sample data")
         
         response = test_runner.get(f"/cadastre/cadastre-id/{cadastre_id}")
         
         assert response.status_code == 200
-        data = response.json()
-        
-        returned_cadastre_id = data.get('CadastreID', data.get('cadastre_id'))
-        item_id = data.get('ID', data.get('id'))
+        record = CadastreRecord.from_dict(response.json())
         
-        assert returned_cadastre_id == cadastre_id
-        print(f"✓ Retrieved item by CadastreID: {returned_cadastre_id}, ID: {item_id}")
+        assert record.cadastre_id == cadastre_id
+        print(f"✓ Retrieved item by CadastreID: {record.cadastre_id}, ID: {record.id}")
     
     def test_04_get_by_invalid_cadastre_id(self, test_runner):
         response = test_runner.get("/cadastre/cadastre-id/INVALID_ID_9999")
@@ -268,7 +222,7 @@ class TestGeometryUpdate:
         if not data['data']:
             pytest.skip("No items with status 'geometry_fix' available")
         
-        test_id = data['data'][0].get('ID', data['data'][0].get('id'))
+        test_id = item_id(data['data'][0])
         
         fixed_geojson = {
             "type": "Polygon",
@@ -276,6 +230,7 @@ class TestGeometryUpdate:
                            [69.124, 41.124], [69.123, 41.124], [69.123, 41.123]]]
         }
         
+        geomcheck.require_valid(fixed_geojson)
         payload = {
             "fixed_geojson": json.dumps(fixed_geojson),
             "move_distance": 15.5
@@ -284,9 +239,9 @@ class TestGeometryUpdate:
         response = test_runner.patch(f"/cadastre/{test_id}/geometry-fix", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            result_geojson = result.get('FixedGeojson', result.get('fixed_geojson'))
-            result_distance = result.get('MoveDistance', result.get('move_distance'))
+            result = CadastreRecord.from_dict(response.json())
+            result_geojson = result.fixed_geojson
+            result_distance = result.move_distance
             
             assert result_geojson == json.dumps(fixed_geojson)
             assert result_distance == 15.5
@@ -304,7 +259,7 @@ class TestGeometryUpdate:
         if not data['data']:
             pytest.skip("No items with status 'edit' available")
         
-        test_id = data['data'][0].get('ID', data['data'][0].get('id'))
+        test_id = item_id(data['data'][0])
         
         fixed_geojson = {
             "type": "Polygon",
@@ -312,6 +267,7 @@ class TestGeometryUpdate:
                            [69.126, 41.126], [69.125, 41.126], [69.125, 41.125]]]
         }
         
+        geomcheck.require_valid(fixed_geojson)
         payload = {
             "fixed_geojson": json.dumps(fixed_geojson),
             "move_distance": 20.3
@@ -320,9 +276,9 @@ class TestGeometryUpdate:
         response = test_runner.patch(f"/cadastre/{test_id}/edit", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            result_geojson = result.get('FixedGeojson', result.get('fixed_geojson'))
-            result_distance = result.get('MoveDistance', result.get('move_distance'))
+            result = CadastreRecord.from_dict(response.json())
+            result_geojson = result.fixed_geojson
+            result_distance = result.move_distance
             
             assert result_geojson == json.dumps(fixed_geojson)
             assert result_distance == 20.3
@@ -339,9 +295,40 @@ class TestGeometryUpdate:
             "move_distance": 10.0
         }
         
+        report = geomcheck.validate(payload["fixed_geojson"])
+        assert not report.valid, "Local validator accepted invalid GeoJSON"
+        
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/geometry-fix", payload)
         
+        server_rejected = response.status_code >= 400
         print(f"✓ Invalid GeoJSON returns status: {response.status_code}")
+        print(f"  Local verdict: {report.errors[0]}")
+        print(f"  Server {'agrees' if server_rejected else 'DISAGREES'} with local validation")
+    
+    def test_04_self_intersecting_geojson(self, test_runner, sample_cadastre_id):
+        if not sample_cadastre_id:
+            pytest.skip("No cadastre items available")
+        
+        # «Бабочка»: рёбра 0-1 и 2-3 пересекаются
+        bowtie = {
+            "type": "Polygon",
+            "coordinates": [[[69.123, 41.123], [69.124, 41.124],
+                           [69.124, 41.123], [69.123, 41.124], [69.123, 41.123]]]
+        }
+        
+        report = geomcheck.validate(bowtie)
+        assert not report.valid, "Local validator accepted a self-intersecting ring"
+        
+        payload = {
+            "fixed_geojson": json.dumps(bowtie),
+            "move_distance": 10.0
+        }
+        response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/geometry-fix", payload)
+        
+        server_rejected = response.status_code >= 400
+        print(f"✓ Self-intersecting GeoJSON returns status: {response.status_code}")
+        print(f"  Local verdict: {report.errors[0]}")
+        print(f"  Server {'agrees' if server_rejected else 'DISAGREES'} with local validation")
 
 
 class TestBuildingPresence:
@@ -358,8 +345,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is True
             print(f"✓ Building presence updated to TRUE for ID: {sample_cadastre_id}")
         else:
@@ -376,8 +363,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is False
             print(f"✓ Building presence updated to FALSE for ID: {sample_cadastre_id}")
         else:
@@ -393,6 +380,24 @@ class TestBuildingPresence:
         
         assert response.status_code in [400, 500]
         print(f"✓ Missing required field returns status: {response.status_code}")
+    
+    def test_04_concurrent_building_presence_consistent(self, test_runner, sample_cadastre_id):
+        """Одновременные записи building_presence: итог совпадает с последней записью"""
+        if not sample_cadastre_id:
+            pytest.skip("No cadastre items available")
+        from statestress import TARGETS, StateStress
+        
+        stress = StateStress(test_runner, TARGETS["building-presence"], sample_cadastre_id)
+        original = stress.read_state()
+        try:
+            result = stress.run(concurrency=8, serial_calls=3)
+        finally:
+            stress.restore(original)
+        
+        print(result.format())
+        if not result.applied:
+            pytest.skip(f"building-presence rejected all writes: {result.rejected}")
+        assert result.consistent is not False, f"Inconsistent final state: {result.problems}"
 
 
 class TestScreenshotOperations:
@@ -425,9 +430,9 @@ class TestScreenshotOperations:
                                    data=data, files=files)
         
         if response.status_code == 200:
-            result = response.json()
-            screenshot = result.get('Screenshot', result.get('screenshot'))
-            space_image_id = result.get('SpaceImageId', result.get('space_image_id'))
+            result = CadastreRecord.from_dict(response.json())
+            screenshot = result.screenshot
+            space_image_id = result.space_image_id
             
             assert screenshot
             assert space_image_id == 'TEST_IMAGE_123'
@@ -470,19 +475,8 @@ class TestScreenshotOperations:
         else:
             print(f"⚠ Upload returned status {response.status_code}: {response.text}")
     
-    def test_03_get_screenshot(self, test_runner):
-        params = {"page_size": 100}
-        response = test_runner.get("/cadastre", params=params)
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        test_id = None
-        for item in data['data']:
-            screenshot = item.get('Screenshot', item.get('screenshot'))
-            if screenshot:
-                test_id = item.get('ID', item.get('id'))
-                break
+    def test_03_get_screenshot(self, test_runner, cadastre_finder):
+        test_id = cadastre_finder.find(test_runner, screenshot=True)
         
         if not test_id:
             pytest.skip("No items with screenshots available")
@@ -587,10 +581,14 @@ class TestErrorHandling:
 class TestEdgeCases:
     def test_01_very_large_page_size(self, test_runner):
         params = {"page_size": 10000}
-        response = test_runner.get("/cadastre", params=params)
-        
-        assert response.status_code == 200
-        print("✓ Large page_size handled correctly")
+        with test_runner.stream_list("/cadastre", params=params) as stream:
+            assert stream.response.status_code == 200
+            count = sum(1 for _ in stream)
+        
+        meta = stream.meta.get('meta') or {}
+        print(f"✓ Large page_size handled correctly: {count} items streamed, "
+              f"{stream.bytes_read / 1024:.0f} KB")
+        print(f"  Meta: {meta}")
     
     def test_02_zero_page_size(self, test_runner):
         params = {"page_size": 0}
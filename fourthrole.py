@@ -6,66 +6,29 @@ from typing import Dict, Optional
 from datetime import datetime
 import time
 
+from apiclient import ApiClient
+from records import CadastreRecord, item_id
+import docdownload
+import httpcache
+
 
 BASE_URL = "https://etirof.cmspace.uz/api"
 USERNAME = "rool4"
 PASSWORD = "qwerty"
 
 
-class TestRunner:
+class TestRunner(ApiClient):
     def __init__(self):
-        self.token: Optional[str] = None
-        self.role: Optional[str] = None
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json'
-        })
+        super().__init__(USERNAME, PASSWORD, BASE_URL)
     
     def login(self) -> str:
-        url = f"{BASE_URL}/auth/login"
-        payload = {
-            "username": USERNAME,
-            "password": PASSWORD
-        }
-        
-        response = self.session.post(url, json=payload)
-        assert response.status_code == 200, f"Login failed: {response.text}"
-        
-        data = response.json()
-        self.token = data.get('token')
-        self.role = data.get('role')
-        
-        assert self.token, "Token not found in response"
+        super().login()
         assert self.role, "Role not found in response"
         
-        self.session.headers.update({
-            'Authorization': f'Bearer {self.token}'
-        })
-        
         print(f"✓ Login successful as {USERNAME}")
         print(f"  Role: {self.role}")
         print(f"  Token: {self.token[:20]}...")
         return self.token
-    
-    def get(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.get(url, params=params)
-    
-    def post(self, endpoint: str, data: Optional[Dict] = None, 
-             files: Optional[Dict] = None) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        if files:
-            headers = {'Authorization': f'Bearer {self.token}'}
-            return requests.post(url, data=data, files=files, headers=headers)
-        return self.session.post(url, json=data)
-    
-    def patch(self, endpoint: str, data: Dict) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return self.session.patch(url, json=data)
-    
-    def request_without_auth(self, method: str, endpoint: str) -> requests.Response:
-        url = f"{BASE_URL}{endpoint}"
-        return requests.request(method, url)
 
 
 @pytest.fixture(scope="session")
@@ -83,7 +46,7 @@ def sample_cadastre_id(test_runner):
     data = response.json()
     if data['data']:
         # API возвращает поля с PascalCase
-        return data['data'][0].get('ID') or data['data'][0].get('id')
+        return item_id(data['data'][0])
     return None
 
 
@@ -164,9 +127,9 @@ class TestScreenshotOperations:
                                    data=data, files=files)
         
         if response.status_code == 200:
-            result = response.json()
-            screenshot = result.get('Screenshot', result.get('screenshot'))
-            space_image_id = result.get('SpaceImageId', result.get('space_image_id'))
+            result = CadastreRecord.from_dict(response.json())
+            screenshot = result.screenshot
+            space_image_id = result.space_image_id
             
             assert screenshot
             print(f"✓ Screenshot uploaded successfully for ID: {sample_cadastre_id}")
@@ -175,19 +138,8 @@ class TestScreenshotOperations:
         else:
             print(f"⚠ Upload screenshot returned status {response.status_code}: {response.text}")
     
-    def test_02_get_screenshot(self, test_runner):
-        params = {"page_size": 100}
-        response = test_runner.get("/cadastre", params=params)
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        test_id = None
-        for item in data['data']:
-            screenshot = item.get('Screenshot', item.get('screenshot'))
-            if screenshot:
-                test_id = item.get('ID', item.get('id'))
-                break
+    def test_02_get_screenshot(self, test_runner, cadastre_finder):
+        test_id = cadastre_finder.find(test_runner, screenshot=True)
         
         if not test_id:
             pytest.skip("No items with screenshots available")
@@ -215,8 +167,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is True
             print(f"✓ Building presence updated to TRUE for ID: {sample_cadastre_id}")
         else:
@@ -233,8 +185,8 @@ class TestBuildingPresence:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/building-presence", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            building_presence = result.get('BuildingPresence', result.get('building_presence'))
+            result = CadastreRecord.from_dict(response.json())
+            building_presence = result.building_presence
             assert building_presence is False
             print(f"✓ Building presence updated to FALSE for ID: {sample_cadastre_id}")
         else:
@@ -252,8 +204,8 @@ class TestStatusOperations:
         response = test_runner.patch(f"/cadastre/{sample_cadastre_id}/into_moderation", payload)
         
         if response.status_code == 200:
-            result = response.json()
-            status = result.get('Status', result.get('status'))
+            result = CadastreRecord.from_dict(response.json())
+            status = result.status
             print(f"✓ Status updated to moderation for ID: {sample_cadastre_id}")
             print(f"  New status: {status}")
         elif response.status_code == 400:
@@ -301,25 +253,9 @@ class TestCadastreError:
 
 class TestGovernorDecree:
     
-    def test_01_get_governor_decree(self, test_runner):
+    def test_01_get_governor_decree(self, test_runner, cadastre_finder):
         # Находим item с governor decree
-        params = {"page_size": 100}
-        response = test_runner.get("/cadastre", params=params)
-        
-        assert response.status_code == 200
-        data = response.json()
-        
-        test_id = None
-        for item in data['data']:
-            has_decree = (
-                item.get('GovernorDecree') or 
-                item.get('governor_decree') or
-                item.get('GovernorDecision') or
-                item.get('governor_decision')
-            )
-            if has_decree:
-                test_id = item.get('ID', item.get('id'))
-                break
+        test_id = cadastre_finder.find(test_runner, decree=True)
         
         if not test_id:
             pytest.skip("No items with governor decree available")
@@ -335,6 +271,43 @@ class TestGovernorDecree:
         else:
             print(f"⚠ Get governor decree returned status {response.status_code}")
 
+    def test_02_ranged_download_governor_decree(self, test_runner, cadastre_finder):
+        test_id = cadastre_finder.find(test_runner, decree=True)
+
+        if not test_id:
+            pytest.skip("No items with governor decree available")
+
+        url = f"{BASE_URL}/cadastre/{test_id}/governor_decree"
+        report = docdownload.compare(test_runner.session, url, parts=4)
+
+        assert report['identical'], "Ranged download differs from single GET"
+        print(f"✓ Governor decree ID: {test_id}, size: {report['size']} bytes")
+        print(f"  Accept-Ranges: {report['accept_ranges']}, honors ranges: {report['honors_ranges']}")
+        print(f"  Single: {report['single_s']:.2f}s, ranged: {report['ranged_s']:.2f}s "
+              f"({report['parts']} parts)")
+
+    def test_03_governor_decree_http_cache(self, test_runner, cadastre_finder, tmp_path):
+        test_id = cadastre_finder.find(test_runner, decree=True)
+
+        if not test_id:
+            pytest.skip("No items with governor decree available")
+
+        session = requests.Session()
+        session.headers.update(test_runner.session.headers)
+        adapter = httpcache.install(session, str(tmp_path), prefix=BASE_URL)
+
+        url = f"{BASE_URL}/cadastre/{test_id}/governor_decree"
+        first = session.get(url)
+        second = session.get(url)
+
+        if first.status_code != 200:
+            pytest.skip(f"Governor decree returned status {first.status_code}")
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        print(f"✓ Governor decree ID: {test_id} fetched twice through HTTP cache")
+        print(adapter.stats.report())
+
 
 class TestListOperations:
     
@@ -371,12 +344,11 @@ class TestGetOperations:
         response = test_runner.get(f"/cadastre/{sample_cadastre_id}")
         
         assert response.status_code == 200
-        data = response.json()
+        record = CadastreRecord.from_dict(response.json())
         
-        item_id = data.get('ID', data.get('id'))
-        assert item_id == sample_cadastre_id
+        assert record.id == sample_cadastre_id
         
-        print(f"✓ Retrieved item ID: {item_id}")
+        print(f"✓ Retrieved item ID: {record.id}")
     
     def test_02_get_by_invalid_id(self, test_runner):
         response = test_runner.get("/cadastre/999999999")
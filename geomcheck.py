@@ -0,0 +1,288 @@
+import argparse
+import json
+import math
+import sys
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6_371_008.8
+
+# (min_lon, min_lat, max_lon, max_lat)
+WORLD_BOUNDS = (-180.0, -90.0, 180.0, 90.0)
+UZ_BOUNDS = (55.9, 37.1, 73.2, 45.6)
+
+# Сколько пар отрезков проверять за один векторный проход
+PAIR_BLOCK = 2_000_000
+
+
+class GeometryError(ValueError):
+    pass
+
+
+@dataclass
+class GeometryReport:
+    valid: bool = True
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    area_m2: float = 0.0
+    vertices: int = 0
+
+    def error(self, message: str):
+        self.valid = False
+        self.errors.append(message)
+
+
+def parse_geometry(value) -> Tuple[str, List[List[np.ndarray]]]:
+    """GeoJSON (строка или dict, Polygon/MultiPolygon) -> (тип, [[кольцо (n, 2), ...], ...])"""
+    if isinstance(value, (str, bytes)):
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            raise GeometryError(f"Not a JSON document: {e}") from None
+    if not isinstance(value, dict):
+        raise GeometryError("GeoJSON geometry must be an object")
+
+    kind = value.get("type")
+    coordinates = value.get("coordinates")
+    if kind == "Polygon":
+        polygons = [coordinates]
+    elif kind == "MultiPolygon":
+        polygons = coordinates
+    else:
+        raise GeometryError(f"Unsupported geometry type: {kind!r}")
+    if not isinstance(polygons, list) or not polygons:
+        raise GeometryError("Empty coordinates")
+
+    parsed = []
+    for rings in polygons:
+        if not isinstance(rings, list) or not rings:
+            raise GeometryError("Polygon without rings")
+        parsed_rings = []
+        for ring in rings:
+            try:
+                coords = np.asarray(ring, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise GeometryError("Ring positions must be numeric arrays of equal length") from None
+            if coords.ndim != 2 or coords.shape[1] < 2:
+                raise GeometryError(f"Ring positions must be [lon, lat], got shape {coords.shape}")
+            parsed_rings.append(coords[:, :2])
+        parsed.append(parsed_rings)
+    return kind, parsed
+
+
+def iter_rings(value) -> Iterator[np.ndarray]:
+    for rings in parse_geometry(value)[1]:
+        yield from rings
+
+
+def project(coords: np.ndarray, lat0: Optional[float] = None) -> np.ndarray:
+    """Локальная равнопромежуточная проекция в метры (для площадей и расстояний участков)"""
+    lat0 = float(np.mean(coords[:, 1])) if lat0 is None else lat0
+    k = math.pi / 180.0 * EARTH_RADIUS_M
+    out = np.empty_like(coords)
+    out[:, 0] = coords[:, 0] * k * math.cos(math.radians(lat0))
+    out[:, 1] = coords[:, 1] * k
+    return out
+
+
+def signed_area(coords: np.ndarray) -> float:
+    """Площадь по формуле шнурования; > 0 — обход против часовой стрелки"""
+    x = coords[:, 0] - coords[0, 0]
+    y = coords[:, 1] - coords[0, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def _on_segment(ax, ay, bx, by, cx, cy):
+    # c коллинеарна ab: лежит ли c внутри прямоугольника ab
+    return ((np.minimum(ax, bx) <= cx) & (cx <= np.maximum(ax, bx))
+            & (np.minimum(ay, by) <= cy) & (cy <= np.maximum(ay, by)))
+
+
+def segment_intersections(ring: np.ndarray, limit: int = 10) -> List[Tuple[int, int]]:
+    """Пересечения несмежных отрезков кольца: sweep по x (sort and sweep) + векторная проверка пар.
+
+    Отрезки сортируются по левому краю; для каждого отрезка кандидаты — те,
+    чей левый край попадает в его x-интервал (searchsorted), далее отсев по y
+    и точный тест ориентаций сразу для блока пар.
+    """
+    a = ring[:-1]
+    b = ring[1:]
+    n = len(a)
+    if n < 4:
+        return []
+
+    xmin = np.minimum(a[:, 0], b[:, 0])
+    xmax = np.maximum(a[:, 0], b[:, 0])
+    ymin = np.minimum(a[:, 1], b[:, 1])
+    ymax = np.maximum(a[:, 1], b[:, 1])
+
+    order = np.argsort(xmin, kind="stable")
+    sorted_xmin = xmin[order]
+    hi = np.searchsorted(sorted_xmin, xmax[order], side="right")
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    cumulative = np.cumsum(counts)
+
+    found: List[Tuple[int, int]] = []
+    block_start = 0
+    while block_start < n and len(found) < limit:
+        base = cumulative[block_start - 1] if block_start else 0
+        block_end = int(np.searchsorted(cumulative, base + PAIR_BLOCK, side="right"))
+        block_end = max(block_end, block_start + 1)
+        block_counts = counts[block_start:block_end]
+        total = int(block_counts.sum())
+        if total:
+            rows = np.repeat(np.arange(block_start, block_end), block_counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(block_counts) - block_counts, block_counts)
+            i = order[rows]
+            j = order[rows + 1 + offsets]
+
+            gap = np.abs(i - j)
+            keep = (gap != 1) & (gap != n - 1)
+            keep &= (ymin[i] <= ymax[j]) & (ymin[j] <= ymax[i])
+            i, j = i[keep], j[keep]
+
+            p1x, p1y, q1x, q1y = a[i, 0], a[i, 1], b[i, 0], b[i, 1]
+            p2x, p2y, q2x, q2y = a[j, 0], a[j, 1], b[j, 0], b[j, 1]
+            o1 = _orient(p1x, p1y, q1x, q1y, p2x, p2y)
+            o2 = _orient(p1x, p1y, q1x, q1y, q2x, q2y)
+            o3 = _orient(p2x, p2y, q2x, q2y, p1x, p1y)
+            o4 = _orient(p2x, p2y, q2x, q2y, q1x, q1y)
+            hit = (o1 * o2 < 0) & (o3 * o4 < 0)
+            hit |= (o1 == 0) & _on_segment(p1x, p1y, q1x, q1y, p2x, p2y)
+            hit |= (o2 == 0) & _on_segment(p1x, p1y, q1x, q1y, q2x, q2y)
+            hit |= (o3 == 0) & _on_segment(p2x, p2y, q2x, q2y, p1x, p1y)
+            hit |= (o4 == 0) & _on_segment(p2x, p2y, q2x, q2y, q1x, q1y)
+            for k in np.flatnonzero(hit)[:limit - len(found)]:
+                found.append((int(min(i[k], j[k])), int(max(i[k], j[k]))))
+        block_start = block_end
+
+    # Смежные отрезки пересекаются только при развороте назад по той же прямой (шип)
+    d1 = b - a
+    d2 = np.roll(d1, -1, axis=0)
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    dot = (d1 * d2).sum(axis=1)
+    for k in np.flatnonzero((cross == 0) & (dot < 0))[:max(limit - len(found), 0)]:
+        found.append((int(k), int((k + 1) % n)))
+    return found
+
+
+def point_in_ring(point: np.ndarray, ring: np.ndarray) -> bool:
+    """Проверка точки внутри кольца методом лучей, векторно по всем рёбрам"""
+    x, y = point
+    a = ring[:-1]
+    b = ring[1:]
+    crosses = (a[:, 1] > y) != (b[:, 1] > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = a[:, 0] + (y - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+    return bool(np.count_nonzero(crosses & (x < x_at)) % 2)
+
+
+def _check_ring(ring: np.ndarray, label: str, report: GeometryReport, bounds) -> Optional[float]:
+    if len(ring) < 4:
+        report.error(f"{label}: needs at least 4 positions, got {len(ring)}")
+        return None
+    if not np.isfinite(ring).all():
+        report.error(f"{label}: non-finite coordinates")
+        return None
+
+    min_lon, min_lat, max_lon, max_lat = WORLD_BOUNDS
+    lon, lat = ring[:, 0], ring[:, 1]
+    if (lon < min_lon).any() or (lon > max_lon).any() or (lat < min_lat).any() or (lat > max_lat).any():
+        report.error(f"{label}: coordinates outside lon/lat range (axis order must be [lon, lat])")
+        return None
+    if bounds is not None:
+        min_lon, min_lat, max_lon, max_lat = bounds
+        outside = (lon < min_lon) | (lon > max_lon) | (lat < min_lat) | (lat > max_lat)
+        if outside.any():
+            report.error(f"{label}: {int(outside.sum())} positions outside bounds {bounds}")
+
+    if not np.array_equal(ring[0], ring[-1]):
+        report.error(f"{label}: ring is not closed (first and last positions differ)")
+        return None
+
+    repeated = np.flatnonzero((np.diff(ring, axis=0) == 0).all(axis=1))
+    if len(repeated):
+        report.error(f"{label}: {len(repeated)} consecutive duplicate positions "
+                     f"(first at index {int(repeated[0]) + 1})")
+    else:
+        # Пара (lon, lat) как одно complex-число: сортировка без np.unique(axis=0)
+        packed = np.sort(np.ascontiguousarray(ring[:-1]).view(np.complex128).ravel())
+        repeats = int(np.count_nonzero(packed[1:] == packed[:-1]))
+        if repeats:
+            report.error(f"{label}: ring touches itself ({repeats} repeated vertices)")
+
+    crossings = segment_intersections(ring)
+    if crossings:
+        report.error(f"{label}: self-intersection between segments {crossings[0][0]} and {crossings[0][1]}"
+                     + (f" (+{len(crossings) - 1} more)" if len(crossings) > 1 else ""))
+
+    area = signed_area(project(ring))
+    if area == 0:
+        report.error(f"{label}: zero area")
+    return area
+
+
+def validate(value, bounds=UZ_BOUNDS) -> GeometryReport:
+    """Локальная проверка геометрии fixed_geojson / location перед отправкой на сервер"""
+    report = GeometryReport()
+    try:
+        _, polygons = parse_geometry(value)
+    except GeometryError as e:
+        report.error(str(e))
+        return report
+
+    for p, rings in enumerate(polygons):
+        prefix = f"polygon {p} " if len(polygons) > 1 else ""
+        for r, ring in enumerate(rings):
+            report.vertices += len(ring)
+            label = f"{prefix}{'exterior' if r == 0 else f'hole {r}'}"
+            area = _check_ring(ring, label, report, bounds)
+            if area is None:
+                continue
+            if r == 0:
+                if area < 0:
+                    report.warnings.append(f"{label}: clockwise exterior ring (RFC 7946 expects CCW)")
+                report.area_m2 += abs(area)
+            else:
+                if area > 0:
+                    report.warnings.append(f"{label}: counter-clockwise hole (RFC 7946 expects CW)")
+                if not point_in_ring(ring[0], rings[0]):
+                    report.error(f"{label}: hole lies outside the exterior ring")
+                report.area_m2 -= abs(area)
+    return report
+
+
+def require_valid(value, bounds=UZ_BOUNDS) -> GeometryReport:
+    """Как validate, но с исключением GeometryError для невалидной геометрии"""
+    report = validate(value, bounds)
+    if not report.valid:
+        raise GeometryError("; ".join(report.errors))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate GeoJSON geometry locally")
+    parser.add_argument("path", nargs="?", help="Файл с GeoJSON (по умолчанию stdin)")
+    parser.add_argument("--world", action="store_true", help="Не ограничивать координаты Узбекистаном")
+    args = parser.parse_args()
+
+    text = open(args.path, encoding="utf-8").read() if args.path else sys.stdin.read()
+    report = validate(text, bounds=None if args.world else UZ_BOUNDS)
+    for message in report.errors:
+        print(f"✗ {message}")
+    for message in report.warnings:
+        print(f"⚠ {message}")
+    if report.valid:
+        print(f"✓ Valid geometry: {report.vertices} positions, area {report.area_m2:.1f} m²")
+    sys.exit(0 if report.valid else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import io
+import json
+import math
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apiclient import ApiClient
+from perfstats import LatencyStats, bar_chart
+from records import item_id
+
+
+# Координаты, которые уже используются в тестах (fifthrole, Ташкент)
+UZ_CENTER = (69.240562, 41.311151)
+METERS_PER_DEG = 111_320.0
+
+CHUNK_VERTICES = 65_536
+
+Ring = np.ndarray
+Polygon = List[Ring]
+
+
+def ring(n_vertices: int, center: Tuple[float, float] = UZ_CENTER, radius_m: float = 50.0,
+         rng: Optional[np.random.Generator] = None, jitter: float = 0.3,
+         clockwise: bool = False) -> Ring:
+    """Замкнутое кольцо (n_vertices позиций вместе с замыкающей) формы звезды вокруг center.
+
+    Углы строго возрастают, поэтому кольцо простое (без самопересечений).
+    По умолчанию обход против часовой стрелки (внешнее кольцо по RFC 7946).
+    """
+    if n_vertices < 4:
+        raise ValueError("A linear ring needs at least 4 positions")
+    rng = rng or np.random.default_rng()
+    n = n_vertices - 1
+    step = 2 * math.pi / n
+    angles = np.arange(n) * step + rng.uniform(0, step * 0.9, n)
+    # Плавный радиус из нескольких гармоник: граница как у реального участка,
+    # а не «ёж» из длинных радиальных рёбер при большом числе вершин
+    harmonics = np.arange(1, 6)[:, None]
+    phases = rng.uniform(0, 2 * math.pi, (5, 1))
+    noise = (rng.random((5, 1)) / harmonics * np.cos(harmonics * angles + phases)).sum(axis=0)
+    spread = noise.max() - noise.min()
+    noise = (noise - noise.min()) / spread if spread > 0 else np.zeros(n)
+    radii = radius_m * (1.0 - jitter * noise)
+
+    lon0, lat0 = center
+    coords = np.empty((n_vertices, 2), dtype=np.float64)
+    coords[:n, 0] = lon0 + radii * np.cos(angles) / (METERS_PER_DEG * math.cos(math.radians(lat0)))
+    coords[:n, 1] = lat0 + radii * np.sin(angles) / METERS_PER_DEG
+    if clockwise:
+        coords[:n] = coords[n - 1::-1]
+    coords[n] = coords[0]
+    return coords
+
+
+def default_radius(n_vertices: int) -> float:
+    # Не меньше ~10 см на ребро: иначе округление до 9 знаков в GeoJSON ломает кольцо
+    return max(50.0, 0.1 * n_vertices / (2 * math.pi))
+
+
+def polygon(n_vertices: int, center: Tuple[float, float] = UZ_CENTER,
+            radius_m: Optional[float] = None, holes: int = 0,
+            hole_vertices: Optional[int] = None, seed: Optional[int] = None) -> Polygon:
+    """Полигон: внешнее кольцо на n_vertices позиций и holes непересекающихся дыр"""
+    if holes and n_vertices < 16:
+        raise ValueError("Polygons with holes need at least 16 exterior positions")
+    rng = np.random.default_rng(seed)
+    radius_m = radius_m or default_radius(n_vertices)
+    jitter = 0.3
+    rings = [ring(n_vertices, center, radius_m, rng, jitter)]
+    if holes:
+        hole_vertices = hole_vertices or max(4, n_vertices // (10 * holes))
+        # Центры дыр на окружности 0.3R, радиус не больше 0.2R:
+        # дыры не пересекаются друг с другом и лежат внутри 0.7R (минимум внешнего кольца)
+        offset = 0.3 * radius_m
+        hole_radius = min(0.2 * radius_m, offset * math.sin(math.pi / holes) * 0.8) \
+            if holes > 1 else 0.2 * radius_m
+        lon0, lat0 = center
+        for k in range(holes):
+            a = 2 * math.pi * k / holes
+            hole_center = (
+                lon0 + offset * math.cos(a) / (METERS_PER_DEG * math.cos(math.radians(lat0))),
+                lat0 + offset * math.sin(a) / METERS_PER_DEG,
+            )
+            rings.append(ring(hole_vertices, hole_center, hole_radius, rng, jitter, clockwise=True))
+    return rings
+
+
+def multipolygon(n_polygons: int, n_vertices: int, center: Tuple[float, float] = UZ_CENTER,
+                 radius_m: Optional[float] = None, holes: int = 0,
+                 seed: Optional[int] = None) -> List[Polygon]:
+    """Мультиполигон: полигоны на сетке с шагом 3R, не пересекаются"""
+    rng = np.random.default_rng(seed)
+    radius_m = radius_m or default_radius(n_vertices)
+    side = math.ceil(math.sqrt(n_polygons))
+    lon0, lat0 = center
+    dlon = 3 * radius_m / (METERS_PER_DEG * math.cos(math.radians(lat0)))
+    dlat = 3 * radius_m / METERS_PER_DEG
+    polygons = []
+    for i in range(n_polygons):
+        row, col = divmod(i, side)
+        c = (lon0 + col * dlon, lat0 + row * dlat)
+        polygons.append(polygon(n_vertices, c, radius_m, holes, seed=int(rng.integers(2 ** 31))))
+    return polygons
+
+
+def _write_ring(out: io.StringIO, coords: Ring, precision: int):
+    fmt = f"[%.{precision}f,%.{precision}f]"
+    full_template = None
+    out.write("[")
+    for start in range(0, len(coords), CHUNK_VERTICES):
+        chunk = coords[start:start + CHUNK_VERTICES]
+        if len(chunk) == CHUNK_VERTICES:
+            full_template = full_template or ",".join([fmt] * CHUNK_VERTICES)
+            template = full_template
+        else:
+            template = ",".join([fmt] * len(chunk))
+        if start:
+            out.write(",")
+        out.write(template % tuple(chunk.ravel().tolist()))
+    out.write("]")
+
+
+def to_geojson(geometry, precision: int = 9) -> str:
+    """GeoJSON-строка для fixed_geojson: Polygon (список колец) или MultiPolygon.
+
+    Координаты форматируются блоками прямо в один буфер, без промежуточного
+    дерева списков Python и json.dumps.
+    """
+    is_multi = bool(geometry) and isinstance(geometry[0], list)
+    out = io.StringIO()
+    out.write('{"type":"MultiPolygon","coordinates":[' if is_multi
+              else '{"type":"Polygon","coordinates":')
+    polygons = geometry if is_multi else [geometry]
+    for p, rings in enumerate(polygons):
+        if p:
+            out.write(",")
+        out.write("[")
+        for r, coords in enumerate(rings):
+            if r:
+                out.write(",")
+            _write_ring(out, coords, precision)
+        out.write("]")
+    out.write("]}" if is_multi else "}")
+    return out.getvalue()
+
+
+def fixed_geojson(n_vertices: int, holes: int = 0, seed: Optional[int] = None) -> str:
+    return to_geojson(polygon(n_vertices, holes=holes, seed=seed))
+
+
+def _pick_item(client: ApiClient, status: str) -> Optional[int]:
+    response = client.get("/cadastre", params={"status": status, "page_size": 1})
+    assert response.status_code == 200, f"List failed: {response.text}"
+    items = response.json().get("data") or []
+    return item_id(items[0]) if items else None
+
+
+def benchmark(client: ApiClient, item_id: int, sizes: Sequence[int], endpoint: str = "geometry-fix",
+              holes: int = 0, repeat: int = 3) -> List[dict]:
+    """Задержка PATCH /cadastre/{id}/{endpoint} и размер тела в зависимости от числа вершин"""
+    results = []
+    for n in sizes:
+        start = time.perf_counter()
+        geojson = fixed_geojson(n, holes=holes, seed=n)
+        generate_s = time.perf_counter() - start
+
+        body = json.dumps({"fixed_geojson": geojson, "move_distance": 0.0}).encode()
+        latency = LatencyStats(f"{n} vertices")
+        status = None
+        for _ in range(repeat):
+            with latency.measure():
+                response = client.request("PATCH", f"/cadastre/{item_id}/{endpoint}",
+                                          data=body)
+            status = response.status_code
+
+        summary = latency.summary()
+        results.append({
+            "vertices": n,
+            "payload_bytes": len(body),
+            "generate_s": generate_s,
+            "status": status,
+            "p50_s": summary["p50"],
+            "max_s": summary["max"],
+        })
+        print(f"  {n:>9} vertices: {len(body):>11,} bytes, status {status}, "
+              f"p50 {summary['p50'] * 1000:.0f}ms, generated in {generate_s * 1000:.0f}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geometry payload scaling benchmark")
+    parser.add_argument("--sizes", default="4,100,1000,10000,100000,1000000")
+    parser.add_argument("--holes", type=int, default=0)
+    parser.add_argument("--endpoint", choices=("geometry-fix", "edit"), default="geometry-fix")
+    parser.add_argument("--item-id", type=int)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--username", default="rool1")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    client = ApiClient(args.username, args.password)
+    client.login()
+    item_id = args.item_id or _pick_item(client, args.endpoint.replace("-", "_"))
+    if not item_id:
+        raise SystemExit(f"No items with status '{args.endpoint}' available")
+
+    print(f"✓ Benchmarking PATCH /cadastre/{item_id}/{args.endpoint}")
+    results = benchmark(client, item_id, sizes, args.endpoint, args.holes, args.repeat)
+
+    print("\nServer latency p50 (ms) by vertex count:")
+    print(bar_chart([(f"{r['vertices']:,}", r["p50_s"] * 1000) for r in results], unit="ms"))
+    print("\nPayload size (KB) by vertex count:")
+    print(bar_chart([(f"{r['vertices']:,}", r["payload_bytes"] / 1024) for r in results],
+                    unit="KB", log=True))
+
+
+if __name__ == "__main__":
+    main()
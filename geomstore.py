@@ -0,0 +1,295 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import geomcheck
+from movecheck import PackedRings, pack
+from records import iter_records
+
+
+MAGIC = b"ETGEOM\x00\x01"
+# quantum, записи, кольца, позиций в int16-блоке, позиций в int32-блоке
+HEADER = struct.Struct("<8sdQQQQ")
+QUANTUM = 1e-7
+
+KIND_POLYGON = 0
+KIND_MULTIPOLYGON = 1
+RING_EXTERIOR = 1
+RING_WIDE = 2
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _blob_offsets(ring_lengths: np.ndarray, wide: np.ndarray) -> np.ndarray:
+    """Начало разностей кольца в его блоке (int16 или int32): кольца идут в блоках по порядку"""
+    body_lengths = ring_lengths.astype(np.int64) - 1
+    offsets = np.zeros(len(ring_lengths), dtype=np.int64)
+    for mask in (~wide, wide):
+        group = body_lengths[mask]
+        offsets[mask] = np.cumsum(group) - group
+    return offsets
+
+
+def _layout(n_records: int, n_rings: int, n16: int, n32: int) -> List[Tuple[str, np.dtype, tuple]]:
+    return [
+        ("ids", np.dtype("<i8"), (n_records,)),
+        ("kinds", np.dtype("u1"), (n_records,)),
+        ("record_rings", np.dtype("<i8"), (n_records + 1,)),
+        ("ring_flags", np.dtype("u1"), (n_rings,)),
+        ("ring_lengths", np.dtype("<i4"), (n_rings,)),
+        ("ring_origins", np.dtype("<i4"), (n_rings, 2)),
+        ("deltas16", np.dtype("<i2"), (n16, 2)),
+        ("deltas32", np.dtype("<i4"), (n32, 2)),
+    ]
+
+
+def encode(ids: Sequence[int], parsed: Sequence, quantum: float = QUANTUM) -> Dict[str, np.ndarray]:
+    """Разобранные геометрии -> секции файла.
+
+    Координаты квантуются в int32 (шаг quantum градусов), кольцо хранится как
+    первая позиция + разности соседних позиций. Кольца, у которых все
+    разности помещаются в int16, пишутся в узкий блок — для участков это
+    почти все кольца, т.е. ~4 байта на вершину вместо ~25 в GeoJSON.
+    """
+    packed = pack(parsed)
+    lengths = packed.ring_lengths
+    starts = packed.ring_starts
+    q = np.round(packed.coords / quantum).astype(np.int64)
+    if len(q) and np.abs(q).max() > np.iinfo(np.int32).max:
+        raise ValueError("Coordinates out of range for int32 quantization")
+
+    deltas = np.diff(q, axis=0, prepend=q[:1])
+    deltas[starts] = 0
+    if len(q):
+        wide = np.maximum.reduceat(np.abs(deltas).max(axis=1), starts) > np.iinfo(np.int16).max
+    else:
+        wide = np.zeros(0, dtype=bool)
+    body = np.ones(len(q), dtype=bool)
+    body[starts] = False
+    ring_of = np.repeat(np.arange(len(starts)), lengths)
+    narrow_pos = body & ~wide[ring_of]
+    wide_pos = body & wide[ring_of]
+
+    record_rings = np.searchsorted(packed.ring_record, np.arange(len(parsed) + 1))
+    return {
+        "ids": np.asarray(ids, dtype=np.int64),
+        "kinds": np.array([KIND_MULTIPOLYGON if kind == "MultiPolygon" else KIND_POLYGON
+                           for kind, _ in parsed], dtype=np.uint8),
+        "record_rings": record_rings.astype(np.int64),
+        "ring_flags": ((packed.ring_sign > 0) * RING_EXTERIOR + wide * RING_WIDE).astype(np.uint8),
+        "ring_lengths": lengths.astype(np.int32),
+        "ring_origins": q[starts].astype(np.int32).reshape(-1, 2),
+        "deltas16": deltas[narrow_pos].astype(np.int16).reshape(-1, 2),
+        "deltas32": deltas[wide_pos].astype(np.int32).reshape(-1, 2),
+    }
+
+
+def write(path: str, ids: Sequence[int], geometries: Sequence,
+          quantum: float = QUANTUM) -> Dict[str, int]:
+    """Запись хранилища (GeoJSON-строки/dict или результаты parse_geometry); атомарно через tmp"""
+    parsed = [g if isinstance(g, tuple) else geomcheck.parse_geometry(g) for g in geometries]
+    sections = encode(ids, parsed, quantum)
+    header = HEADER.pack(MAGIC, quantum, len(parsed), len(sections["ring_lengths"]),
+                         len(sections["deltas16"]), len(sections["deltas32"]))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(b"\0" * (_aligned(len(header)) - len(header)))
+            for name, dtype, _ in _layout(len(parsed), len(sections["ring_lengths"]),
+                                          len(sections["deltas16"]), len(sections["deltas32"])):
+                data = np.ascontiguousarray(sections[name], dtype=dtype).tobytes()
+                f.write(data)
+                f.write(b"\0" * (_aligned(len(data)) - len(data)))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return {"records": len(parsed), "rings": len(sections["ring_lengths"]),
+            "bytes": os.path.getsize(path)}
+
+
+class GeometryStore:
+    """Хранилище геометрий только для чтения: секции отображаются через mmap без копирования,
+    кольца декодируются в NumPy по запросу (одна запись или пакетом)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.quantum, n_records, n_rings, n16, n32 = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a geometry store")
+
+        offset = _aligned(HEADER.size)
+        for name, dtype, shape in _layout(n_records, n_rings, n16, n32):
+            count = int(np.prod(shape))
+            array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset).reshape(shape)
+            setattr(self, name, array)
+            offset += _aligned(count * dtype.itemsize)
+        self.ring_offsets = _blob_offsets(self.ring_lengths, (self.ring_flags & RING_WIDE).astype(bool))
+        self._index: Optional[Dict[int, int]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for name, _, _ in _layout(0, 0, 0, 0):
+            setattr(self, name, None)
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Снаружи ещё живут массивы-представления; память освободится вместе с ними
+            pass
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, item_id: int) -> int:
+        if self._index is None:
+            self._index = {item_id: i for i, item_id in enumerate(self.ids.tolist())}
+        return self._index[item_id]
+
+    def __contains__(self, item_id: int) -> bool:
+        try:
+            self.index(item_id)
+            return True
+        except KeyError:
+            return False
+
+    def _decode(self, rings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Кольца с указанными номерами -> (coords float64, длины колец)"""
+        lengths = self.ring_lengths[rings].astype(np.int64)
+        starts = np.cumsum(lengths) - lengths
+        q = np.empty((int(lengths.sum()), 2), dtype=np.int64)
+        q[starts] = self.ring_origins[rings]
+
+        wide = (self.ring_flags[rings] & RING_WIDE).astype(bool)
+        body_lengths = lengths - 1
+        body = np.ones(len(q), dtype=bool)
+        body[starts] = False
+        ring_of = np.repeat(np.arange(len(rings)), lengths)
+        for mask, blob in ((~wide, self.deltas16), (wide, self.deltas32)):
+            group = body_lengths[mask]
+            if not group.sum():
+                continue
+            source = np.repeat(self.ring_offsets[rings][mask], group) + np.arange(group.sum()) - np.repeat(
+                np.cumsum(group) - group, group)
+            q[body & mask[ring_of]] = blob[source]
+
+        # Сегментированная накопленная сумма: разности -> абсолютные координаты в каждом кольце
+        cumulative = np.cumsum(q, axis=0)
+        q = cumulative - np.repeat(cumulative[starts] - q[starts], lengths, axis=0)
+        return q * self.quantum, lengths
+
+    def parsed(self, i: int) -> Tuple[str, List[List[np.ndarray]]]:
+        """Запись i в виде результата geomcheck.parse_geometry"""
+        rings = np.arange(self.record_rings[i], self.record_rings[i + 1])
+        coords, lengths = self._decode(rings)
+        polygons: List[List[np.ndarray]] = []
+        for ring, flags, ring_coords in zip(rings, self.ring_flags[rings],
+                                            np.split(coords, np.cumsum(lengths)[:-1])):
+            if flags & RING_EXTERIOR or not polygons:
+                polygons.append([])
+            polygons[-1].append(ring_coords)
+        kind = "MultiPolygon" if self.kinds[i] == KIND_MULTIPOLYGON else "Polygon"
+        return kind, polygons
+
+    def geometry(self, i: int) -> Dict:
+        kind, polygons = self.parsed(i)
+        rings = [[ring.tolist() for ring in polygon] for polygon in polygons]
+        return {"type": kind, "coordinates": rings if kind == "MultiPolygon" else rings[0]}
+
+    def packed(self, records: Optional[Iterable[int]] = None,
+               exteriors_only: bool = False) -> PackedRings:
+        """Пакетное декодирование в PackedRings; ring_record — позиция в records"""
+        if records is None:
+            records = np.arange(len(self))
+        records = np.asarray(list(records) if not isinstance(records, np.ndarray) else records,
+                             dtype=np.int64)
+        first = self.record_rings[records]
+        counts = self.record_rings[records + 1] - first
+        rings = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        owner = np.repeat(np.arange(len(records)), counts)
+        exterior = (self.ring_flags[rings] & RING_EXTERIOR).astype(bool)
+        if exteriors_only:
+            rings, owner, exterior = rings[exterior], owner[exterior], exterior[exterior]
+        coords, lengths = self._decode(rings)
+        return PackedRings(coords, np.cumsum(lengths) - lengths, owner,
+                           np.where(exterior, 1.0, -1.0))
+
+
+def build_from_items(path: str, items: Iterable[Dict], field: str = "location") -> Dict[str, int]:
+    """Хранилище из записей /cadastre (поле location или fixed_geojson)"""
+    ids, parsed, geojson_bytes, skipped = [], [], 0, 0
+    for record in iter_records(items):
+        value = getattr(record, field)
+        if not value:
+            continue
+        try:
+            parsed.append(geomcheck.parse_geometry(value))
+        except geomcheck.GeometryError:
+            skipped += 1
+            continue
+        ids.append(record.id)
+        geojson_bytes += len(value if isinstance(value, str) else json.dumps(value))
+    stats = write(path, ids, parsed)
+    stats.update(geojson_bytes=geojson_bytes, skipped=skipped)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a compact geometry store")
+    parser.add_argument("path")
+    parser.add_argument("--synthetic", type=int, help="Записать N сгенерированных участков")
+    parser.add_argument("--vertices", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        import geomgen
+        rng = np.random.default_rng(0)
+        texts = [geomgen.fixed_geojson(args.vertices, seed=int(s))
+                 for s in rng.integers(2 ** 31, size=args.synthetic)]
+        stats = write(args.path, range(len(texts)), texts)
+        geojson_bytes = sum(len(t) for t in texts)
+        print(f"✓ Wrote {stats['records']} records: {stats['bytes']:,} bytes "
+              f"vs {geojson_bytes:,} bytes of GeoJSON ({geojson_bytes / stats['bytes']:.1f}x)")
+
+        start = time.perf_counter()
+        for text in texts:
+            geomcheck.parse_geometry(text)
+        parse_s = time.perf_counter() - start
+    else:
+        parse_s = None
+
+    start = time.perf_counter()
+    with GeometryStore(args.path) as store:
+        packed = store.packed()
+        load_s = time.perf_counter() - start
+        wide = int(np.count_nonzero(store.ring_flags & RING_WIDE))
+        print(f"✓ {len(store)} records, {len(store.ring_lengths)} rings ({wide} with int32 deltas), "
+              f"{len(packed.coords)} positions decoded in {load_s * 1000:.0f}ms")
+        del packed
+    if parse_s is not None:
+        print(f"  GeoJSON parse of the same data: {parse_s * 1000:.0f}ms "
+              f"({parse_s / load_s:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+
+# Бинарные ресурсы, которые почти не меняются после загрузки
+DOCUMENT_PATTERN = re.compile(r"/cadastre/\d+/(governor_decree|screenshot)$")
+
+# v2: ключи с хэшем Authorization (cache_key); записи старого индекса без него удаляются
+INDEX_NAME = "index-v2.json"
+LEGACY_INDEX_NAMES = ("index.json",)
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+class CacheStats:
+    """Счётчики попаданий, ревалидаций и промахов кэша"""
+
+    def __init__(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+        self.no_validators = set()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, size: int = 0, url: Optional[str] = None):
+        with self._lock:
+            if kind == "hit":
+                self.hits += 1
+                self.bytes_saved += size
+            elif kind == "revalidated":
+                self.revalidated += 1
+                self.bytes_saved += size
+            elif kind == "miss":
+                self.misses += 1
+                self.bytes_downloaded += size
+            elif kind == "no_validators":
+                self.no_validators.add(url)
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.revalidated + self.misses
+
+    def ratios(self) -> Dict[str, float]:
+        total = self.requests or 1
+        return {
+            "hit": self.hits / total,
+            "revalidated": self.revalidated / total,
+            "miss": self.misses / total,
+        }
+
+    def report(self) -> str:
+        ratios = self.ratios()
+        lines = [
+            f"HTTP cache: {self.requests} requests, hit {ratios['hit']:.0%}, "
+            f"revalidated {ratios['revalidated']:.0%}, miss {ratios['miss']:.0%}",
+            f"  Bytes saved: {self.bytes_saved}, downloaded: {self.bytes_downloaded}",
+        ]
+        if self.no_validators:
+            lines.append(f"⚠ {len(self.no_validators)} URLs returned no ETag/Last-Modified "
+                         f"and cannot be revalidated:")
+            lines.extend(f"    {url}" for url in sorted(self.no_validators)[:10])
+        return "\n".join(lines)
+
+
+class DiskCache:
+    """Дисковое хранилище ответов с ограничением по размеру и вытеснением LRU.
+
+    Методы принимают ключ записи — URL или результат cache_key().
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._drop_legacy()
+
+        index_path = os.path.join(directory, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                for key, meta in json.load(f):
+                    if os.path.exists(self._body_path(key)):
+                        self._entries[key] = meta
+                        self.total_bytes += meta["size"]
+
+    def _drop_legacy(self):
+        for name in LEGACY_INDEX_NAMES:
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for key, _ in json.load(f):
+                    self._remove_body(key)
+            os.remove(path)
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".body")
+
+    def get(self, url: str):
+        key = self.key(url)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return None, None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._body_path(key), "rb") as f:
+                return meta, f.read()
+        except FileNotFoundError:
+            self.delete(url)
+            return None, None
+
+    def open(self, url: str):
+        """Как get(), но тело — открытый файл: для потоковых читателей без загрузки в память"""
+        key = self.key(url)
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None:
+                return None, None
+            self._entries.move_to_end(key)
+        try:
+            return meta, open(self._body_path(key), "rb")
+        except FileNotFoundError:
+            self.delete(url)
+            return None, None
+
+    def put(self, url: str, meta: Dict, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        path = self.pending_path()
+        with open(path, "wb") as f:
+            f.write(body)
+        self.commit(url, meta, path, len(body))
+
+    def pending_path(self) -> str:
+        """Временный файл для тела, которое ещё пишется"""
+        return os.path.join(self.directory, f"{uuid.uuid4().hex}.part")
+
+    def commit(self, url: str, meta: Dict, path: str, size: int):
+        """Переместить полностью записанное тело из pending_path() в кэш"""
+        key = self.key(url)
+        os.replace(path, self._body_path(key))
+        meta = dict(meta, size=size)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.total_bytes -= old["size"]
+            self._entries[key] = meta
+            self.total_bytes += meta["size"]
+            self._evict()
+            self._save_index()
+
+    def touch(self, url: str, meta: Dict):
+        key = self.key(url)
+        with self._lock:
+            if key in self._entries:
+                self._entries[key].update(meta)
+                self._entries.move_to_end(key)
+                self._save_index()
+
+    def delete(self, url: str):
+        key = self.key(url)
+        with self._lock:
+            meta = self._entries.pop(key, None)
+            if meta:
+                self.total_bytes -= meta["size"]
+                self._remove_body(key)
+                self._save_index()
+
+    def _remove_body(self, key: str):
+        try:
+            os.remove(self._body_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, meta = self._entries.popitem(last=False)
+            self.total_bytes -= meta["size"]
+            self._remove_body(key)
+
+    def _save_index(self):
+        index_path = os.path.join(self.directory, INDEX_NAME)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(index_path + ".tmp", index_path)
+
+
+def cache_key(request: requests.PreparedRequest) -> str:
+    """URL плюс хэш Authorization: ответ, полученный одной ролью, не отдаётся другой"""
+    auth = request.headers.get("Authorization")
+    if not auth:
+        return request.url
+    return f"{request.url}#auth={hashlib.sha256(auth.encode()).hexdigest()}"
+
+
+class CachingAdapter(HTTPAdapter):
+    """Transport adapter: кэш GET-ответов с учётом Cache-Control, ETag и Last-Modified.
+
+    Записи разделены по токену. Ответ на запрос с авторизацией отдаётся из кэша
+    без обращения к серверу, только если он помечен Cache-Control: public; иначе
+    запрос ревалидируется, и сервер сам вернёт 401/403 для отозванного токена.
+    """
+
+    def __init__(self, cache: DiskCache, match: Optional[Callable[[str], bool]] = None,
+                 stats: Optional[CacheStats] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.match = match
+        self.stats = stats or CacheStats()
+
+    def _cacheable_request(self, request: requests.PreparedRequest) -> bool:
+        if request.method != "GET" or "Range" in request.headers:
+            return False
+        return self.match is None or bool(self.match(request.url))
+
+    def _from_cache(self, request: requests.PreparedRequest, meta: Dict,
+                    body) -> requests.Response:
+        """Ответ из кэша; body — bytes или открытый файл (DiskCache.open)"""
+        raw = HTTPResponse(
+            body=io.BytesIO(body) if isinstance(body, bytes) else body,
+            headers=meta["headers"],
+            status=meta["status"],
+            reason="OK",
+            preload_content=False,
+            decode_content=False,
+        )
+        response = self.build_response(request, raw)
+        response.from_cache = True
+        return response
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if not self._cacheable_request(request):
+            return super().send(request, **kwargs)
+
+        url = request.url
+        key = cache_key(request)
+        stream = kwargs.get("stream", False)
+        authorized = "Authorization" in request.headers
+        # Потоковому читателю тело отдаётся файлом, а не целиком из памяти
+        meta, body = self.cache.open(key) if stream else self.cache.get(key)
+        if meta is not None:
+            age = time.time() - meta["stored_at"]
+            max_age = meta.get("max_age")
+            shared = meta.get("public") or not authorized
+            if shared and not meta.get("no_cache") and max_age is not None and age < max_age:
+                self.stats.record("hit", meta["size"])
+                return self._from_cache(request, meta, body)
+            if meta.get("etag"):
+                request.headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request.headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            fresh = self._meta(response, meta)
+            self.cache.touch(key, fresh)
+            response.close()
+            self.stats.record("revalidated", meta["size"])
+            return self._from_cache(request, dict(meta, **fresh), body)
+        if stream and meta is not None:
+            body.close()
+
+        if response.status_code != 200:
+            return response
+        if stream:
+            return self._tee(key, response)
+
+        content = response.content
+        self.stats.record("miss", len(content))
+        directives = parse_cache_control(response.headers.get("Cache-Control"))
+        fresh = self._meta(response)
+        if not fresh["etag"] and not fresh["last_modified"]:
+            self.stats.record("no_validators", url=url)
+        if "no-store" not in directives:
+            self.cache.put(key, fresh, content)
+        return response
+
+    def _tee(self, key: str, response: requests.Response) -> requests.Response:
+        """Потоковый ответ: тело пишется в файл кэша по мере чтения вызывающим.
+
+        Запись фиксируется, только когда прочитано ровно Content-Length байт;
+        сжатые ответы и ответы без длины проходят мимо кэша.
+        """
+        headers = response.headers
+        length = headers.get("Content-Length", "")
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        encoding = headers.get("Content-Encoding", "identity").lower()
+        self.stats.record("miss", int(length) if length.isdigit() else 0)
+        if not headers.get("ETag") and not headers.get("Last-Modified"):
+            self.stats.record("no_validators", url=response.url)
+        if ("no-store" in directives or encoding != "identity" or not length.isdigit()
+                or int(length) > self.cache.max_bytes):
+            return response
+
+        size = int(length)
+        path = self.cache.pending_path()
+        part = open(path, "wb")
+        written = [0]
+        raw, read, close = response.raw, response.raw.read, response.close
+
+        def abort():
+            if not part.closed:
+                part.close()
+                os.remove(path)
+
+        def tee_read(*args, **kwargs):
+            data = read(*args, **kwargs)
+            if data and not part.closed:
+                part.write(data)
+                written[0] += len(data)
+                if written[0] > size:
+                    abort()
+                elif written[0] == size:
+                    part.close()
+                    self.cache.commit(key, self._meta(response, size=size), path, size)
+            return data
+
+        def tee_close():
+            # Тело дочитано не до конца — недописанный файл удаляется
+            abort()
+            close()
+
+        # stream(), readinto() и iter_content() читают через raw.read
+        raw.read = tee_read
+        response.close = tee_close
+        return response
+
+    @staticmethod
+    def _meta(response: requests.Response, previous: Optional[Dict] = None,
+              size: Optional[int] = None) -> Dict:
+        directives = parse_cache_control(response.headers.get("Cache-Control"))
+        max_age = directives.get("max-age")
+        headers = dict((previous or {}).get("headers", {}))
+        # Тело хранится уже раскодированным, длину задаёт сохранённое тело
+        headers.update((name, value) for name, value in response.headers.items()
+                       if name.lower() not in ("content-length", "content-encoding",
+                                               "transfer-encoding"))
+        if previous is None:
+            headers["Content-Length"] = str(len(response.content) if size is None else size)
+        return {
+            "status": (previous or {}).get("status", response.status_code),
+            "headers": headers,
+            "etag": response.headers.get("ETag") or (previous or {}).get("etag"),
+            "last_modified": (response.headers.get("Last-Modified")
+                              or (previous or {}).get("last_modified")),
+            "max_age": int(max_age) if max_age and max_age.isdigit() else None,
+            "no_cache": "no-cache" in directives or "must-revalidate" in directives,
+            "public": "public" in directives or bool((previous or {}).get("public")),
+            "stored_at": time.time(),
+        }
+
+
+def install(session: requests.Session, directory: str, max_bytes: int = 512 * 1024 * 1024,
+            pattern=DOCUMENT_PATTERN, prefix: str = "https://") -> CachingAdapter:
+    """Подключить кэширующий адаптер к сессии для URL, подходящих под pattern"""
+    match = pattern.search if pattern is not None else None
+    adapter = CachingAdapter(DiskCache(directory, max_bytes), match=match)
+    session.mount(prefix, adapter)
+    return adapter
@@ -0,0 +1,159 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import requests
+
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+# Символы, которыми может продолжаться число JSON
+_NUMBER_TAIL = frozenset("0123456789.eE+-")
+
+
+class ListStream:
+    """Потоковый разбор ответа вида {"data": [...], "meta": {...}}.
+
+    Элементы data[] отдаются по одному по мере поступления байтов: буфер
+    держит не больше одного элемента плюс чанк, поэтому пиковая память
+    ограничена размером элемента, а не страницы. Остальные ключи верхнего
+    уровня попадают в meta сразу, как только разобраны (если сервер пишет
+    meta перед data — до первого элемента).
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str = "data", encoding: str = "utf-8"):
+        self.key = key
+        self.meta: Dict[str, Any] = {}
+        self.items_seen = 0
+        self.bytes_read = 0
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._iterator: Optional[Iterator[Any]] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._iterator is None:
+            self._iterator = self._parse()
+        return self._iterator
+
+    def _fill(self) -> bool:
+        """Дочитать чанк; False — поток закончился"""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            text = self._decoder.decode(chunk)
+            if not text:
+                continue
+            if self._pos > len(self._buf) // 2:
+                self._buf = self._buf[self._pos:]
+                self._pos = 0
+            self._buf += text
+            return True
+        self._buf += self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos}, got {found!r}")
+        self._pos += 1
+
+    def _grow(self) -> bool:
+        """Дочитать, пока недоразобранный хвост не вырастет вдвое: разбор длинного
+        элемента повторяется O(log) раз, а не на каждом чанке"""
+        target = max(2 * (len(self._buf) - self._pos), 1)
+        grew = False
+        while len(self._buf) - self._pos < target and self._fill():
+            grew = True
+        return grew
+
+    def _value(self) -> Any:
+        """Одно значение через raw_decode; при обрыве на границе чанка дочитываем и повторяем"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._grow():
+                    raise
+                continue
+            # Число на границе чанка могло быть обрезано: "12" из "123", "12." из "12.5", "1e" из "1e5"
+            if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                    and (end == len(self._buf) or self._buf[end] in _NUMBER_TAIL) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _parse(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        item = self._value()
+                        self.items_seen += 1
+                        yield item
+                        separator = self._peek()
+                        self._pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"Expected ',' or ']' in {self.key}[], got {separator!r}")
+            else:
+                self.meta[key] = self._value()
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' at top level, got {separator!r}")
+
+    def drain(self) -> Dict[str, Any]:
+        """Дочитать поток до конца (пропуская элементы) и вернуть meta"""
+        for _ in self:
+            pass
+        return self.meta
+
+
+class ResponseStream(ListStream):
+    """ListStream поверх requests.Response(stream=True); соединение закрывается по выходу"""
+
+    def __init__(self, response: requests.Response, key: str = "data",
+                 chunk_size: int = CHUNK_SIZE):
+        self.response = response
+        super().__init__(response.iter_content(chunk_size), key, response.encoding or "utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.response.close()
@@ -0,0 +1,343 @@
+import argparse
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import geomcheck
+from apiclient import ApiClient
+from geomcheck import EARTH_RADIUS_M, PAIR_BLOCK
+from records import iter_records
+
+
+# Хаусдорф считается по всем парам вершин; длинные кольца прореживаются до этого числа
+HAUSDORFF_MAX_VERTICES = 2000
+
+
+@dataclass
+class PackedRings:
+    """Кольца многих геометрий в одном массиве: coords (N, 2) и границы колец"""
+    coords: np.ndarray
+    ring_starts: np.ndarray
+    ring_record: np.ndarray
+    ring_sign: np.ndarray
+
+    @property
+    def ring_lengths(self) -> np.ndarray:
+        return np.diff(np.append(self.ring_starts, len(self.coords)))
+
+
+@dataclass
+class MoveReport:
+    ids: List
+    reported: np.ndarray
+    centroid_m: np.ndarray
+    hausdorff_m: np.ndarray
+    flagged: np.ndarray
+    skipped: Dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    def flagged_rows(self) -> List[Tuple]:
+        return [(self.ids[i], float(self.reported[i]), float(self.centroid_m[i]),
+                 float(self.hausdorff_m[i])) for i in np.flatnonzero(self.flagged)]
+
+
+def haversine(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Расстояние по большому кругу в метрах, векторно по массивам градусов"""
+    lon1, lat1, lon2, lat2 = (np.radians(v) for v in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def pack(geometries: Sequence) -> PackedRings:
+    """Упаковка разобранных геометрий (результат geomcheck.parse_geometry) подряд"""
+    rings, owners, signs = [], [], []
+    for record, (_, polygons) in enumerate(geometries):
+        for polygon in polygons:
+            for r, ring in enumerate(polygon):
+                rings.append(ring)
+                owners.append(record)
+                signs.append(1.0 if r == 0 else -1.0)
+    lengths = np.array([len(r) for r in rings], dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    coords = np.concatenate(rings) if rings else np.empty((0, 2))
+    return PackedRings(coords, starts, np.array(owners, dtype=np.int64), np.array(signs))
+
+
+def centroids(packed: PackedRings, n_records: int) -> np.ndarray:
+    """Центроиды площадей (lon, lat) всех записей: шнурование по рёбрам + np.add.reduceat по кольцам"""
+    coords, starts = packed.coords, packed.ring_starts
+    lengths = packed.ring_lengths
+    # Относительно первой точки кольца — иначе теряется точность на произведениях градусов
+    rel = coords - np.repeat(coords[starts], lengths, axis=0)
+    x, y = rel[:, 0], rel[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    # Последняя позиция кольца замыкающая: ребра «в следующее кольцо» нет
+    cross[starts + lengths - 1] = 0.0
+
+    area = 0.5 * np.add.reduceat(cross, starts)
+    cx = np.add.reduceat((x + x1) * cross, starts) / 6.0
+    cy = np.add.reduceat((y + y1) * cross, starts) / 6.0
+
+    weight = np.abs(area) * packed.ring_sign
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ring_cx = coords[starts, 0] + cx / area
+        ring_cy = coords[starts, 1] + cy / area
+    degenerate = area == 0
+    weight[degenerate] = 0.0
+    ring_cx[degenerate] = 0.0
+    ring_cy[degenerate] = 0.0
+
+    owner = packed.ring_record
+    total = np.bincount(owner, weights=weight, minlength=n_records)
+    out = np.empty((n_records, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, 0] = np.bincount(owner, weights=weight * ring_cx, minlength=n_records) / total
+        out[:, 1] = np.bincount(owner, weights=weight * ring_cy, minlength=n_records) / total
+
+    # Вырожденные записи (нулевая площадь) — среднее вершин
+    flat = total == 0
+    if flat.any():
+        vertex_owner = np.repeat(owner, lengths)
+        counts = np.bincount(vertex_owner, minlength=n_records)
+        for axis in (0, 1):
+            sums = np.bincount(vertex_owner, weights=coords[:, axis], minlength=n_records)
+            out[flat, axis] = sums[flat] / np.maximum(counts[flat], 1)
+    return out
+
+
+def _vertices(packed: PackedRings, n_records: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Вершины без замыкающих позиций, прореженные до HAUSDORFF_MAX_VERTICES на запись"""
+    lengths = packed.ring_lengths
+    keep = np.ones(len(packed.coords), dtype=bool)
+    keep[packed.ring_starts + lengths - 1] = False
+    owner = np.repeat(packed.ring_record, lengths)[keep]
+    coords = packed.coords[keep]
+
+    counts = np.bincount(owner, minlength=n_records)
+    if counts.max(initial=0) > HAUSDORFF_MAX_VERTICES:
+        starts = np.cumsum(counts) - counts
+        rank = np.arange(len(owner)) - starts[owner]
+        stride = np.maximum(counts // HAUSDORFF_MAX_VERTICES, 1)
+        sample = rank % stride[owner] == 0
+        owner, coords = owner[sample], coords[sample]
+    return coords, owner
+
+
+def _directed_hausdorff(a: np.ndarray, a_owner: np.ndarray, b: np.ndarray, b_owner: np.ndarray,
+                        n_records: int) -> np.ndarray:
+    """max по вершинам a записи от min расстояния до вершин b той же записи.
+
+    Пары (вершина a, вершина b) одной записи строятся блоками по PAIR_BLOCK,
+    минимум по строке — np.minimum.reduceat, максимум по записи — np.fmax.at.
+    """
+    b_counts = np.bincount(b_owner, minlength=n_records)
+    b_starts = np.cumsum(b_counts) - b_counts
+    a_lon, a_lat = np.radians(a[:, 0]), np.radians(a[:, 1])
+    b_lon, b_lat = np.radians(b[:, 0]), np.radians(b[:, 1])
+    a_cos, b_cos = np.cos(a_lat), np.cos(b_lat)
+
+    counts = b_counts[a_owner]
+    cumulative = np.cumsum(counts)
+    nearest = np.full(len(a), np.inf)
+    block_start = 0
+    while block_start < len(a):
+        base = cumulative[block_start - 1] if block_start else 0
+        block_end = int(np.searchsorted(cumulative, base + PAIR_BLOCK, side="right"))
+        block_end = max(block_end, block_start + 1)
+        block_counts = counts[block_start:block_end]
+        total = int(block_counts.sum())
+        if total:
+            row_starts = np.cumsum(block_counts) - block_counts
+            rows = np.repeat(np.arange(block_start, block_end), block_counts)
+            cols = b_starts[a_owner[rows]] + np.arange(total) - np.repeat(row_starts, block_counts)
+            h = (np.sin((b_lat[cols] - a_lat[rows]) / 2) ** 2
+                 + a_cos[rows] * b_cos[cols] * np.sin((b_lon[cols] - a_lon[rows]) / 2) ** 2)
+            present = block_counts > 0
+            nearest[block_start:block_end][present] = np.minimum.reduceat(h, row_starts[present])
+        block_start = block_end
+
+    distance = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(nearest, 1.0)))
+    out = np.full(n_records, np.nan)
+    np.fmax.at(out, a_owner, distance)
+    return out
+
+
+def hausdorff(original: PackedRings, fixed: PackedRings, n_records: int) -> np.ndarray:
+    """Симметричное расстояние Хаусдорфа по вершинам (метры) для каждой записи"""
+    a, a_owner = _vertices(original, n_records)
+    b, b_owner = _vertices(fixed, n_records)
+    return np.fmax(_directed_hausdorff(a, a_owner, b, b_owner, n_records),
+                   _directed_hausdorff(b, b_owner, a, a_owner, n_records))
+
+
+def verify(ids: Sequence, originals: Sequence, fixeds: Sequence, reported: Sequence[float],
+           tolerance_m: float = 1.0, relative: float = 0.1) -> MoveReport:
+    """Сверка заявленного move_distance с фактическим сдвигом геометрии.
+
+    Для чистого переноса сдвиг центроида равен расстоянию Хаусдорфа; при
+    перерисовке границы правдоподобный move_distance лежит между ними.
+    Запись помечается, если заявленное значение выходит за этот коридор
+    больше чем на tolerance_m + relative * сдвиг.
+    """
+    start = time.perf_counter()
+    skipped: Dict[str, int] = {}
+    kept_ids, parsed_original, parsed_fixed, kept_reported = [], [], [], []
+    for item_id, original, fixed, distance in zip(ids, originals, fixeds, reported):
+        try:
+            distance = float(distance)
+            parsed = (geomcheck.parse_geometry(original), geomcheck.parse_geometry(fixed))
+        except (TypeError, ValueError):
+            reason = "bad move_distance" if not isinstance(distance, float) else "bad geometry"
+            skipped[reason] = skipped.get(reason, 0) + 1
+            continue
+        kept_ids.append(item_id)
+        parsed_original.append(parsed[0])
+        parsed_fixed.append(parsed[1])
+        kept_reported.append(distance)
+
+    report = _verify_packed(kept_ids, pack(parsed_original), pack(parsed_fixed), kept_reported,
+                            tolerance_m, relative)
+    report.skipped = skipped
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def verify_stores(original, fixed, reported: Dict[int, float], tolerance_m: float = 1.0,
+                  relative: float = 0.1) -> MoveReport:
+    """То же для двух geomstore.GeometryStore (location и fixed_geojson) без разбора JSON"""
+    start = time.perf_counter()
+    ids, distances, skipped = [], [], {}
+    for item_id, distance in reported.items():
+        if item_id not in original or item_id not in fixed:
+            skipped["no geometry in store"] = skipped.get("no geometry in store", 0) + 1
+            continue
+        ids.append(item_id)
+        distances.append(distance)
+    report = _verify_packed(ids, original.packed([original.index(i) for i in ids]),
+                            fixed.packed([fixed.index(i) for i in ids]), distances,
+                            tolerance_m, relative)
+    report.skipped = skipped
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _verify_packed(ids: List, original_packed: PackedRings, fixed_packed: PackedRings,
+                   reported: Sequence[float], tolerance_m: float, relative: float) -> MoveReport:
+    n = len(ids)
+    reported_arr = np.array(reported, dtype=np.float64)
+    if not n:
+        empty = np.empty(0)
+        return MoveReport([], empty, empty, empty, np.zeros(0, dtype=bool))
+
+    c1 = centroids(original_packed, n)
+    c2 = centroids(fixed_packed, n)
+    centroid_m = haversine(c1[:, 0], c1[:, 1], c2[:, 0], c2[:, 1])
+    hausdorff_m = hausdorff(original_packed, fixed_packed, n)
+
+    low = np.minimum(centroid_m, hausdorff_m)
+    high = np.maximum(centroid_m, hausdorff_m)
+    slack = tolerance_m + relative * high
+    flagged = (reported_arr < low - slack) | (reported_arr > high + slack)
+    return MoveReport(list(ids), reported_arr, centroid_m, hausdorff_m, flagged)
+
+
+def collect(items: Iterable[Dict]) -> Tuple[List, List, List, List, int]:
+    """Из записей списка /cadastre — только те, у которых есть исправленная геометрия"""
+    ids, originals, fixeds, reported = [], [], [], []
+    without_fix = 0
+    for record in iter_records(items):
+        if not record.fixed_geojson or not record.location:
+            without_fix += 1
+            continue
+        ids.append(record.id)
+        originals.append(record.location)
+        fixeds.append(record.fixed_geojson)
+        reported.append(record.move_distance)
+    return ids, originals, fixeds, reported, without_fix
+
+
+def crawl(client: ApiClient, params: Optional[Dict] = None, page_size: int = 100,
+          **kwargs) -> MoveReport:
+    start = time.perf_counter()
+    ids, originals, fixeds, reported, without_fix = collect(
+        client.iter_items("/cadastre", params, page_size))
+    fetched = time.perf_counter() - start
+    print(f"✓ Fetched {len(ids) + without_fix} items in {fetched:.1f}s "
+          f"({len(ids)} with fixed geometry)")
+    report = verify(ids, originals, fixeds, reported, **kwargs)
+    if without_fix:
+        report.skipped["no fixed geometry"] = without_fix
+    return report
+
+
+def synthetic(n_records: int, n_vertices: int = 12, wrong: float = 0.05,
+              seed: Optional[int] = None) -> Tuple[List, List, List, List]:
+    """Набор записей с известным сдвигом: перенос на случайное расстояние, часть move_distance неверна"""
+    import geomgen
+
+    rng = np.random.default_rng(seed)
+    ids, originals, fixeds, reported = [], [], [], []
+    cos_lat = math.cos(math.radians(geomgen.UZ_CENTER[1]))
+    for i in range(n_records):
+        center = (geomgen.UZ_CENTER[0] + rng.uniform(-2, 2), geomgen.UZ_CENTER[1] + rng.uniform(-1, 1))
+        rings = geomgen.polygon(n_vertices, center, seed=int(rng.integers(2 ** 31)))
+        distance = float(rng.uniform(0, 30))
+        bearing = rng.uniform(0, 2 * math.pi)
+        shift = np.array([distance * math.cos(bearing) / (geomgen.METERS_PER_DEG * cos_lat),
+                          distance * math.sin(bearing) / geomgen.METERS_PER_DEG])
+        ids.append(i)
+        originals.append(geomgen.to_geojson(rings))
+        fixeds.append(geomgen.to_geojson([r + shift for r in rings]))
+        reported.append(distance * 3 + 10 if rng.random() < wrong else round(distance, 1))
+    return ids, originals, fixeds, reported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify reported move_distance against geometry")
+    parser.add_argument("--status")
+    parser.add_argument("--region-soato")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Допуск, м")
+    parser.add_argument("--relative", type=float, default=0.1, help="Относительный допуск")
+    parser.add_argument("--synthetic", type=int, help="Проверить N сгенерированных записей без сети")
+    parser.add_argument("--snapshot", help="Локальный снимок (snapshot.py) вместо запросов к API")
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        import geomstore
+        import snapshot
+        with snapshot.Snapshot(args.snapshot) as snap:
+            if not os.path.exists(snap.geometry_store_path("fixed_geojson")):
+                snap.build_geometry_stores()
+            reported = snap.move_distances()
+            with geomstore.GeometryStore(snap.geometry_store_path("location")) as original, \
+                    geomstore.GeometryStore(snap.geometry_store_path("fixed_geojson")) as fixed:
+                report = verify_stores(original, fixed, reported, args.tolerance, args.relative)
+    elif args.synthetic:
+        ids, originals, fixeds, reported = synthetic(args.synthetic, seed=0)
+        report = verify(ids, originals, fixeds, reported, args.tolerance, args.relative)
+    else:
+        client = ApiClient(args.username, args.password)
+        client.login()
+        params = {k: v for k, v in (("status", args.status),
+                                    ("region_soato", args.region_soato)) if v}
+        report = crawl(client, params, tolerance_m=args.tolerance, relative=args.relative)
+
+    print(f"✓ Verified {len(report.ids)} records in {report.elapsed:.2f}s")
+    for reason, count in report.skipped.items():
+        print(f"⚠ Skipped {count}: {reason}")
+    rows = report.flagged_rows()
+    print(f"{'✗' if rows else '✓'} {len(rows)} records with inconsistent move_distance")
+    for item_id, reported, centroid, hausdorff_m in rows[:50]:
+        print(f"  ID {item_id}: reported {reported:.1f}m, centroid shift {centroid:.1f}m, "
+              f"Hausdorff {hausdorff_m:.1f}m")
+
+
+if __name__ == "__main__":
+    main()
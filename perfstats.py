@@ -0,0 +1,87 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль q (0..100) с линейной интерполяцией"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(pos)
+    upper = math.ceil(pos)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class LatencyStats:
+    """Накопитель задержек (в секундах), безопасный для потоков"""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def summary(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "mean": sum(samples) / len(samples),
+            "min": min(samples),
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "max": max(samples),
+        }
+
+    def format(self) -> str:
+        s = self.summary()
+        if not s["count"]:
+            return f"{self.name}: no samples"
+        return (
+            f"{self.name}: n={s['count']}, mean {s['mean'] * 1000:.1f}ms, "
+            f"p50 {s['p50'] * 1000:.1f}ms, p95 {s['p95'] * 1000:.1f}ms, "
+            f"p99 {s['p99'] * 1000:.1f}ms, max {s['max'] * 1000:.1f}ms"
+        )
+
+
+def throughput(count: int, elapsed: float) -> float:
+    return count / elapsed if elapsed > 0 else float("inf")
+
+
+def bar_chart(rows: Iterable[Tuple[str, float]], width: int = 40, unit: str = "",
+              log: bool = False) -> str:
+    """Текстовая гистограмма для вывода в терминал (log=True — логарифмическая шкала)"""
+    rows = list(rows)
+    if not rows:
+        return ""
+    scale = (lambda v: math.log10(1 + v)) if log else (lambda v: v)
+    top = max(scale(value) for _, value in rows) or 1
+    label_width = max(len(label) for label, _ in rows)
+    lines = []
+    for label, value in rows:
+        bar = "█" * max(1 if value > 0 else 0, round(width * scale(value) / top))
+        lines.append(f"  {label.rjust(label_width)} │{bar} {value:,.2f}{unit}")
+    return "\n".join(lines)
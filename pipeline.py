@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from apiclient import ApiClient
+from cadasterpush import BASE_TEST_DATA, push_parcel
+from geomgen import METERS_PER_DEG, multipolygon, to_geojson
+from perfstats import LatencyStats, bar_chart, throughput
+from records import CadastreRecord
+from workflow import WorkflowDriver, login_roles
+
+
+PDF_FILE_PATH = "12636_2_230FF8971C606F9DCE94288E49178A0490EBD387.pdf"
+PARCEL_RADIUS_M = 20.0
+# Сетка участков начинается восточнее участка из BASE_TEST_DATA: отступ 3R от его крайней точки
+_FIXTURE_RING = BASE_TEST_DATA["location"]["coordinates"][0]
+_FIXTURE_EAST = max(lon for lon, _ in _FIXTURE_RING)
+_FIXTURE_LAT = (min(lat for _, lat in _FIXTURE_RING) + max(lat for _, lat in _FIXTURE_RING)) / 2
+PARCEL_ORIGIN = (_FIXTURE_EAST + 3 * PARCEL_RADIUS_M / (METERS_PER_DEG * math.cos(math.radians(_FIXTURE_LAT))),
+                 _FIXTURE_LAT)
+# Каждый прогон занимает свой квадрат RUN_BLOCK_M × RUN_BLOCK_M из RUN_SLOTS × RUN_SLOTS,
+# выбранный по run id: разные прогоны не кладут участки в одни и те же клетки
+RUN_BLOCK_M = 1000.0
+RUN_SLOTS = 16
+VISIBILITY_TIMEOUT = 120.0
+POLL_INITIAL = 0.25
+POLL_MAX = 2.0
+HOPS = ("push", "visible", "workflow", "end-to-end")
+
+
+@dataclass
+class Parcel:
+    cadastral_number: str
+    data: Dict
+    cadastre_id: Optional[int] = None
+    status: Optional[str] = None
+    final: Optional[str] = None
+    failed: Optional[str] = None
+
+
+def run_origin(run: str) -> Tuple[float, float]:
+    """Юго-западный центр сетки прогона: квадрат, выбранный по хэшу run id"""
+    slot = int(hashlib.sha256(run.encode()).hexdigest(), 16) % (RUN_SLOTS * RUN_SLOTS)
+    row, col = divmod(slot, RUN_SLOTS)
+    lon0, lat0 = PARCEL_ORIGIN
+    return (lon0 + col * RUN_BLOCK_M / (METERS_PER_DEG * math.cos(math.radians(lat0))),
+            lat0 + row * RUN_BLOCK_M / METERS_PER_DEG)
+
+
+def make_parcels(count: int, run: str, vertices: int = 12) -> List[Parcel]:
+    """count новых участков с уникальными uidSPUnit и кадастровым номером"""
+    # Сетка с шагом 3R плюс зазор 3R до соседнего квадрата должна уместиться в квадрат прогона
+    side = math.ceil(math.sqrt(count))
+    if (side + 1) * 3 * PARCEL_RADIUS_M > RUN_BLOCK_M:
+        raise ValueError(f"{count} parcels do not fit into a {RUN_BLOCK_M:.0f} m run block")
+    parcels = []
+    for i, rings in enumerate(multipolygon(count, vertices, center=run_origin(run), radius_m=PARCEL_RADIUS_M)):
+        data = dict(BASE_TEST_DATA)
+        data["uidSPUnit"] = f"bench_{run}_{i:05d}"
+        data["cadastral_number"] = f"bench_{run}_{i:05d}"
+        data["location"] = json.loads(to_geojson(rings))
+        parcels.append(Parcel(data["cadastral_number"], data))
+    return parcels
+
+
+class PipelineBenchmark:
+    """Участок от push до финального статуса: push → видимость в /cadastre → этапы ролей.
+
+    Каждый участок проходит цепочку в своём потоке, так что этапы разных участков
+    перекрываются, как под реальной нагрузкой. Задержка каждого перехода — отдельно.
+    """
+
+    def __init__(self, driver: WorkflowDriver, reader: ApiClient, document: bytes,
+                 timeout: float = VISIBILITY_TIMEOUT):
+        self.driver = driver
+        self.reader = reader
+        self.document = document
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.hops = {hop: LatencyStats(hop) for hop in HOPS}
+        self.polls = 0
+        self._lock = threading.Lock()
+
+    def wait_visible(self, parcel: Parcel) -> bool:
+        """Опрос /cadastre/cadastre-id/{номер} с растущим интервалом до появления записи"""
+        deadline = time.perf_counter() + self.timeout
+        delay = POLL_INITIAL
+        while True:
+            with self._lock:
+                self.polls += 1
+            response = self.reader.get(f"/cadastre/cadastre-id/{parcel.cadastral_number}")
+            if response.status_code == 200:
+                record = CadastreRecord.from_dict(response.json())
+                parcel.cadastre_id, parcel.status = record.id, record.status
+                return parcel.cadastre_id is not None
+            if time.perf_counter() + delay > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX)
+
+    def process(self, parcel: Parcel) -> Parcel:
+        start = time.perf_counter()
+        with self.hops["push"].measure():
+            response = push_parcel(parcel.data, self.document, self.session)
+        if response.status_code != 201:
+            parcel.failed = f"push: {response.status_code}"
+            return parcel
+
+        pushed = time.perf_counter()
+        if not self.wait_visible(parcel):
+            parcel.failed = f"not visible after {self.timeout:.0f}s"
+            return parcel
+        visible = time.perf_counter()
+        self.hops["visible"].add(visible - pushed)
+
+        trace = self.driver.drive(parcel.cadastre_id, parcel.status)
+        parcel.final = trace.final
+        if trace.failed:
+            parcel.failed = trace.failed
+            return parcel
+        self.hops["workflow"].add(trace.elapsed)
+        if trace.final not in self.driver.model:
+            self.hops["end-to-end"].add(time.perf_counter() - start)
+        return parcel
+
+    def run(self, parcels: List[Parcel], workers: int) -> Dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(self.process, parcels))
+        elapsed = time.perf_counter() - start
+        return {
+            "parcels": len(parcels),
+            "elapsed": elapsed,
+            "throughput": {hop: throughput(self.hops[hop].count, elapsed) for hop in HOPS},
+            "failed": [(p.cadastral_number, p.failed) for p in done if p.failed],
+            "finals": [p.final for p in done if p.final],
+        }
+
+
+def read_document(path: str) -> bytes:
+    if not os.path.exists(path):
+        print(f"⚠ {path} not found, pushing a stub PDF")
+        return b"%PDF-1.7\n%Fake file for autotest\n%%EOF"
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark from agency push to moderation")
+    parser.add_argument("-n", "--parcels", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--pdf", default=PDF_FILE_PATH)
+    parser.add_argument("--timeout", type=float, default=VISIBILITY_TIMEOUT,
+                        help="Сколько ждать появления участка в /cadastre")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    clients = login_roles()
+    driver = WorkflowDriver(clients, error_rate=args.error_rate, seed=args.seed)
+    bench = PipelineBenchmark(driver, clients["geometry_fix"], read_document(args.pdf), args.timeout)
+    parcels = make_parcels(args.parcels, uuid.uuid4().hex[:8])
+    result = bench.run(parcels, args.workers)
+
+    print(f"✓ {args.parcels} parcels in {result['elapsed']:.2f}s, "
+          f"{bench.hops['end-to-end'].count} reached a final status, {bench.polls} visibility polls")
+    for hop in HOPS:
+        stats = bench.hops[hop]
+        print(f"  {stats.format()}, {result['throughput'][hop]:.2f}/s")
+    print("\nTime in workflow stage:")
+    for stats in driver.stage.values():
+        if stats.count:
+            print(f"  {stats.format()}")
+    print("\nHop latency p95 (s):")
+    print(bar_chart([(hop, bench.hops[hop].summary().get("p95", 0.0)) for hop in HOPS
+                     if bench.hops[hop].count], unit="s"))
+    for (source, expected, actual), count in driver.deviations.most_common():
+        print(f"⚠ model: {source} → expected {expected}, got {actual} ({count}x)")
+    for number, reason in result["failed"]:
+        print(f"⚠ {number}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
+
+import pytest
+import requests
+
+from accounts import BAD_TOKEN, PRINCIPALS
+from apiclient import BASE_URL
+from records import CadastreRecord
+
+
+ROLES = ("rool1", "rool2", "rool3", "rool4", "rool5")
+
+# Несуществующий ID: разрешённая операция получает 404, данные не меняются
+MISSING_ID = 999999999
+
+ALLOW = "allow"
+DENY = frozenset({401, 403})
+UNAUTH = frozenset({401})
+Expectation = Union[str, FrozenSet[int], None]
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Строка матрицы; в path подставляются {item}, {cadastre_id} и {missing}"""
+    name: str
+    method: str
+    path: str
+    body: Optional[dict] = None
+
+
+def _expect(default: Expectation = None, **cells: Expectation) -> Dict[str, Expectation]:
+    """Ожидания по участникам: без токена и с неверным токеном — 401, остальные — default"""
+    expected = {principal: default for principal in PRINCIPALS}
+    expected.update(anonymous=UNAUTH, bad_token=UNAUTH)
+    expected.update(cells)
+    return expected
+
+
+def _allow(*principals: str) -> Dict[str, Expectation]:
+    return {principal: ALLOW for principal in principals}
+
+
+# None — ожидание неизвестно: ответ записывается в сетку, но не проверяется
+MATRIX: List[Tuple[Endpoint, Dict[str, Expectation]]] = [
+    (Endpoint("list cadastre", "GET", "/cadastre?page_size=1"),
+     _expect(**_allow(*ROLES))),
+    (Endpoint("get cadastre", "GET", "/cadastre/{item}"),
+     _expect(**_allow(*ROLES))),
+    (Endpoint("get by cadastre-id", "GET", "/cadastre/cadastre-id/{cadastre_id}"),
+     _expect(**_allow("rool1"))),
+    (Endpoint("geometry-fix", "PATCH", "/cadastre/{missing}/geometry-fix", {}),
+     _expect(**_allow("rool1", "rool5"), anonymous=frozenset({401, 404}))),
+    (Endpoint("edit", "PATCH", "/cadastre/{missing}/edit", {}),
+     _expect(**_allow("rool1", "rool5"), anonymous=frozenset({401, 404}))),
+    (Endpoint("building-presence", "PATCH", "/cadastre/{missing}/building-presence", {}),
+     _expect(**_allow("rool1", "rool4", "rool5"), anonymous=frozenset({401, 404}))),
+    (Endpoint("verification", "PATCH", "/cadastre/{missing}/verification", {}),
+     _expect(anonymous=frozenset({401, 404}))),
+    (Endpoint("agency_verification", "PATCH", "/cadastre/{missing}/agency_verification", {}),
+     _expect(**_allow("rool3"), anonymous=frozenset({401, 404}))),
+    (Endpoint("into_moderation", "PATCH", "/cadastre/{missing}/into_moderation", {}),
+     _expect(**_allow("rool4", "rool5"), anonymous=frozenset({401, 404}))),
+    (Endpoint("cadastre_error", "PATCH", "/cadastre/{missing}/cadastre_error", {}),
+     _expect(**_allow("rool4"), anonymous=frozenset({401, 404}))),
+    (Endpoint("list users", "GET", "/users"),
+     _expect(**_allow("root"))),
+    (Endpoint("create user", "POST", "/users", {}),
+     _expect(DENY, root=ALLOW)),
+    (Endpoint("update user", "PUT", "/users/{missing}", {"firstName": "rbac"}),
+     _expect(DENY, root=ALLOW)),
+    (Endpoint("toggle user", "PATCH", "/users/{missing}/toggle-active"),
+     _expect(DENY, root=ALLOW)),
+    (Endpoint("delete user", "DELETE", "/users/{missing}"),
+     _expect(DENY, root=ALLOW)),
+]
+
+
+def passes(expected: Expectation, status: int) -> Optional[bool]:
+    if expected is None:
+        return None
+    if expected == ALLOW:
+        return status not in DENY and status < 500
+    return status in expected
+
+
+@dataclass
+class Cell:
+    endpoint: Endpoint
+    principal: str
+    expected: Expectation
+    status: Optional[int] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> Optional[bool]:
+        if self.status is None:
+            return False if self.expected is not None else None
+        return passes(self.expected, self.status)
+
+
+@dataclass
+class MatrixResult:
+    cells: List[Cell] = field(default_factory=list)
+    elapsed: float = 0.0
+    login_elapsed: float = 0.0
+
+    def failures(self) -> List[Cell]:
+        return [cell for cell in self.cells if cell.ok is False]
+
+    def grid(self) -> str:
+        """Компактная сетка: ✓ совпало, ✗ не совпало (с кодом), · не проверялось (с кодом)"""
+        principals = list(PRINCIPALS)
+        rows = {}
+        for cell in self.cells:
+            rows.setdefault(cell.endpoint.name, {})[cell.principal] = cell
+        width = max(len(name) for name in rows)
+        header = " " * width + " │ " + " ".join(p[:9].center(9) for p in principals)
+        lines = [header, "─" * len(header)]
+        for name, cells in rows.items():
+            marks = []
+            for principal in principals:
+                cell = cells.get(principal)
+                if cell is None:
+                    marks.append(" " * 9)
+                    continue
+                code = cell.status if cell.status is not None else "ERR"
+                mark = {True: "✓", False: "✗", None: "·"}[cell.ok]
+                marks.append(f"{mark} {code}".center(9))
+            lines.append(f"{name.ljust(width)} │ " + " ".join(marks))
+        return "\n".join(lines)
+
+
+class TokenCache:
+    """Токены участников: логин один раз на участника, параллельно"""
+
+    def __init__(self, base_url: str = BASE_URL, session: Optional[requests.Session] = None):
+        self.base_url = base_url
+        self.session = session or requests.Session()
+        self.tokens: Dict[str, Optional[str]] = {"anonymous": None, "bad_token": BAD_TOKEN}
+
+    def _login(self, principal: str) -> Tuple[str, Optional[str]]:
+        username, password = PRINCIPALS[principal]
+        response = self.session.post(f"{self.base_url}/auth/login",
+                                     json={"username": username, "password": password})
+        return principal, response.json().get("token") if response.status_code == 200 else None
+
+    def login_all(self, principals, workers: int = 8):
+        pending = [p for p in principals if p not in self.tokens and PRINCIPALS.get(p)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            self.tokens.update(pool.map(self._login, pending))
+
+    def headers(self, principal: str) -> Dict[str, str]:
+        token = self.tokens.get(principal)
+        return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+class PermissionMatrix:
+    """Параллельное выполнение матрицы участники × эндпоинты с ожидаемыми кодами"""
+
+    def __init__(self, matrix=MATRIX, base_url: str = BASE_URL, workers: int = 32):
+        self.matrix = matrix
+        self.base_url = base_url
+        self.workers = workers
+        self.session = requests.Session()
+        self.tokens = TokenCache(base_url, self.session)
+        self.params: Dict[str, object] = {"missing": MISSING_ID}
+
+    def resolve_items(self, principal: str = "rool1"):
+        """Реальная запись для чтений: заданная в params["item"] или первая из списка"""
+        headers = self.tokens.headers(principal)
+        if "item" in self.params:
+            response = self.session.get(f"{self.base_url}/cadastre/{self.params['item']}", headers=headers)
+            items = [response.json()] if response.status_code == 200 else []
+        else:
+            response = self.session.get(f"{self.base_url}/cadastre", params={"page_size": 1}, headers=headers)
+            items = (response.json().get("data") or []) if response.status_code == 200 else []
+        record = CadastreRecord.from_dict(items[0]) if items else None
+        self.params.setdefault("item", record.id if record and record.id else MISSING_ID)
+        self.params["cadastre_id"] = record.cadastre_id if record and record.cadastre_id else "INVALID_ID_9999"
+
+    def _check(self, cell: Cell) -> Cell:
+        endpoint = cell.endpoint
+        url = self.base_url + endpoint.path.format(**self.params)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(endpoint.method, url, json=endpoint.body,
+                                            headers=self.tokens.headers(cell.principal))
+            cell.status = response.status_code
+        except requests.RequestException as error:
+            cell.error = str(error)
+        cell.elapsed = time.perf_counter() - start
+        return cell
+
+    def cells(self) -> List[Cell]:
+        return [Cell(endpoint, principal, expected)
+                for endpoint, expectations in self.matrix
+                for principal, expected in expectations.items()]
+
+    def run(self) -> MatrixResult:
+        result = MatrixResult()
+        start = time.perf_counter()
+        self.tokens.login_all(PRINCIPALS)
+        self.resolve_items()
+        result.login_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            result.cells = list(pool.map(self._check, self.cells()))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+
+@pytest.fixture(scope="module")
+def permission_matrix():
+    """Вся матрица выполняется один раз параллельно; тесты ниже только читают результат"""
+    result = PermissionMatrix().run()
+    print(f"\n{result.grid()}")
+    print(f"✓ {len(result.cells)} checks in {result.elapsed:.2f}s (logins {result.login_elapsed:.2f}s)")
+    return {(cell.endpoint.name, cell.principal): cell for cell in result.cells}
+
+
+@pytest.mark.parametrize("endpoint,principal,expected", [
+    (endpoint.name, principal, expected)
+    for endpoint, expectations in MATRIX
+    for principal, expected in expectations.items()
+    if expected is not None
+])
+def test_permission(permission_matrix, endpoint, principal, expected):
+    cell = permission_matrix[(endpoint, principal)]
+    assert cell.status is not None, f"{endpoint} as {principal}: {cell.error}"
+    assert passes(expected, cell.status), \
+        f"{endpoint} as {principal}: got {cell.status}, expected {expected}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the RBAC permission matrix concurrently")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--item-id", type=int, help="Запись для чтений; по умолчанию первая из списка")
+    args = parser.parse_args()
+
+    matrix = PermissionMatrix(workers=args.workers)
+    if args.item_id:
+        matrix.params["item"] = args.item_id
+    result = matrix.run()
+
+    print(result.grid())
+    failures = result.failures()
+    checked = sum(1 for cell in result.cells if cell.ok is not None)
+    print(f"\n✓ {len(result.cells)} checks in {result.elapsed:.2f}s (logins {result.login_elapsed:.2f}s), "
+          f"{checked - len(failures)}/{checked} expectations met")
+    for cell in failures:
+        print(f"⚠ {cell.endpoint.method} {cell.endpoint.path} as {cell.principal}: "
+              f"got {cell.status or cell.error}, expected {cell.expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+_WORD_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+# Сколько форм ответа (наборов ключей) держать скомпилированными на класс
+MAX_SHAPES = 256
+
+# Синонимы, которые API отдаёт под разными именами
+ALIASES = {
+    "governor_decision": "governor_decree",
+    "cadastral_number": "cadastre_id",
+}
+
+
+def canonical(key: str) -> str:
+    """Имя поля API -> snake_case: ID -> id, CadastreID -> cadastre_id, uidSPUnit -> uid_sp_unit"""
+    name = _WORD_BOUNDARY.sub("_", key).lower()
+    return ALIASES.get(name, name)
+
+
+class Record:
+    """Запись ответа API с __slots__: одно каноническое поле на значение.
+
+    Соответствие «ключи ответа -> слоты» вычисляется один раз на форму ответа
+    (кортеж ключей) и кэшируется в классе; неизвестные поля попадают в
+    _extra. Незаполненные известные поля читаются как None.
+    """
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+    _plans: Dict[tuple, Any]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._plans = {}
+
+    @classmethod
+    def _compile(cls, keys: tuple):
+        """Конструктор для формы keys, собранный как функция Python (как в namedtuple/dataclasses):
+        без цикла по полям и без поиска слота по имени на каждую запись"""
+        fields = set(cls.FIELDS)
+        lines, extra, seen = [], [], set()
+        for i, key in enumerate(keys):
+            name = canonical(key)
+            if name not in fields:
+                extra.append(f"{name!r}: data[keys[{i}]]")
+            elif name in seen:
+                # Одно поле под двумя именами (Screenshot и screenshot): берём первое непустое
+                lines.append(f"    if not record.{name}: record.{name} = data[keys[{i}]]")
+            else:
+                seen.add(name)
+                lines.append(f"    record.{name} = data[keys[{i}]]")
+        if extra:
+            lines.append(f"    record._extra = {{{', '.join(extra)}}}")
+        source = "def build(data):\n    record = new(cls)\n" + "\n".join(lines) + "\n    return record\n"
+        namespace = {"new": cls.__new__, "cls": cls, "keys": keys}
+        exec(source, namespace)
+        if len(cls._plans) >= MAX_SHAPES:
+            cls._plans.clear()
+        build = cls._plans[keys] = namespace["build"]
+        return build
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Record":
+        keys = tuple(data)
+        build = cls._plans.get(keys) or cls._compile(keys)
+        return build(data)
+
+    @classmethod
+    def many(cls, items: Iterable[Dict[str, Any]]) -> List["Record"]:
+        return [cls.from_dict(item) for item in items]
+
+    def __getattr__(self, name: str) -> Any:
+        # Вызывается только для незаполненных слотов и полей вне FIELDS
+        if name in type(self).FIELDS:
+            return None
+        if name != "_extra":
+            try:
+                return object.__getattribute__(self, "_extra")[name]
+            except (AttributeError, KeyError):
+                pass
+        raise AttributeError(f"{type(self).__name__} has no field {name!r}")
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = getattr(self, canonical(name), None)
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in type(self).FIELDS}
+        data.update(getattr(self, "_extra", None) or {})
+        return {k: v for k, v in data.items() if v is not None}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={v!r}" for k, v in list(self.to_dict().items())[:4])
+        return f"{type(self).__name__}({fields})"
+
+
+class CadastreRecord(Record):
+    FIELDS = (
+        "id", "cadastre_id", "status", "region_soato", "district_soato", "neighborhood_soato",
+        "address", "location", "fixed_geojson", "move_distance", "screenshot", "space_image_id",
+        "governor_decree", "building_presence", "building_land_cad_plan", "edit_note",
+        "reupload_note", "cadastre_error", "land_fund_type_code", "land_use_type_code", "vid",
+        "law_accordance_id", "selected_at", "step_deadline", "uid_sp_unit", "mulk_egalari",
+        "created_at", "updated_at",
+    )
+    __slots__ = FIELDS
+
+
+class UserRecord(Record):
+    FIELDS = (
+        "id", "username", "first_name", "middle_name", "last_name", "position", "role", "active",
+        "randomizer_index", "created_at", "updated_at",
+    )
+    __slots__ = FIELDS
+
+
+class PageMeta(Record):
+    FIELDS = ("page", "page_size", "total", "total_pages")
+    __slots__ = FIELDS
+
+
+def iter_records(items: Iterable[Dict[str, Any]], cls=CadastreRecord) -> Iterator[Record]:
+    from_dict = cls.from_dict
+    for item in items:
+        yield from_dict(item)
+
+
+def page(body: Dict[str, Any], cls=CadastreRecord) -> Tuple[List[Record], PageMeta]:
+    """Тело списка {"data": [...], "meta": {...}} -> (записи, meta)"""
+    return cls.many(body.get("data") or []), PageMeta.from_dict(body.get("meta") or {})
+
+
+def item_id(item: Dict[str, Any]) -> Optional[int]:
+    """ID из сырого dict без построения записи (ID или id)"""
+    value = item.get("ID")
+    return item.get("id") if value is None else value
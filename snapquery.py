@@ -0,0 +1,168 @@
+import argparse
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from apiclient import ApiClient
+from records import CadastreRecord, item_id
+from snapshot import SNAPSHOT_PATH, Snapshot
+
+
+# Сколько записей просматривать по сети, если снимка нет
+SCAN_LIMIT = 500
+# Сколько кандидатов из снимка перепроверять по сети (снимок мог устареть)
+VERIFY_ATTEMPTS = 5
+
+
+@dataclass
+class Filter:
+    """Предикат выбора тестовой записи: и SQL по снимку, и проверка записи из API"""
+    status: Optional[str] = None
+    region_soato: Optional[str] = None
+    cadastre_id: Optional[str] = None
+    screenshot: Optional[bool] = None
+    decree: Optional[bool] = None
+    fixed_geometry: Optional[bool] = None
+
+    def sql(self) -> tuple:
+        clauses, args = [], []
+        for column, value in (("status", self.status), ("region_soato", self.region_soato),
+                              ("cadastre_id", self.cadastre_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        for column, flag in (("has_screenshot", self.screenshot), ("has_decree", self.decree)):
+            if flag is not None:
+                clauses.append(f"{column} = ?")
+                args.append(int(flag))
+        if self.fixed_geometry is not None:
+            clauses.append("fixed_geojson IS NOT NULL" if self.fixed_geometry else "fixed_geojson IS NULL")
+        return " AND ".join(clauses) or "1", args
+
+    def params(self) -> Dict:
+        """Фильтры, которые умеет сам сервер"""
+        return {k: v for k, v in (("status", self.status), ("region_soato", self.region_soato)) if v}
+
+    def matches(self, item: Dict) -> bool:
+        record = CadastreRecord.from_dict(item)
+        checks = (
+            (self.status, record.status),
+            (self.region_soato, record.region_soato),
+            (self.cadastre_id, record.cadastre_id),
+            (self.screenshot, bool(record.screenshot)),
+            (self.decree, bool(record.governor_decree)),
+            (self.fixed_geometry, bool(record.fixed_geojson)),
+        )
+        return all(expected is None or expected == actual for expected, actual in checks)
+
+
+class Query:
+    """Индексный запрос к снимку: Query(snapshot, Filter(status="verdict_79", decree=False))"""
+
+    def __init__(self, snapshot: Snapshot, where: Filter):
+        self.snapshot = snapshot
+        self.where = where
+
+    def _select(self, tail: str = "", extra: tuple = ()) -> List[int]:
+        clause, args = self.where.sql()
+        rows = self.snapshot.conn.execute(f"SELECT id FROM cadastre WHERE {clause} {tail}",
+                                          (*args, *extra))
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        clause, args = self.where.sql()
+        return self.snapshot.conn.execute(f"SELECT COUNT(*) FROM cadastre WHERE {clause}",
+                                          args).fetchone()[0]
+
+    def ids(self, limit: Optional[int] = None) -> List[int]:
+        return self._select("ORDER BY id LIMIT ?", (-1 if limit is None else limit,))
+
+    def first(self) -> Optional[int]:
+        ids = self.ids(1)
+        return ids[0] if ids else None
+
+    def sample(self, n: int, seed: Optional[int] = None) -> List[int]:
+        """n случайных ID; с seed — воспроизводимо"""
+        if seed is None:
+            return self._select("ORDER BY random() LIMIT ?", (n,))
+        ids = self.ids()
+        return random.Random(seed).sample(ids, min(n, len(ids)))
+
+    def random(self, seed: Optional[int] = None) -> Optional[int]:
+        ids = self.sample(1, seed)
+        return ids[0] if ids else None
+
+    def items(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        for item_id in self.ids(limit):
+            yield self.snapshot.get(item_id)
+
+
+class Finder:
+    """Поиск тестовых записей: по снимку (если есть) с проверкой по сети, иначе обходом API"""
+
+    def __init__(self, snapshot: Optional[Snapshot] = None):
+        self.snapshot = snapshot
+
+    @classmethod
+    def open(cls, path: str = SNAPSHOT_PATH) -> "Finder":
+        return cls(Snapshot(path) if os.path.exists(path) else None)
+
+    def close(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def find(self, client: ApiClient, shuffle: bool = False, seed: Optional[int] = None,
+             **filters) -> Optional[int]:
+        where = Filter(**filters)
+        if self.snapshot is not None:
+            query = Query(self.snapshot, where)
+            candidates = query.sample(VERIFY_ATTEMPTS, seed) if shuffle else query.ids(VERIFY_ATTEMPTS)
+            for item_id in candidates:
+                response = client.get(f"/cadastre/{item_id}")
+                if response.status_code == 200 and where.matches(response.json()):
+                    return item_id
+        return self._scan(client, where, shuffle, seed)
+
+    def _scan(self, client: ApiClient, where: Filter, shuffle: bool,
+              seed: Optional[int]) -> Optional[int]:
+        matches = []
+        for seen, item in enumerate(client.iter_items("/cadastre", where.params()), 1):
+            if where.matches(item):
+                matches.append(item_id(item))
+                if not shuffle:
+                    break
+            if seen >= SCAN_LIMIT:
+                break
+        if not matches:
+            return None
+        return random.Random(seed).choice(matches) if shuffle else matches[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Select test records from the local snapshot")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH)
+    parser.add_argument("--status")
+    parser.add_argument("--region-soato")
+    parser.add_argument("--screenshot", choices=("yes", "no"))
+    parser.add_argument("--decree", choices=("yes", "no"))
+    parser.add_argument("--sample", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    flag = {"yes": True, "no": False, None: None}
+    where = Filter(status=args.status, region_soato=args.region_soato,
+                   screenshot=flag[args.screenshot], decree=flag[args.decree])
+    with Snapshot(args.snapshot) as snapshot:
+        query = Query(snapshot, where)
+        start = time.perf_counter()
+        count = query.count()
+        ids = query.sample(args.sample, args.seed)
+        elapsed = time.perf_counter() - start
+    print(f"✓ {count} matching records ({elapsed * 1000:.1f}ms)")
+    print(f"  Sample: {', '.join(map(str, ids)) or '—'}")
+
+
+if __name__ == "__main__":
+    main()
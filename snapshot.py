@@ -0,0 +1,341 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from apiclient import ApiClient
+from records import CadastreRecord, item_id, iter_records
+
+
+SNAPSHOT_PATH = os.environ.get("ETIROF_SNAPSHOT", "cadastre_snapshot.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cadastre (
+    id INTEGER PRIMARY KEY,
+    cadastre_id TEXT,
+    status TEXT,
+    region_soato TEXT,
+    district_soato TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    has_screenshot INTEGER NOT NULL DEFAULT 0,
+    has_decree INTEGER NOT NULL DEFAULT 0,
+    move_distance REAL,
+    location TEXT,
+    fixed_geojson TEXT,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    synced_run INTEGER
+);
+CREATE INDEX IF NOT EXISTS cadastre_status ON cadastre (status);
+CREATE INDEX IF NOT EXISTS cadastre_region ON cadastre (region_soato, status);
+CREATE INDEX IF NOT EXISTS cadastre_cadastre_id ON cadastre (cadastre_id);
+CREATE INDEX IF NOT EXISTS cadastre_updated_at ON cadastre (updated_at);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT,
+    started REAL,
+    finished REAL,
+    fetched INTEGER,
+    added INTEGER,
+    changed INTEGER,
+    removed INTEGER,
+    watermark TEXT
+);
+
+CREATE TABLE IF NOT EXISTS changes (
+    run INTEGER,
+    id INTEGER,
+    kind TEXT,
+    fields TEXT,
+    old_status TEXT,
+    new_status TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_run ON changes (run);
+CREATE INDEX IF NOT EXISTS changes_id ON changes (id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Поля, меняющие геометрию: после них пересобираются файлы geomstore
+GEOMETRY_FIELDS = {"Location", "location", "FixedGeojson", "fixed_geojson"}
+# Метки для водяного знака в порядке предпочтения; в одном прогоне используется одна
+WATERMARK_KEYS = ("updated_at", "created_at")
+
+
+@dataclass
+class SyncResult:
+    run: int
+    mode: str
+    fetched: int = 0
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    elapsed: float = 0.0
+    watermark: Optional[str] = None
+    geometry_changed: bool = False
+
+    def format(self) -> str:
+        return (f"run {self.run} ({self.mode}): fetched {self.fetched} in {self.elapsed:.1f}s, "
+                f"+{self.added} ~{self.changed} -{self.removed}, {self.unchanged} unchanged")
+
+
+def _digest(item: Dict) -> str:
+    return hashlib.sha1(json.dumps(item, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _text(value) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _row(item: Dict, run: int) -> tuple:
+    record = CadastreRecord.from_dict(item)
+    move_distance = record.move_distance
+    return (
+        record.id,
+        record.cadastre_id,
+        record.status,
+        record.region_soato,
+        record.district_soato,
+        record.created_at,
+        record.updated_at,
+        int(bool(record.screenshot)),
+        int(bool(record.governor_decree)),
+        float(move_distance) if isinstance(move_distance, (int, float)) else None,
+        _text(record.location),
+        _text(record.fixed_geojson),
+        _digest(item),
+        json.dumps(item, ensure_ascii=False),
+        run,
+    )
+
+
+def _changed_fields(old: Dict, new: Dict) -> List[str]:
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+class Snapshot:
+    """Локальное зеркало /cadastre в SQLite с инкрементальной синхронизацией и журналом изменений"""
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM cadastre").fetchone()[0]
+
+    def get(self, item_id: int) -> Optional[Dict]:
+        row = self.conn.execute("SELECT data FROM cadastre WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _apply(self, items: List[Dict], result: SyncResult):
+        """Запись страницы: вставка новых, обновление изменившихся (по дайджесту), журнал"""
+        ids = [item_id(item) for item in items]
+        placeholders = ",".join("?" * len(ids))
+        stored = {row["id"]: row for row in self.conn.execute(
+            f"SELECT id, digest, status FROM cadastre WHERE id IN ({placeholders})", ids)}
+
+        upserts, changes = [], []
+        for item, key in zip(items, ids):
+            if key is None:
+                continue
+            row = _row(item, result.run)
+            old = stored.get(key)
+            if old is None:
+                result.added += 1
+                changes.append((result.run, key, "added", None, None, row[2]))
+                result.geometry_changed = True
+            elif old["digest"] != row[12]:
+                result.changed += 1
+                # Старую запись разбираем только для изменившихся строк
+                fields = _changed_fields(self.get(key) or {}, item)
+                changes.append((result.run, key, "changed", json.dumps(fields), old["status"], row[2]))
+                result.geometry_changed |= bool(GEOMETRY_FIELDS.intersection(fields))
+            else:
+                result.unchanged += 1
+                continue
+            upserts.append(row)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cadastre VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                upserts)
+            self.conn.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?)", changes)
+            written = {row[0] for row in upserts}
+            # Отметка «видели в этом прогоне» нужна полному обходу для поиска удалённых
+            self.conn.executemany("UPDATE cadastre SET synced_run = ? WHERE id = ?",
+                                  [(result.run, i) for i in ids if i not in written])
+
+    def sync(self, client: ApiClient, full: bool = False, page_size: int = 100) -> SyncResult:
+        """Синхронизация с API.
+
+        Инкрементальный режим идёт по /cadastre?sort=updated_at&order=desc и
+        останавливается на первой странице старше водяного знака прошлого
+        прогона — число запросов и записей в БД пропорционально изменениям.
+        Если сервер не сортирует (порядок на странице нарушен) или знака ещё
+        нет, выполняется полный обход; только он находит удалённые записи.
+        """
+        watermark = None if full else self.meta("watermark")
+        sort_key = self.meta("sort_key") or "updated_at"
+        mode = "incremental" if watermark else "full"
+        started = time.time()
+        with self.conn:
+            run = self.conn.execute("INSERT INTO runs (mode, started) VALUES (?, ?)",
+                                    (mode, started)).lastrowid
+        result = SyncResult(run=run, mode=mode)
+
+        start = time.perf_counter()
+        newest = watermark
+        if mode == "incremental":
+            params = {"sort": sort_key, "order": "desc"}
+            for items in client.iter_pages("/cadastre", params, page_size):
+                stamps = [getattr(record, sort_key) for record in iter_records(items)]
+                if None in stamps or stamps != sorted(stamps, reverse=True):
+                    print(f"⚠ Server ignores sort={sort_key}, falling back to a full crawl")
+                    result.mode = mode = "full"
+                    break
+                result.fetched += len(items)
+                newest = max(newest, stamps[0])
+                self._apply(items, result)
+                # Записи с меткой, равной знаку, перепроверяются по дайджесту
+                if stamps[-1] < watermark:
+                    break
+
+        if mode == "full":
+            # Максимум по каждой метке отдельно: знак берётся по одной метке для всего прогона
+            newest_by = dict.fromkeys(WATERMARK_KEYS)
+            complete = dict.fromkeys(WATERMARK_KEYS, True)
+            for items in client.iter_pages("/cadastre", {}, page_size):
+                result.fetched += len(items)
+                self._apply(items, result)
+                for record in iter_records(items):
+                    for key in WATERMARK_KEYS:
+                        stamp = getattr(record, key)
+                        if stamp is None:
+                            complete[key] = False
+                        elif newest_by[key] is None or stamp > newest_by[key]:
+                            newest_by[key] = stamp
+            chosen = next((key for key in WATERMARK_KEYS if complete[key]), None)
+            if chosen is None:
+                print("⚠ Some records have neither updated_at nor created_at: next sync will be a full crawl")
+            sort_key = chosen or WATERMARK_KEYS[0]
+            newest = newest_by[chosen] if chosen else None
+            removed = [row[0] for row in self.conn.execute(
+                "SELECT id FROM cadastre WHERE synced_run IS NOT ? ", (run,))]
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO changes (run, id, kind, old_status) "
+                    "SELECT ?, id, 'removed', status FROM cadastre WHERE id = ?",
+                    [(run, i) for i in removed])
+                self.conn.executemany("DELETE FROM cadastre WHERE id = ?", [(i,) for i in removed])
+            result.removed = len(removed)
+            result.geometry_changed |= bool(removed)
+
+        result.elapsed = time.perf_counter() - start
+        result.watermark = newest
+        with self.conn:
+            self.set_meta("watermark", newest)
+            self.set_meta("sort_key", sort_key)
+            self.conn.execute(
+                "UPDATE runs SET mode = ?, finished = ?, fetched = ?, added = ?, changed = ?, "
+                "removed = ?, watermark = ? WHERE run = ?",
+                (result.mode, time.time(), result.fetched, result.added, result.changed,
+                 result.removed, newest, run))
+        return result
+
+    def changes(self, run: Optional[int] = None) -> List[sqlite3.Row]:
+        """Журнал изменений прогона (по умолчанию последнего)"""
+        if run is None:
+            run = self.conn.execute("SELECT MAX(run) FROM runs").fetchone()[0]
+        return self.conn.execute("SELECT * FROM changes WHERE run = ? ORDER BY id", (run,)).fetchall()
+
+    def geometry_store_path(self, column: str) -> str:
+        return f"{self.path}.{column}.geom"
+
+    def build_geometry_stores(self) -> Dict[str, Dict[str, int]]:
+        """Файлы geomstore для location и fixed_geojson (для movecheck и spatialindex)"""
+        import geomcheck
+        import geomstore
+
+        stats = {}
+        for column in ("location", "fixed_geojson"):
+            ids, parsed = [], []
+            for item_id, text in self.conn.execute(
+                    f"SELECT id, {column} FROM cadastre WHERE {column} IS NOT NULL ORDER BY id"):
+                try:
+                    parsed.append(geomcheck.parse_geometry(text))
+                except geomcheck.GeometryError:
+                    continue
+                ids.append(item_id)
+            stats[column] = geomstore.write(self.geometry_store_path(column), ids, parsed)
+        return stats
+
+    def move_distances(self) -> Dict[int, float]:
+        return dict(self.conn.execute(
+            "SELECT id, move_distance FROM cadastre "
+            "WHERE move_distance IS NOT NULL AND fixed_geojson IS NOT NULL"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror /cadastre into a local SQLite snapshot")
+    parser.add_argument("path", nargs="?", default=SNAPSHOT_PATH)
+    parser.add_argument("--full", action="store_true", help="Полный обход (находит удалённые записи)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--changes", action="store_true", help="Показать журнал изменений прогона")
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+
+    client = ApiClient(args.username, args.password)
+    client.login()
+    with Snapshot(args.path) as snapshot:
+        result = snapshot.sync(client, full=args.full, page_size=args.page_size)
+        print(f"✓ Snapshot {args.path}: {result.format()}, {len(snapshot)} rows")
+
+        stores_missing = not all(os.path.exists(snapshot.geometry_store_path(c))
+                                 for c in ("location", "fixed_geojson"))
+        if result.geometry_changed or stores_missing:
+            for column, stats in snapshot.build_geometry_stores().items():
+                print(f"✓ Geometry store {column}: {stats['records']} records, {stats['bytes']:,} bytes")
+
+        if args.changes:
+            for row in snapshot.changes(result.run):
+                detail = row["fields"] or ""
+                if row["old_status"] != row["new_status"] and row["kind"] == "changed":
+                    detail += f" status {row['old_status']} → {row['new_status']}"
+                print(f"  {row['kind']:>7} ID {row['id']} {detail}")
+
+
+if __name__ == "__main__":
+    main()
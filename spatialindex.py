@@ -0,0 +1,393 @@
+import argparse
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import geomcheck
+from apiclient import ApiClient
+from geomcheck import PAIR_BLOCK
+from movecheck import PackedRings
+from records import iter_records
+
+
+# Шаг квантования для поиска дублей: 1e-7° ≈ 1 см
+QUANTUM = 1e-7
+# Запросов к дереву за один векторный проход
+QUERY_CHUNK = 65_536
+
+
+@dataclass
+class OverlapReport:
+    duplicates: List[List] = field(default_factory=list)
+    overlaps: List[Tuple] = field(default_factory=list)
+    candidates: int = 0
+    records: int = 0
+    skipped: int = 0
+    elapsed: Dict[str, float] = field(default_factory=dict)
+
+
+def pack_exteriors(geometries: Sequence) -> PackedRings:
+    """Внешние кольца всех полигонов (части мультиполигонов — отдельные кольца одной записи)"""
+    rings, owners = [], []
+    for record, (_, polygons) in enumerate(geometries):
+        for polygon in polygons:
+            rings.append(polygon[0])
+            owners.append(record)
+    lengths = np.array([len(r) for r in rings], dtype=np.int64)
+    starts = np.cumsum(lengths) - lengths
+    coords = np.concatenate(rings) if rings else np.empty((0, 2))
+    return PackedRings(coords, starts, np.array(owners, dtype=np.int64), np.ones(len(rings)))
+
+
+def bounds(packed: PackedRings) -> np.ndarray:
+    """Bbox каждого кольца: (n, 4) = min_lon, min_lat, max_lon, max_lat"""
+    starts = packed.ring_starts
+    x, y = packed.coords[:, 0], packed.coords[:, 1]
+    return np.column_stack([np.minimum.reduceat(x, starts), np.minimum.reduceat(y, starts),
+                            np.maximum.reduceat(x, starts), np.maximum.reduceat(y, starts)])
+
+
+def _intersects(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return ((a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2])
+            & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3]))
+
+
+class STRTree:
+    """R-дерево, упакованное методом Sort-Tile-Recursive, с пакетными запросами.
+
+    Листья — bbox элементов в порядке STR (полосы по x, внутри полосы по y),
+    каждый верхний уровень группирует node_capacity соседних узлов нижнего.
+    Запрос спускается по уровням сразу для всех bbox: на каждом уровне
+    фронт пар (запрос, узел) раскрывается в детей и фильтруется векторно.
+    """
+
+    def __init__(self, boxes: np.ndarray, node_capacity: int = 16):
+        self.node_capacity = node_capacity
+        n = len(boxes)
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        leaves = max(math.ceil(n / node_capacity), 1)
+        slabs = max(math.ceil(math.sqrt(leaves)), 1)
+        slab = np.empty(n, dtype=np.int64)
+        slab[np.argsort(cx, kind="stable")] = np.arange(n) // max(slabs * node_capacity, 1)
+        self.order = np.lexsort((cy, slab))
+
+        # levels[0] — bbox элементов, levels[k] — узлы; children[k] — первый ребёнок узла в levels[k-1]
+        self.levels = [boxes[self.order]]
+        self.children = [None]
+        while len(self.levels[-1]) > node_capacity:
+            lower = self.levels[-1]
+            starts = np.arange(0, len(lower), node_capacity)
+            self.levels.append(np.column_stack([
+                np.minimum.reduceat(lower[:, 0], starts), np.minimum.reduceat(lower[:, 1], starts),
+                np.maximum.reduceat(lower[:, 2], starts), np.maximum.reduceat(lower[:, 3], starts),
+            ]))
+            self.children.append(starts)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def query(self, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Все пары (индекс запроса, индекс элемента) с пересекающимися bbox"""
+        out_q, out_items = [], []
+        for start in range(0, len(boxes), QUERY_CHUNK):
+            q, items = self._query_chunk(boxes[start:start + QUERY_CHUNK])
+            out_q.append(q + start)
+            out_items.append(items)
+        if not out_q:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(out_q), np.concatenate(out_items)
+
+    def _query_chunk(self, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        top = len(self.levels) - 1
+        q = np.repeat(np.arange(len(boxes)), len(self.levels[top]))
+        node = np.tile(np.arange(len(self.levels[top])), len(boxes))
+        for level in range(top, -1, -1):
+            keep = _intersects(boxes[q], self.levels[level][node])
+            q, node = q[keep], node[keep]
+            if level == 0:
+                break
+            lower = len(self.levels[level - 1])
+            first = self.children[level][node]
+            counts = np.minimum(first + self.node_capacity, lower) - first
+            q = np.repeat(q, counts)
+            node = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts)
+        return q, self.order[node]
+
+    def query_pairs(self, boxes: np.ndarray) -> np.ndarray:
+        """Самосоединение: пары (i, j), i < j, для bbox, по которым построено дерево"""
+        q, items = self.query(boxes)
+        keep = q < items
+        return np.column_stack([q[keep], items[keep]])
+
+
+def _edges(packed: PackedRings) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Рёбра всех колец: начала, концы, первое ребро и число рёбер кольца"""
+    lengths = packed.ring_lengths
+    last = np.zeros(len(packed.coords), dtype=bool)
+    last[packed.ring_starts + lengths - 1] = True
+    a = packed.coords[~last]
+    b = packed.coords[1:][~last[:-1]] if len(packed.coords) else a
+    counts = lengths - 1
+    return a, b, np.cumsum(counts) - counts, counts
+
+
+def _side(ax, ay, bx, by, px, py, eps):
+    """Сторона точки относительно прямой ab: -1/0/1, 0 — ближе eps к прямой"""
+    length = np.hypot(bx - ax, by - ay)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance = ((bx - ax) * (py - ay) - (by - ay) * (px - ax)) / length
+    return np.where(np.abs(distance) <= eps, 0, np.sign(distance))
+
+
+def _near_segment(ax, ay, bx, by, px, py, eps):
+    """Точка не дальше eps от отрезка ab"""
+    dx, dy = bx - ax, by - ay
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy), 0.0, 1.0)
+    t = np.nan_to_num(t)
+    return np.hypot(ax + t * dx - px, ay + t * dy - py) <= eps
+
+
+def overlapping(packed: PackedRings, pairs: np.ndarray, eps: float = 1e-8) -> np.ndarray:
+    """Точная проверка пар колец на пересечение внутренностей.
+
+    Касание по общей границе (соседние участки) перекрытием не считается:
+    перекрытие — это собственное пересечение рёбер или вершина/середина ребра
+    одного кольца строго внутри другого (дальше eps от его границы). Все
+    тройки (пара, ребро A, ребро B) обрабатываются блоками по PAIR_BLOCK.
+    """
+    if not len(pairs):
+        return np.zeros(0, dtype=bool)
+    a_start, a_end, first, counts = _edges(packed)
+    directed = np.concatenate([pairs, pairs[:, ::-1]])
+    src, dst = directed[:, 0], directed[:, 1]
+
+    # Строка = (направленная пара, ребро источника); в ней counts[dst] троек
+    row_counts = counts[src]
+    row_pair = np.repeat(np.arange(len(directed)), row_counts)
+    row_edge = first[src][row_pair] + np.arange(row_counts.sum()) - np.repeat(
+        np.cumsum(row_counts) - row_counts, row_counts)
+    triples = counts[dst][row_pair]
+    cumulative = np.cumsum(triples)
+
+    hit = np.zeros(len(row_pair), dtype=bool)
+    block_start = 0
+    while block_start < len(row_pair):
+        base = cumulative[block_start - 1] if block_start else 0
+        block_end = int(np.searchsorted(cumulative, base + PAIR_BLOCK, side="right"))
+        block_end = max(block_end, block_start + 1)
+        block_triples = triples[block_start:block_end]
+        total = int(block_triples.sum())
+        row_starts = np.cumsum(block_triples) - block_triples
+        rows = np.repeat(np.arange(block_start, block_end), block_triples)
+        i = row_edge[rows]
+        j = first[dst[row_pair[rows]]] + np.arange(total) - np.repeat(row_starts, block_triples)
+
+        p1x, p1y, q1x, q1y = a_start[i, 0], a_start[i, 1], a_end[i, 0], a_end[i, 1]
+        p2x, p2y, q2x, q2y = a_start[j, 0], a_start[j, 1], a_end[j, 0], a_end[j, 1]
+
+        crossing = ((_side(p1x, p1y, q1x, q1y, p2x, p2y, eps)
+                     * _side(p1x, p1y, q1x, q1y, q2x, q2y, eps) < 0)
+                    & (_side(p2x, p2y, q2x, q2y, p1x, p1y, eps)
+                       * _side(p2x, p2y, q2x, q2y, q1x, q1y, eps) < 0))
+
+        inside = np.zeros(block_end - block_start, dtype=bool)
+        for px, py in ((p1x, p1y), ((p1x + q1x) / 2, (p1y + q1y) / 2)):
+            spans = (p2y > py) != (q2y > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ray = spans & (px < p2x + (py - p2y) * (q2x - p2x) / (q2y - p2y))
+            parity = np.add.reduceat(ray.astype(np.int64), row_starts) % 2 == 1
+            boundary = np.logical_or.reduceat(_near_segment(p2x, p2y, q2x, q2y, px, py, eps),
+                                              row_starts)
+            inside |= parity & ~boundary
+
+        hit[block_start:block_end] = np.logical_or.reduceat(crossing, row_starts) | inside
+        block_start = block_end
+
+    pair_rows = np.cumsum(row_counts) - row_counts
+    directed_hit = np.logical_or.reduceat(hit, pair_rows)
+    return directed_hit[:len(pairs)] | directed_hit[len(pairs):]
+
+
+def ring_hashes(packed: PackedRings, quantum: float = QUANTUM) -> np.ndarray:
+    """Хэш кольца, не зависящий от начальной вершины и направления обхода.
+
+    Координаты квантуются, кольцо поворачивается к минимальной вершине и
+    приводится к обходу против часовой стрелки, затем полиномиальный хэш
+    (uint64 с переполнением) суммируется по кольцу через np.add.reduceat.
+    """
+    lengths = packed.ring_lengths - 1
+    starts = packed.ring_starts
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    rank = np.arange(len(owner)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    source = starts[owner] + rank
+
+    q = np.round(packed.coords[source] / quantum).astype(np.int64)
+    key = q[:, 0] * (1 << 32) + q[:, 1]
+    ring_first = np.cumsum(lengths) - lengths
+    min_key = np.minimum.reduceat(key, ring_first)
+    at_min = np.flatnonzero(key == min_key[owner])
+    pivot = np.full(len(starts), -1, dtype=np.int64)
+    pivot[owner[at_min][::-1]] = rank[at_min][::-1]
+
+    n = lengths[owner]
+    x = q[:, 0] - q[ring_first[owner], 0]
+    y = q[:, 1] - q[ring_first[owner], 1]
+    following = ring_first[owner] + (rank + 1) % n
+    cross = (x * y[following] - x[following] * y).astype(np.float64)
+    clockwise = np.add.reduceat(cross, ring_first) < 0
+
+    step = np.where(clockwise[owner], -rank, rank)
+    rotated = ring_first[owner] + (pivot[owner] + step) % n
+    key = key[rotated].astype(np.uint64)
+
+    mixed = (key ^ (key >> np.uint64(29))) * np.uint64(0xBF58476D1CE4E5B9)
+    powers = np.cumprod(np.full(max(int(lengths.max(initial=1)), 1), 0x100000001B3, dtype=np.uint64))
+    with np.errstate(over="ignore"):
+        terms = mixed * powers[rank]
+    return np.add.reduceat(terms, ring_first) ^ lengths.astype(np.uint64)
+
+
+def duplicate_groups(packed: PackedRings, n_records: int) -> List[List[int]]:
+    """Группы записей с одинаковой (с точностью до QUANTUM) геометрией"""
+    hashes = ring_hashes(packed)
+    record_hash: Dict[int, tuple] = defaultdict(tuple)
+    for record, h in zip(packed.ring_record.tolist(), hashes.tolist()):
+        record_hash[record] += (h,)
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    for record, parts in record_hash.items():
+        groups[tuple(sorted(parts))].append(record)
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def find_overlaps(ids: Sequence, geometries: Sequence, eps: float = 1e-8,
+                  node_capacity: int = 16) -> OverlapReport:
+    """Дубли и перекрытия участков: STR-дерево по bbox, точная проверка только кандидатов"""
+    report = OverlapReport()
+    timer = time.perf_counter()
+    kept_ids, parsed = [], []
+    for item_id, geometry in zip(ids, geometries):
+        try:
+            parsed.append(geomcheck.parse_geometry(geometry))
+        except geomcheck.GeometryError:
+            report.skipped += 1
+            continue
+        kept_ids.append(item_id)
+    report.records = len(kept_ids)
+    packed = pack_exteriors(parsed)
+    report.elapsed["parse"] = time.perf_counter() - timer
+    return _find(report, kept_ids, packed, eps, node_capacity)
+
+
+def find_overlaps_store(store, eps: float = 1e-8, node_capacity: int = 16) -> OverlapReport:
+    """То же для geomstore.GeometryStore: внешние кольца декодируются пакетом, без разбора JSON"""
+    report = OverlapReport(records=len(store))
+    timer = time.perf_counter()
+    packed = store.packed(exteriors_only=True)
+    report.elapsed["decode"] = time.perf_counter() - timer
+    return _find(report, store.ids.tolist(), packed, eps, node_capacity)
+
+
+def _find(report: OverlapReport, kept_ids: List, packed: PackedRings, eps: float,
+          node_capacity: int) -> OverlapReport:
+    timer = time.perf_counter()
+    groups = duplicate_groups(packed, len(kept_ids))
+    report.duplicates = [[kept_ids[r] for r in g] for g in groups]
+    duplicate_of = {r: g[0] for g in groups for r in g}
+    report.elapsed["duplicates"] = time.perf_counter() - timer
+
+    timer = time.perf_counter()
+    boxes = bounds(packed)
+    tree = STRTree(boxes, node_capacity)
+    pairs = tree.query_pairs(boxes)
+    owner = packed.ring_record
+    pairs = pairs[owner[pairs[:, 0]] != owner[pairs[:, 1]]]
+    # Пары дублей уже найдены, точную проверку на них не тратим
+    if duplicate_of:
+        canon = np.arange(len(kept_ids))
+        for record, head in duplicate_of.items():
+            canon[record] = head
+        pairs = pairs[canon[owner[pairs[:, 0]]] != canon[owner[pairs[:, 1]]]]
+    report.candidates = len(pairs)
+    report.elapsed["index"] = time.perf_counter() - timer
+
+    timer = time.perf_counter()
+    hits = pairs[overlapping(packed, pairs, eps)]
+    records = np.unique(np.sort(owner[hits], axis=1), axis=0)
+    report.overlaps = [(kept_ids[a], kept_ids[b]) for a, b in records.tolist()]
+    report.elapsed["exact"] = time.perf_counter() - timer
+    return report
+
+
+def synthetic(side: int, overlap: float = 0.01, duplicate: float = 0.01,
+              seed: Optional[int] = None) -> Tuple[List, List[dict]]:
+    """Сетка смежных квадратных участков side×side: часть сдвинута на соседа, часть продублирована"""
+    rng = np.random.default_rng(seed)
+    lon0, lat0 = geomcheck.UZ_BOUNDS[0] + 10, geomcheck.UZ_BOUNDS[1] + 3
+    cell = 0.0005
+    ids, geometries = [], []
+    for row in range(side):
+        for col in range(side):
+            x, y = lon0 + col * cell, lat0 + row * cell
+            if rng.random() < overlap:
+                x += cell * 0.3
+            square = [[x, y], [x + cell, y], [x + cell, y + cell], [x, y + cell], [x, y]]
+            ids.append(len(ids))
+            geometries.append({"type": "Polygon", "coordinates": [square]})
+            if rng.random() < duplicate:
+                # Та же геометрия с другой начальной вершиной, как при повторном push
+                ids.append(len(ids))
+                geometries.append({"type": "Polygon", "coordinates": [square[2:4] + square[:3]]})
+    return ids, geometries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find overlapping and duplicate parcels")
+    parser.add_argument("--status")
+    parser.add_argument("--region-soato")
+    parser.add_argument("--field", choices=("location", "fixed_geojson"), default="location")
+    parser.add_argument("--synthetic", type=int, help="Сетка N×N участков без сети")
+    parser.add_argument("--store", help="Файл geomstore вместо запросов к API")
+    parser.add_argument("--username", default="rool4")
+    parser.add_argument("--password", default="qwerty")
+    args = parser.parse_args()
+
+    if args.store:
+        import geomstore
+        with geomstore.GeometryStore(args.store) as store:
+            report = find_overlaps_store(store)
+    elif args.synthetic:
+        report = find_overlaps(*synthetic(args.synthetic, seed=0))
+    else:
+        client = ApiClient(args.username, args.password)
+        client.login()
+        params = {k: v for k, v in (("status", args.status),
+                                    ("region_soato", args.region_soato)) if v}
+        ids, geometries = [], []
+        for record in iter_records(client.iter_items("/cadastre", params)):
+            geometry = getattr(record, args.field)
+            if geometry:
+                ids.append(record.id)
+                geometries.append(geometry)
+        report = find_overlaps(ids, geometries)
+
+    timings = ", ".join(f"{k} {v:.2f}s" for k, v in report.elapsed.items())
+    print(f"✓ {report.records} parcels, {report.candidates} bbox candidates ({timings})")
+    if report.skipped:
+        print(f"⚠ Skipped {report.skipped} records with unparseable geometry")
+    print(f"{'✗' if report.duplicates else '✓'} {len(report.duplicates)} duplicate groups")
+    for group in report.duplicates[:20]:
+        print(f"  IDs {', '.join(map(str, group))}")
+    print(f"{'✗' if report.overlaps else '✓'} {len(report.overlaps)} overlapping pairs")
+    for a, b in report.overlaps[:20]:
+        print(f"  ID {a} ↔ ID {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from accounts import PRINCIPALS
+from apiclient import ApiClient
+from perfstats import LatencyStats, bar_chart, throughput
+from records import canonical, item_id
+from userbench import check_toggles
+from userpool import user_payload
+
+
+# Во сколько раз p50 под нагрузкой может превышать последовательный p50,
+# прежде чем считать блокировку строки узким местом
+CONTENTION_LIMIT = 3.0
+
+
+def _normalize(body) -> Dict:
+    return {canonical(k): v for k, v in body.items()} if isinstance(body, dict) else {}
+
+
+def _body(response) -> Dict:
+    try:
+        return _normalize(response.json())
+    except ValueError:
+        return {}
+
+
+@dataclass
+class Target:
+    """Эндпоинт, меняющий состояние одного ресурса.
+
+    toggle=True — относительная операция (каждый вызов инвертирует state[0]);
+    иначе payload(i) задаёт абсолютное значение, и итог должен совпасть
+    с одной из записей целиком.
+    """
+    name: str
+    resource: str
+    action: str
+    state: Tuple[str, ...]
+    payload: Optional[Callable[[int], Dict]] = None
+    toggle: bool = False
+
+    def path(self, resource_id: int) -> str:
+        return f"/{self.resource}/{resource_id}/{self.action}"
+
+    def body(self, i: int) -> Optional[Dict]:
+        return self.payload(i) if self.payload else None
+
+    def expected(self, body: Dict) -> Tuple:
+        body = _normalize(body)
+        return tuple(body.get(name) for name in self.state)
+
+
+def _verification(i: int) -> Dict:
+    return {"verified": i % 2 == 0, "comment": f"stress #{i} {datetime.now().isoformat()}"}
+
+
+TARGETS = {
+    "toggle-active": Target("toggle-active", "users", "toggle-active", ("active",), toggle=True),
+    "building-presence": Target("building-presence", "cadastre", "building-presence", ("building_presence",),
+                                lambda i: {"building_presence": i % 2 == 0}),
+    "verification": Target("verification", "cadastre", "verification", ("verified", "comment"), _verification),
+    "agency_verification": Target("agency_verification", "cadastre", "agency_verification",
+                                  ("verified", "comment"), _verification),
+}
+
+
+@dataclass
+class StressResult:
+    target: str
+    concurrency: int
+    applied: int = 0
+    rejected: Dict[int, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    serial: Optional[LatencyStats] = None
+    contended: Optional[LatencyStats] = None
+    initial: Optional[Tuple] = None
+    final: Optional[Tuple] = None
+    consistent: Optional[bool] = None
+    problems: List[str] = field(default_factory=list)
+
+    @property
+    def ops_per_s(self) -> float:
+        return throughput(self.applied, self.elapsed)
+
+    @property
+    def contention_factor(self) -> Optional[float]:
+        if not self.serial or not self.serial.count or not self.contended.count:
+            return None
+        serial_p50 = self.serial.summary()["p50"]
+        return self.contended.summary()["p50"] / serial_p50 if serial_p50 > 0 else None
+
+    def format(self) -> str:
+        lines = [f"{self.target}: {self.applied}/{self.concurrency} applied in {self.elapsed:.2f}s, "
+                 f"{self.ops_per_s:.1f} ops/s"]
+        if self.serial:
+            lines.append(f"  serial    {self.serial.format()}")
+        lines.append(f"  contended {self.contended.format()}")
+        factor = self.contention_factor
+        if factor is not None:
+            lines.append(f"  contention factor (p50): {factor:.1f}x")
+        if self.rejected:
+            lines.append(f"  rejected: {self.rejected}")
+        lines.append(f"  state {self.initial} → {self.final}, "
+                     f"{'consistent' if self.consistent else 'unobservable' if self.consistent is None else 'INCONSISTENT'}")
+        lines.extend(f"  ⚠ {problem}" for problem in self.problems)
+        return "\n".join(lines)
+
+
+class StateStress:
+    """K одновременных вызовов эндпоинта против одного ресурса и проверка итога.
+
+    Для переключателей итог должен соответствовать чётности применённых вызовов,
+    а ответы — чередоваться; для абсолютных записей итог должен совпасть с одной
+    записью целиком (без смешения полей разных писателей) и, если ответы несут
+    updated_at, — с последней по времени фиксации.
+    """
+
+    def __init__(self, client: ApiClient, target: Target, resource_id: int):
+        self.client = client
+        self.target = target
+        self.resource_id = resource_id
+
+    def read_state(self) -> Optional[Tuple]:
+        response = self.client.get(f"/{self.target.resource}/{self.resource_id}")
+        if response.status_code != 200:
+            return None
+        body = _body(response)
+        if not all(name in body for name in self.target.state):
+            return None
+        return tuple(body[name] for name in self.target.state)
+
+    def _call(self, i: int, latency: LatencyStats):
+        body = self.target.body(i)
+        start = time.perf_counter()
+        response = self.client.request("PATCH", self.target.path(self.resource_id),
+                                       **({"json": body} if body is not None else {}))
+        latency.add(time.perf_counter() - start)
+        return body, response
+
+    def baseline(self, calls: int) -> LatencyStats:
+        """Те же вызовы последовательно: задержка без конкуренции за строку"""
+        latency = LatencyStats("serial")
+        for i in range(calls):
+            self._call(i, latency)
+        return latency
+
+    def run(self, concurrency: int, serial_calls: int = 0) -> StressResult:
+        result = StressResult(self.target.name, concurrency)
+        if serial_calls:
+            result.serial = self.baseline(serial_calls)
+        result.initial = self.read_state()
+
+        latency = LatencyStats("contended")
+        barrier = threading.Barrier(concurrency)
+
+        def fire(i: int):
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+            return self._call(i, latency)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            responses = list(pool.map(fire, range(concurrency)))
+        result.elapsed = time.perf_counter() - start
+        result.contended = latency
+
+        applied = []
+        for sent, response in responses:
+            if response.status_code in (200, 202):
+                applied.append((sent, _body(response)))
+            else:
+                result.rejected[response.status_code] = result.rejected.get(response.status_code, 0) + 1
+        result.applied = len(applied)
+        result.final = self.read_state()
+        if self.target.toggle:
+            self._check_toggle(result, applied)
+        else:
+            self._check_writes(result, applied)
+        return result
+
+    def _check_toggle(self, result: StressResult, applied: List[Tuple[Optional[Dict], Dict]]):
+        name = self.target.state[0]
+        initial = result.initial[0] if result.initial else None
+        final = result.final[0] if result.final else None
+        outcome = check_toggles(initial, len(applied), [body.get(name) for _, body in applied], final)
+        if outcome["duplicates"]:
+            result.problems.append(f"responses do not alternate: {outcome['duplicates']} duplicate {name} values")
+        if outcome["lost_updates"] > outcome["duplicates"]:
+            result.problems.append(f"{len(applied)} toggles applied, final {name}={final}, "
+                                   f"expected {outcome['expected']}")
+        if initial is not None and final is not None:
+            result.consistent = not outcome["lost_updates"]
+
+    def _check_writes(self, result: StressResult, applied: List[Tuple[Optional[Dict], Dict]]):
+        if result.final is None or not applied:
+            return
+        written = {self.target.expected(sent) for sent, _ in applied}
+        if result.final not in written:
+            result.problems.append(f"final state {result.final} matches no single write (torn update)")
+        stamped = [(body["updated_at"], n) for n, (_, body) in enumerate(applied) if body.get("updated_at")]
+        if len(stamped) == len(applied):
+            last = self.target.expected(applied[max(stamped)[1]][0])
+            if result.final != last:
+                result.problems.append(f"final state {result.final} is not the last committed write {last}")
+        result.consistent = not result.problems
+
+    def restore(self, state: Optional[Tuple]):
+        """Возврат исходного значения после стресса (для абсолютных записей)"""
+        if state is None:
+            return
+        if self.target.toggle:
+            if self.read_state() != state:
+                self.client.request("PATCH", self.target.path(self.resource_id))
+            return
+        body = dict(self.target.body(0))
+        for key in body:
+            if canonical(key) in self.target.state:
+                body[key] = state[self.target.state.index(canonical(key))]
+        self.client.request("PATCH", self.target.path(self.resource_id), json=body)
+
+
+def first_item(client: ApiClient, resource: str) -> Optional[int]:
+    response = client.get(f"/{resource}", params={"page_size": 1})
+    assert response.status_code == 200, f"List failed: {response.text}"
+    items = response.json().get("data") or []
+    return item_id(items[0]) if items else None
+
+
+# Кто может вызывать эндпоинт (как в тестах ролей)
+CREDENTIALS = {
+    "toggle-active": PRINCIPALS["root"],
+    "building-presence": PRINCIPALS["rool1"],
+    "verification": PRINCIPALS["rool2"],
+    "agency_verification": PRINCIPALS["rool3"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency stress for state-changing endpoints")
+    parser.add_argument("--target", action="append", choices=tuple(TARGETS),
+                        help="По умолчанию все эндпоинты")
+    parser.add_argument("--concurrency", default="2,8,32", help="Уровни K через запятую")
+    parser.add_argument("--serial", type=int, default=5, help="Последовательных вызовов для базовой задержки")
+    parser.add_argument("--resource-id", type=int, help="ID ресурса; по умолчанию первый из списка")
+    parser.add_argument("--keep", action="store_true", help="Не возвращать исходное состояние")
+    args = parser.parse_args()
+    levels = [int(k) for k in args.concurrency.split(",")]
+
+    for name in args.target or TARGETS:
+        target = TARGETS[name]
+        client = ApiClient(*CREDENTIALS[name])
+        client.login()
+        disposable = None
+        if target.resource == "users":
+            # Переключаем только созданного для стресса пользователя, не существующих
+            response = client.post("/users", user_payload("cadastre_integration", prefix="testuser"))
+            assert response.status_code == 201, f"User creation failed: {response.text}"
+            resource_id = disposable = response.json()["user"]["ID"]
+        else:
+            resource_id = args.resource_id or first_item(client, target.resource)
+        if not resource_id:
+            print(f"⚠ {name}: no {target.resource} to stress")
+            continue
+
+        stress = StateStress(client, target, resource_id)
+        original = stress.read_state()
+        print(f"\n✓ {name} on /{target.resource}/{resource_id}")
+        results = []
+        for k in levels:
+            result = stress.run(k, serial_calls=args.serial if not results else 0)
+            if results:
+                result.serial = results[0].serial
+            results.append(result)
+            print(result.format())
+        if disposable:
+            client.delete(f"/users/{disposable}")
+        elif not args.keep:
+            stress.restore(original)
+
+        print(f"\n{name} p99 latency (ms) by K:")
+        print(bar_chart([(str(r.concurrency), r.contended.summary()["p99"] * 1000) for r in results], unit="ms"))
+        worst = max((r.contention_factor or 0) for r in results)
+        if worst > CONTENTION_LIMIT:
+            print(f"⚠ {name}: p50 grows {worst:.1f}x under contention — row locking is a bottleneck")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from jsonstream import ListStream
+
+
+BODY = (b'{"meta":{"total":7,"page":1},"data":[12.5,3,-0.25,1e5,2E-3,true,null,'
+        b'{"id":10,"area":1234.5678},"\\u0442\\u0435\\u0441\\u0442",[1,2.75]],"tail":-17}')
+
+
+def chunked(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", range(1, 9))
+def test_every_chunk_size(size):
+    expected = json.loads(BODY)
+    stream = ListStream(chunked(BODY, size))
+    assert list(stream) == expected["data"]
+    assert stream.meta == {"meta": expected["meta"], "tail": -17}
+    assert stream.items_seen == len(expected["data"])
+    assert stream.bytes_read == len(BODY)
+
+
+@pytest.mark.parametrize("size", range(1, 9))
+def test_numbers_split_at_chunk_boundary(size):
+    body = b'{"data":[12.5,3,1e5,-7,0.125]}'
+    assert list(ListStream(chunked(body, size))) == [12.5, 3, 1e5, -7, 0.125]
+
+
+def test_multibyte_utf8_split():
+    body = '{"data":["кадастр"]}'.encode()
+    assert list(ListStream(chunked(body, 1))) == ["кадастр"]
+
+
+def test_empty_and_truncated():
+    assert list(ListStream([b'{"data":[]}'])) == []
+    with pytest.raises(ValueError):
+        list(ListStream(chunked(b'{"data":[1,2', 3)))
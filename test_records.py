@@ -0,0 +1,77 @@
+from records import MAX_SHAPES, CadastreRecord, PageMeta, Record, UserRecord, canonical, item_id, page
+
+
+def test_canonical_snake_case():
+    assert canonical("ID") == "id"
+    assert canonical("CadastreID") == "cadastre_id"
+    assert canonical("uidSPUnit") == "uid_sp_unit"
+    assert canonical("RegionSOATO") == "region_soato"
+    assert canonical("firstName") == "first_name"
+    assert canonical("already_snake") == "already_snake"
+
+
+def test_canonical_aliases():
+    assert canonical("GovernorDecision") == "governor_decree"
+    assert canonical("cadastral_number") == "cadastre_id"
+
+
+def test_from_dict_fills_known_fields_and_extra():
+    record = CadastreRecord.from_dict({"ID": 7, "Status": "edit", "SomethingNew": 1})
+    assert record.id == 7
+    assert record.status == "edit"
+    assert record.address is None
+    assert record.something_new == 1
+    assert record.to_dict() == {"id": 7, "status": "edit", "something_new": 1}
+
+
+def test_unknown_field_raises():
+    record = UserRecord.from_dict({"ID": 1})
+    try:
+        record.no_such_field
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("AttributeError expected")
+
+
+def test_alias_merge_takes_first_non_empty():
+    record = CadastreRecord.from_dict({"GovernorDecree": "", "GovernorDecision": "/f.pdf"})
+    assert record.governor_decree == "/f.pdf"
+    record = CadastreRecord.from_dict({"GovernorDecree": None, "GovernorDecision": "/f.pdf"})
+    assert record.governor_decree == "/f.pdf"
+    record = CadastreRecord.from_dict({"GovernorDecree": "/a.pdf", "GovernorDecision": "/b.pdf"})
+    assert record.governor_decree == "/a.pdf"
+
+
+def test_duplicate_key_spellings_merge():
+    record = CadastreRecord.from_dict({"Screenshot": "", "screenshot": "/s.png"})
+    assert record.screenshot == "/s.png"
+
+
+def test_shapes_are_compiled_once_per_key_set():
+    class Small(Record):
+        FIELDS = ("id", "name")
+        __slots__ = FIELDS
+
+    Small.from_dict({"ID": 1, "Name": "a"})
+    Small.from_dict({"ID": 2, "Name": "b"})
+    Small.from_dict({"id": 3})
+    assert len(Small._plans) == 2
+    for i in range(MAX_SHAPES + 1):
+        Small.from_dict({f"k{i}": i})
+    assert len(Small._plans) <= MAX_SHAPES
+
+
+def test_get_uses_canonical_name_and_default():
+    record = UserRecord.from_dict({"FirstName": "Auto", "Active": False})
+    assert record.get("firstName") == "Auto"
+    assert record.get("Active") is False
+    assert record.get("position", "-") == "-"
+
+
+def test_page_and_item_id():
+    records, meta = page({"data": [{"ID": 1}, {"id": 2}], "meta": {"Total": 2, "TotalPages": 1}})
+    assert [r.id for r in records] == [1, 2]
+    assert isinstance(meta, PageMeta) and meta.total == 2 and meta.total_pages == 1
+    assert item_id({"ID": 0, "id": 5}) == 0
+    assert item_id({"id": 5}) == 5
@@ -2,6 +2,8 @@ import requests
 import pytest
 from datetime import datetime
 
+import apiclient
+
 BASE_URL = "https://etirof.cmspace.uz/api"
 LOGIN_URL = f"{BASE_URL}/auth/login"
 USER = {"username": "rool3", "password": "qwerty"}
@@ -19,8 +21,8 @@ def headers():
     return {"Authorization": f"Bearer {token}"}
 
 def _get_first_cadastre(headers):
-    """Возвращает первый кадастр из списка"""
-    resp = requests.get(f"{BASE_URL}/cadastre", headers=headers)
+    """Возвращает первый кадастр из списка (одинаковые одновременные вызовы склеиваются)"""
+    resp = apiclient.get(f"{BASE_URL}/cadastre", headers=headers)
     assert resp.status_code == 200, f"Ошибка списка: {resp.text}"
     data = resp.json().get("data", [])
     assert data, "Нет кадастров в списке"
@@ -0,0 +1,196 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from apiclient import ApiClient, UserApiClient
+from perfstats import LatencyStats, bar_chart, percentile, throughput
+from userpool import user_payload
+
+
+STEPS = ("create", "get", "update", "toggle_active", "delete")
+# Во сколько раз p50 создания в последней четверти может превышать первую
+CREATE_SLOWDOWN_LIMIT = 1.5
+
+
+class LifecycleBenchmark:
+    """Полный цикл UserApiClient в N потоков: create → get → update → toggle_active → delete.
+
+    Кроме задержек по шагам отслеживает рост времени создания по ходу прогона
+    (проверка уникальности username на растущей таблице) и ошибки шагов.
+    """
+
+    def __init__(self, client: UserApiClient, role: str = "cadastre_integration"):
+        self.client = client
+        self.role = role
+        self.latency = {step: LatencyStats(step) for step in STEPS}
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+        self.creates: List[tuple] = []
+        self.leaked: List[int] = []
+        self._order = 0
+        self._lock = threading.Lock()
+
+    def _step(self, step: str, call, expected=(200,)):
+        start = time.perf_counter()
+        response = call()
+        elapsed = time.perf_counter() - start
+        self.latency[step].add(elapsed)
+        if response.status_code not in expected:
+            with self._lock:
+                self.errors[step] += 1
+            return None, elapsed
+        return response, elapsed
+
+    def lifecycle(self, _=None) -> bool:
+        client = self.client
+        response, elapsed = self._step(
+            "create", lambda: client.create_user(user_payload(self.role, prefix="testuser")), (201,))
+        with self._lock:
+            self._order += 1
+            self.creates.append((self._order, elapsed))
+        if response is None:
+            return False
+        user_id = response.json()["user"]["ID"]
+
+        ok = self._step("get", lambda: client.get_user(user_id))[0] is not None
+        ok &= self._step("update", lambda: client.update_user(user_id, {"position": "bench"}))[0] is not None
+        ok &= self._step("toggle_active", lambda: client.toggle_active(user_id))[0] is not None
+        if self._step("delete", lambda: client.delete_user(user_id))[0] is None:
+            with self._lock:
+                self.leaked.append(user_id)
+            return False
+        return ok
+
+    def run(self, workers: int, cycles: int) -> Dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            completed = sum(pool.map(self.lifecycle, range(cycles)))
+        elapsed = time.perf_counter() - start
+        requests = sum(stats.count for stats in self.latency.values())
+        return {
+            "workers": workers,
+            "cycles": cycles,
+            "completed": completed,
+            "elapsed": elapsed,
+            "cycles_per_s": throughput(completed, elapsed),
+            "requests_per_s": throughput(requests, elapsed),
+            "create_slowdown": self.create_slowdown(),
+            "errors": dict(self.errors),
+            "leaked": list(self.leaked),
+        }
+
+    def create_quartiles(self) -> List[float]:
+        """p50 задержки создания по четвертям прогона (в порядке завершения)"""
+        samples = [elapsed for _, elapsed in sorted(self.creates)]
+        if len(samples) < 4:
+            return []
+        size = len(samples) // 4
+        return [percentile(samples[i * size:(i + 1) * size if i < 3 else None], 50) for i in range(4)]
+
+    def create_slowdown(self) -> Optional[float]:
+        quartiles = self.create_quartiles()
+        return quartiles[-1] / quartiles[0] if quartiles and quartiles[0] > 0 else None
+
+
+def toggle_race(client: UserApiClient, workers: int, toggles: int,
+                role: str = "cadastre_integration") -> Dict:
+    """Одновременные toggle-active одного пользователя: поиск потерянных обновлений.
+
+    При последовательном применении ответы чередуются, поэтому число ответов
+    active=False и active=True отличается не больше чем на один, а итоговое
+    значение равно исходному при чётном числе переключений.
+    """
+    response = client.create_user(user_payload(role, prefix="testuser"))
+    assert response.status_code == 201, f"User creation failed: {response.text}"
+    user = response.json()["user"]
+    initial = user["active"]
+    try:
+        barrier = threading.Barrier(min(workers, toggles))
+
+        def toggle(_):
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+            return client.toggle_active(user["ID"])
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            responses = list(pool.map(toggle, range(toggles)))
+        seen = [r.json().get("active") for r in responses if r.status_code == 200]
+        final = client.get_user(user["ID"]).json().get("active")
+    finally:
+        client.delete_user(user["ID"])
+
+    return dict(check_toggles(initial, len(seen), seen, final), toggles=toggles, initial=initial, final=final)
+
+
+def check_toggles(initial: Optional[bool], applied: int, seen: List[Optional[bool]],
+                  final: Optional[bool]) -> Dict:
+    """Проверка серии переключателей: чередование ответов и чётность итога.
+
+    seen — значения из ответов применённых вызовов. При последовательном
+    применении True и False встречаются поровну (±1), а итог равен исходному
+    при чётном числе переключений. initial/final None — итог не проверяется.
+    """
+    # Значения, которые при последовательном применении встретились бы (applied // 2 или +1) раз
+    seen = [value for value in seen if value is not None]
+    duplicates = max(0, abs(seen.count(True) - seen.count(False)) - 1)
+    expected = None
+    if initial is not None:
+        expected = (not initial) if applied % 2 == 1 else initial
+    final_wrong = expected is not None and final is not None and final != expected
+    return {
+        "applied": applied,
+        "expected": expected,
+        "duplicates": duplicates,
+        "lost_updates": duplicates + final_wrong,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User CRUD lifecycle throughput and contention benchmark")
+    parser.add_argument("--workers", default="1,4,8,16", help="Уровни параллелизма через запятую")
+    parser.add_argument("--cycles", type=int, default=40, help="Циклов на каждый уровень")
+    parser.add_argument("--toggles", type=int, default=20)
+    parser.add_argument("--role", default="cadastre_integration")
+    parser.add_argument("--username", default="root")
+    parser.add_argument("--password", default="root")
+    args = parser.parse_args()
+    levels = [int(w) for w in args.workers.split(",")]
+
+    root = ApiClient(args.username, args.password)
+    client = UserApiClient(root.login())
+
+    results = []
+    for workers in levels:
+        bench = LifecycleBenchmark(client, args.role)
+        result = bench.run(workers, args.cycles)
+        results.append(result)
+        print(f"\n✓ {workers} workers: {result['completed']}/{args.cycles} cycles in {result['elapsed']:.2f}s, "
+              f"{result['cycles_per_s']:.2f} cycles/s, {result['requests_per_s']:.1f} req/s")
+        for step in STEPS:
+            print(f"  {bench.latency[step].format()}")
+        quartiles = bench.create_quartiles()
+        if quartiles:
+            print("  create p50 by quartile: " + ", ".join(f"{q * 1000:.0f}ms" for q in quartiles))
+        slowdown = result["create_slowdown"]
+        if slowdown and slowdown > CREATE_SLOWDOWN_LIMIT:
+            print(f"⚠ create slowed {slowdown:.1f}x over the run (username uniqueness check on a growing table?)")
+        if any(result["errors"].values()):
+            print(f"⚠ errors by step: {result['errors']}")
+        if result["leaked"]:
+            print(f"⚠ not deleted: {result['leaked']}")
+
+    print("\nLifecycles per second by worker count:")
+    print(bar_chart([(str(r["workers"]), r["cycles_per_s"]) for r in results], unit="/s"))
+
+    race = toggle_race(client, max(levels), args.toggles, args.role)
+    print(f"\n✓ toggle-active race: {race['applied']}/{race['toggles']} applied, "
+          f"active {race['initial']} → {race['final']} (expected {race['expected']})")
+    if race["lost_updates"]:
+        print(f"⚠ {race['lost_updates']} lost toggle-active updates under concurrency")
+
+
+if __name__ == "__main__":
+    main()
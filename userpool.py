@@ -0,0 +1,186 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from apiclient import ApiClient
+
+
+PASSWORD = "Test123@"
+
+# Сколько пользователей каждой роли создавать при старте сессии
+POOL_ROLES = {"cadastre_integration": 4}
+# Сколько пользователей досоздавать разом, когда свободных нет
+BATCH_SIZE = 4
+WORKERS = 8
+# Сколько lease() ждёт сброса возвращённого пользователя, прежде чем создать нового
+RESET_TIMEOUT = 30.0
+
+
+def user_payload(role: str, prefix: str = "pool", **overrides) -> Dict:
+    """Payload создания пользователя с уникальным username"""
+    payload = {
+        "username": f"{prefix}_{uuid.uuid4().hex[:10]}",
+        "password": PASSWORD,
+        "firstName": "Auto",
+        "middleName": "QA",
+        "lastName": "Bot",
+        "position": "tester",
+        "active": True,
+        "role": role,
+        "randomizerIndex": 1,
+    }
+    payload.update(overrides)
+    return payload
+
+
+def baseline(user: Dict) -> Dict:
+    """Поля, к которым пользователь возвращается перед следующей выдачей"""
+    return {
+        "firstName": "Auto",
+        "middleName": "QA",
+        "lastName": "Bot",
+        "position": "tester",
+        "role": user["role"],
+        "password": PASSWORD,
+    }
+
+
+class UserPool:
+    """Пул заранее созданных пользователей, которых тесты берут в аренду.
+
+    Пользователи создаются параллельно; после возврата состояние
+    сбрасывается (PUT базовых полей, при необходимости toggle-active)
+    в фоне, и пользователь снова попадает в пул. Удаляются все разом в close().
+    """
+
+    def __init__(self, client: ApiClient, roles: Optional[Dict[str, int]] = None,
+                 batch_size: int = BATCH_SIZE, workers: int = WORKERS):
+        self.client = client
+        self.roles = dict(POOL_ROLES if roles is None else roles)
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.idle: Dict[str, List[Dict]] = defaultdict(list)
+        self.owned: Dict[int, Dict] = {}
+        self.resetting: Dict[str, int] = defaultdict(int)
+        self.stats = {"created": 0, "leases": 0, "resets": 0, "replaced": 0}
+        self._cond = threading.Condition()
+
+    def create(self, payload: Dict) -> Dict:
+        response = self.client.post("/users", payload)
+        assert response.status_code == 201, f"User creation failed: {response.text}"
+        user = response.json()["user"]
+        with self._cond:
+            self.owned[user["ID"]] = user
+            self.stats["created"] += 1
+        return user
+
+    def create_many(self, payloads: Iterable[Dict]) -> List[Dict]:
+        """Параллельное создание; пользователи принадлежат пулу и удаляются в close()"""
+        return list(self.executor.map(self.create, payloads))
+
+    def provision(self) -> float:
+        start = time.perf_counter()
+        payloads = [user_payload(role) for role, count in self.roles.items() for _ in range(count)]
+        users = self.create_many(payloads)
+        with self._cond:
+            for user in users:
+                self.idle[user["role"]].append(user)
+        return time.perf_counter() - start
+
+    def lease(self, role: str = "cadastre_integration") -> Dict:
+        deadline = time.monotonic() + RESET_TIMEOUT
+        with self._cond:
+            while not self.idle[role] and self.resetting[role]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Сброс завис — не ждём дальше, а создаём новых пользователей
+                    break
+                self._cond.wait(remaining)
+            if self.idle[role]:
+                self.stats["leases"] += 1
+                return dict(self.idle[role].pop())
+
+        users = self.create_many(user_payload(role) for _ in range(self.batch_size))
+        with self._cond:
+            self.idle[role].extend(users[1:])
+            self.stats["leases"] += 1
+        return dict(users[0])
+
+    def release(self, user: Dict):
+        """Возврат после теста: сброс состояния в фоне"""
+        with self._cond:
+            self.resetting[user["role"]] += 1
+        self.executor.submit(self._reset, self.owned.get(user["ID"], user))
+
+    @contextmanager
+    def leased(self, role: str = "cadastre_integration") -> Iterator[Dict]:
+        user = self.lease(role)
+        try:
+            yield user
+        finally:
+            self.release(user)
+
+    def _restore(self, user: Dict) -> Optional[Dict]:
+        """PUT базовых полей и при необходимости toggle-active; None — сбросить не удалось"""
+        response = self.client.put(f"/users/{user['ID']}", baseline(user))
+        if response.status_code != 200:
+            return None
+        fresh = response.json()
+        if fresh.get("active") is not True:
+            toggled = self.client.request("PATCH", f"/users/{user['ID']}/toggle-active")
+            fresh = toggled.json() if toggled.status_code == 200 else None
+        if fresh is None or fresh.get("active") is not True:
+            return None
+        # В ответе может не быть ID — берём из исходной записи
+        return dict(user, **fresh)
+
+    def _reset(self, user: Dict):
+        role = user["role"]
+        fresh, replaced = None, False
+        try:
+            try:
+                fresh = self._restore(user)
+            except Exception:
+                fresh = None
+            if fresh is None:
+                # Сбросить не удалось — заменяем новым пользователем
+                replaced = True
+                self._try_delete(user["ID"])
+                fresh = self.create(user_payload(role))
+        except Exception:
+            fresh = None
+        finally:
+            # Всегда снимаем счётчик и будим ждущих в lease(), даже если замена не удалась
+            with self._cond:
+                self.resetting[role] -= 1
+                self.stats["replaced" if replaced else "resets"] += 1
+                if fresh is not None:
+                    self.owned[fresh["ID"]] = fresh
+                    self.idle[role].append(fresh)
+                self._cond.notify_all()
+
+    def _delete(self, user_id: int):
+        self.client.delete(f"/users/{user_id}")
+        with self._cond:
+            self.owned.pop(user_id, None)
+
+    def _try_delete(self, user_id: int) -> bool:
+        try:
+            self._delete(user_id)
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """Удаление всех пользователей пула; неудачные удаления подберёт cleanup.sweep"""
+        self.executor.shutdown(wait=True)
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            list(pool.map(self._try_delete, list(self.owned)))
+
+    def report(self) -> str:
+        return (f"User pool: {self.stats['created']} created, {self.stats['leases']} leases, "
+                f"{self.stats['resets']} resets, {self.stats['replaced']} replaced")
@@ -2,50 +2,19 @@ import pytest
 import requests
 import random
 import string
-from typing import Dict, Optional
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apiclient import UserApiClient
+from cleanup import CleanupQueue, sweep
+from userbench import LifecycleBenchmark, toggle_race
+from userpool import UserPool
 
 
 BASE_URL = "https://etirof.cmspace.uz/api"
 USERS_ENDPOINT = f"{BASE_URL}/users"
 
 
-class UserApiClient:
-    """Класс для работы с User Management API"""
-    
-    def __init__(self, token: str):
-        self.token = token
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        })
-    
-    def create_user(self, payload: Dict) -> requests.Response:
-        """Создание пользователя"""
-        return self.session.post(USERS_ENDPOINT, json=payload)
-    
-    def get_user(self, user_id: int) -> requests.Response:
-        """Получение пользователя по ID"""
-        return self.session.get(f"{USERS_ENDPOINT}/{user_id}")
-    
-    def update_user(self, user_id: int, payload: Dict) -> requests.Response:
-        """Обновление пользователя"""
-        return self.session.put(f"{USERS_ENDPOINT}/{user_id}", json=payload)
-    
-    def delete_user(self, user_id: int) -> requests.Response:
-        """Удаление пользователя"""
-        return self.session.delete(f"{USERS_ENDPOINT}/{user_id}")
-    
-    def toggle_active(self, user_id: int) -> requests.Response:
-        """Переключение статуса active"""
-        return self.session.patch(f"{USERS_ENDPOINT}/{user_id}/toggle-active")
-    
-    def list_users(self, params: Optional[Dict] = None) -> requests.Response:
-        """Получение списка пользователей"""
-        return self.session.get(USERS_ENDPOINT, params=params)
-
-
 def random_username(prefix: str = "testuser") -> str:
     """Генерация случайного username"""
     return f"{prefix}_{''.join(random.choices(string.ascii_lowercase, k=6))}"
@@ -111,34 +80,55 @@ def test_user_payload():
     }
 
 
+@pytest.fixture(scope="session")
+def cleanup_queue(api_client):
+    """Фоновые удаления созданных тестами сущностей.
+
+    Зачистка брошенных пользователей проходит до конца ещё до пула и тестов,
+    чтобы не пересекаться с пользователями этого прогона.
+    """
+    orphans = sweep(api_client)
+    print(f"\n[Setup] Orphans swept: {orphans['deleted']} of {orphans['found']} in {orphans['elapsed']:.2f}s")
+    queue = CleanupQueue(api_client)
+    yield queue
+    failed = queue.close()
+    print(f"\n[Teardown] {queue.report()}")
+    for endpoint, status in failed:
+        print(f"⚠ Cleanup of {endpoint} failed: {status}")
+
+
 @pytest.fixture
-def created_user(api_client, test_user_payload):
-    """Создание тестового пользователя с автоматической очисткой"""
-    print(f"\n[Setup] Creating test user: {test_user_payload['username']}")
-    
-    resp = api_client.create_user(test_user_payload)
-    assert resp.status_code == 201, f"User creation failed: {resp.text}"
-    
-    user = resp.json().get("user")
-    assert user, "User not found in response"
-    
-    print(f"✓ Test user created: ID={user['ID']}, username={user['username']}")
-    
-    yield user
-    
-    print(f"\n[Teardown] Deleting test user: ID={user['ID']}")
-    delete_resp = api_client.delete_user(user['ID'])
-    
-    if delete_resp.status_code == 200:
-        print(f"✓ Test user deleted: ID={user['ID']}")
-    else:
-        print(f"⚠ Failed to delete test user: {delete_resp.status_code}")
+def cleanup(cleanup_queue):
+    """ID пользователей, созданных тестом: удаляются в фоне после теста, даже если он упал"""
+    user_ids = []
+    yield user_ids
+    for user_id in user_ids:
+        cleanup_queue.delete_user(user_id)
+
+
+@pytest.fixture(scope="session")
+def user_pool(api_client, cleanup_queue):
+    """Пул заранее созданных пользователей: создаются параллельно, после теста сбрасываются"""
+    pool = UserPool(api_client)
+    elapsed = pool.provision()
+    print(f"\n[Setup] User pool provisioned in {elapsed:.2f}s")
+    yield pool
+    pool.close()
+    print(f"\n[Teardown] {pool.report()}")
+
+
+@pytest.fixture
+def created_user(user_pool):
+    """Тестовый пользователь из пула; после теста его состояние сбрасывается"""
+    with user_pool.leased() as user:
+        print(f"\n[Setup] Leased test user: ID={user['ID']}, username={user['username']}")
+        yield user
 
 
 class TestUserCreation:
     """Тесты создания пользователей"""
     
-    def test_01_create_user_basic(self, api_client, test_user_payload):
+    def test_01_create_user_basic(self, api_client, test_user_payload, cleanup):
         """Базовое создание пользователя"""
         resp = api_client.create_user(test_user_payload)
         
@@ -147,6 +137,7 @@ class TestUserCreation:
         
         assert "user" in data
         user = data["user"]
+        cleanup.append(user["ID"])
         
         assert user["username"] == test_user_payload["username"]
         assert user["firstName"] == test_user_payload["firstName"]
@@ -156,10 +147,8 @@ class TestUserCreation:
         assert "ID" in user
         
         print(f"✓ User created successfully: {user['username']} (ID: {user['ID']})")
-        
-        api_client.delete_user(user["ID"])
     
-    def test_02_create_user_all_roles(self, api_client):
+    def test_02_create_user_all_roles(self, api_client, cleanup):
         """Создание пользователей с различными ролями"""
         roles = [
             "geometry_fix",
@@ -170,36 +159,33 @@ class TestUserCreation:
             "admin"
         ]
         
-        created_users = []
+        payloads = [{
+            "username": random_username(f"role_{role}"),
+            "password": "Test123@",
+            "firstName": role.title(),
+            "lastName": "Test",
+            "position": f"{role}_tester",
+            "active": True,
+            "role": role,
+            "randomizerIndex": 1
+        } for role in roles]
         
-        for role in roles:
-            payload = {
-                "username": random_username(f"role_{role}"),
-                "password": "Test123@",
-                "firstName": role.title(),
-                "lastName": "Test",
-                "position": f"{role}_tester",
-                "active": True,
-                "role": role,
-                "randomizerIndex": 1
-            }
-            
-            resp = api_client.create_user(payload)
-            
-            if resp.status_code == 201:
-                user = resp.json()["user"]
-                created_users.append(user["ID"])
-                assert user["role"] == role
-                print(f"✓ Created user with role '{role}': ID={user['ID']}")
-            else:
-                print(f"⚠ Failed to create user with role '{role}': {resp.status_code}")
+        created_users = []
         
-        for user_id in created_users:
-            api_client.delete_user(user_id)
+        with ThreadPoolExecutor(max_workers=len(roles)) as pool:
+            for role, resp in zip(roles, pool.map(api_client.create_user, payloads)):
+                if resp.status_code == 201:
+                    user = resp.json()["user"]
+                    created_users.append(user["ID"])
+                    cleanup.append(user["ID"])
+                    assert user["role"] == role
+                    print(f"✓ Created user with role '{role}': ID={user['ID']}")
+                else:
+                    print(f"⚠ Failed to create user with role '{role}': {resp.status_code}")
         
         assert len(created_users) > 0, "No users were created"
     
-    def test_03_create_user_inactive(self, api_client):
+    def test_03_create_user_inactive(self, api_client, cleanup):
         """Создание неактивного пользователя"""
         payload = {
             "username": random_username("inactive"),
@@ -216,11 +202,10 @@ class TestUserCreation:
         
         assert resp.status_code == 201
         user = resp.json()["user"]
+        cleanup.append(user["ID"])
         
         assert user["active"] is False
         print(f"✓ Inactive user created: {user['username']}")
-        
-        api_client.delete_user(user["ID"])
     
     def test_04_create_user_duplicate_username(self, api_client, created_user):
         """Попытка создания пользователя с существующим username"""
@@ -469,12 +454,13 @@ class TestUserStatusToggle:
 class TestUserDeletion:
     """Тесты удаления пользователей"""
     
-    def test_01_delete_user(self, api_client, test_user_payload):
+    def test_01_delete_user(self, api_client, test_user_payload, cleanup):
         """Удаление пользователя"""
         create_resp = api_client.create_user(test_user_payload)
         assert create_resp.status_code == 201
         user = create_resp.json()["user"]
         user_id = user["ID"]
+        cleanup.append(user_id)
         
         delete_resp = api_client.delete_user(user_id)
         
@@ -492,11 +478,12 @@ class TestUserDeletion:
         assert resp.status_code in [404, 200]  
         print(f"✓ Delete nonexistent user: {resp.status_code}")
     
-    def test_03_delete_then_recreate(self, api_client, test_user_payload):
+    def test_03_delete_then_recreate(self, api_client, test_user_payload, cleanup):
         """Удаление и повторное создание пользователя с тем же username"""
         create_resp1 = api_client.create_user(test_user_payload)
         assert create_resp1.status_code == 201
         user1 = create_resp1.json()["user"]
+        cleanup.append(user1["ID"])
         
         delete_resp = api_client.delete_user(user1["ID"])
         assert delete_resp.status_code == 200
@@ -508,7 +495,7 @@ class TestUserDeletion:
         if create_resp2.status_code == 201:
             user2 = create_resp2.json()["user"]
             print(f"✓ User recreated with same username: {user2['username']}")
-            api_client.delete_user(user2["ID"])
+            cleanup.append(user2["ID"])
         else:
             print(f"⚠ Recreate failed: {create_resp2.status_code}")
             assert create_resp2.status_code in [201, 400, 409]
@@ -572,7 +559,7 @@ class TestUserPermissions:
 class TestEdgeCases:
     """Тесты граничных случаев"""
     
-    def test_01_create_user_very_long_username(self, api_client):
+    def test_01_create_user_very_long_username(self, api_client, cleanup):
         """Создание пользователя с очень длинным username"""
         payload = {
             "username": "a" * 100,  
@@ -590,11 +577,11 @@ class TestEdgeCases:
         
         if resp.status_code == 201:
             user = resp.json()["user"]
-            api_client.delete_user(user["ID"])
+            cleanup.append(user["ID"])
         
         assert resp.status_code in [201, 400, 422]
     
-    def test_02_create_user_special_characters(self, api_client):
+    def test_02_create_user_special_characters(self, api_client, cleanup):
         """Создание пользователя со спецсимволами в полях"""
         payload = {
             "username": random_username(),
@@ -613,7 +600,7 @@ class TestEdgeCases:
         if resp.status_code == 201:
             user = resp.json()["user"]
             print(f"✓ Special characters accepted: {user['firstName']} {user['lastName']}")
-            api_client.delete_user(user["ID"])
+            cleanup.append(user["ID"])
         else:
             print(f"⚠ Special characters rejected: {resp.status_code}")
         
@@ -644,21 +631,42 @@ class TestPerformance:
         
         print(f"✓ List users response time: {elapsed_time:.2f}s")
     
-    def test_02_create_user_response_time(self, api_client, test_user_payload):
+    def test_02_create_user_response_time(self, api_client, test_user_payload, cleanup):
         """Проверка времени создания пользователя"""
         start_time = time.time()
         resp = api_client.create_user(test_user_payload)
         elapsed_time = time.time() - start_time
         
         assert resp.status_code == 201
+        cleanup.append(resp.json()["user"]["ID"])
         assert elapsed_time < 3.0, f"Creation too slow: {elapsed_time}s"
         
         print(f"✓ Create user response time: {elapsed_time:.2f}s")
-        
-        if resp.status_code == 201:
-            user = resp.json()["user"]
-            api_client.delete_user(user["ID"])
-
+    
+    def test_03_concurrent_crud_lifecycle(self, api_client):
+        """Полный цикл create → get → update → toggle → delete в несколько потоков"""
+        bench = LifecycleBenchmark(api_client)
+        result = bench.run(workers=4, cycles=8)
+        
+        for step in bench.latency.values():
+            print(f"  {step.format()}")
+        print(f"✓ {result['cycles_per_s']:.2f} cycles/s, {result['requests_per_s']:.1f} req/s")
+        
+        assert not any(result["errors"].values()), f"Lifecycle errors: {result['errors']}"
+        assert not result["leaked"], f"Users not deleted: {result['leaked']}"
+    
+    @pytest.mark.xfail(raises=AssertionError, strict=False,
+                       reason="toggle-active may lose updates under concurrency (read-modify-write race)")
+    def test_04_concurrent_toggle_active_race(self, api_client):
+        """Одновременные toggle-active одного пользователя: XFAIL — гонка есть, XPASS — обновления не теряются"""
+        race = toggle_race(api_client, workers=8, toggles=8)
+        
+        print(f"✓ Toggle race: {race['applied']}/{race['toggles']} applied, "
+              f"active {race['initial']} → {race['final']}")
+        if race["applied"] != race["toggles"]:
+            # Отказы эндпоинта — настоящая ошибка, не ожидаемая гонка
+            pytest.fail(f"Only {race['applied']}/{race['toggles']} toggles applied: {race}")
+        assert race["lost_updates"] == 0, f"Lost toggle-active updates: {race}"
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-s"])
\ No newline at end of file
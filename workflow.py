@@ -0,0 +1,235 @@
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from accounts import PRINCIPALS
+from apiclient import ApiClient
+from geomgen import fixed_geojson
+from perfstats import LatencyStats, bar_chart, throughput
+from records import CadastreRecord, item_id
+
+
+# Учётные записи ролей, как в модулях тестов ролей
+ROLES = {
+    "geometry_fix": PRINCIPALS["rool1"],
+    "verify": PRINCIPALS["rool2"],
+    "agency": PRINCIPALS["rool3"],
+    "verdict_79": PRINCIPALS["rool4"],
+    "editor": PRINCIPALS["rool5"],
+}
+
+# Защита от циклов модели (ошибка кадастра возвращает запись в edit)
+MAX_STEPS = 16
+
+
+@dataclass(frozen=True)
+class Transition:
+    """Переход модели: из статуса source действием action от роли role в статус target"""
+    source: str
+    action: str
+    role: str
+    payload: Callable[[int], Dict]
+    target: str
+
+
+def _geometry(cadastre_id: int) -> Dict:
+    return {"fixed_geojson": fixed_geojson(16, seed=cadastre_id), "move_distance": 0.0}
+
+
+def _verified(cadastre_id: int) -> Dict:
+    return {"verified": True, "comment": f"workflow {datetime.now().isoformat()}"}
+
+
+def _cadastre_error(cadastre_id: int) -> Dict:
+    return {"error_description": "Ошибка в координатах границ участка (workflow)",
+            "error_type": "geometry_error"}
+
+
+# Основной путь записи по статусам; статусы, для которых перехода нет, — конечные
+WORKFLOW = (
+    Transition("geometry_fix", "geometry-fix", "geometry_fix", _geometry, "verification"),
+    Transition("edit", "edit", "editor", _geometry, "verification"),
+    Transition("verification", "verification", "verify", _verified, "agency_verification"),
+    Transition("agency_verification", "agency_verification", "agency", _verified, "building_presence"),
+    Transition("building_presence", "building-presence", "geometry_fix",
+               lambda _: {"building_presence": True}, "verdict_79"),
+    Transition("verdict_79", "into_moderation", "verdict_79", lambda _: {}, "moderation"),
+)
+# Ответвление: ошибка кадастра вместо модерации
+ERROR_BRANCH = Transition("verdict_79", "cadastre_error", "verdict_79", _cadastre_error, "edit")
+
+
+@dataclass
+class Trace:
+    """Путь одной записи: (статус, секунд в статусе) и итог"""
+    cadastre_id: int
+    stages: List[Tuple[str, float]] = field(default_factory=list)
+    final: Optional[str] = None
+    elapsed: float = 0.0
+    failed: Optional[str] = None
+
+
+class WorkflowDriver:
+    """Прогон многих записей по модели статусов параллельно, каждый переход — клиентом своей роли.
+
+    Фактический статус после перехода берётся из ответа (или GET); расхождение
+    с моделью считается и прогон продолжается по фактическому статусу.
+    """
+
+    def __init__(self, clients: Dict[str, ApiClient], workflow=WORKFLOW,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.clients = clients
+        self.model = {t.source: t for t in workflow}
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.stage = {t.source: LatencyStats(t.source) for t in workflow}
+        self.transition = {}
+        self.end_to_end = LatencyStats("end-to-end")
+        self.deviations: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _next(self, status: str) -> Optional[Transition]:
+        transition = self.model.get(status)
+        if transition and transition.source == ERROR_BRANCH.source and self.error_rate:
+            with self._lock:
+                if self.random.random() < self.error_rate:
+                    return ERROR_BRANCH
+        return transition
+
+    def _status(self, client: ApiClient, cadastre_id: int, response) -> Optional[str]:
+        try:
+            status = CadastreRecord.from_dict(response.json()).status
+        except (ValueError, AttributeError):
+            status = None
+        if status is None:
+            fresh = client.get(f"/cadastre/{cadastre_id}")
+            if fresh.status_code == 200:
+                status = CadastreRecord.from_dict(fresh.json()).status
+        return status
+
+    def _latency(self, transition: Transition) -> LatencyStats:
+        key = f"{transition.source} → {transition.action}"
+        with self._lock:
+            if key not in self.transition:
+                self.transition[key] = LatencyStats(key)
+            return self.transition[key]
+
+    def drive(self, cadastre_id: int, status: str) -> Trace:
+        trace = Trace(cadastre_id)
+        start = entered = time.perf_counter()
+        for _ in range(MAX_STEPS):
+            transition = self._next(status)
+            if transition is None:
+                break
+            client = self.clients[transition.role]
+            with self._latency(transition).measure():
+                response = client.patch(f"/cadastre/{cadastre_id}/{transition.action}",
+                                        transition.payload(cadastre_id))
+            if response.status_code not in (200, 202):
+                trace.failed = f"{transition.action}: {response.status_code}"
+                with self._lock:
+                    self.errors[(transition.source, transition.action, response.status_code)] += 1
+                break
+            actual = self._status(client, cadastre_id, response)
+            now = time.perf_counter()
+            self.stage[status].add(now - entered)
+            trace.stages.append((status, now - entered))
+            entered = now
+            if actual != transition.target:
+                with self._lock:
+                    self.deviations[(status, transition.target, actual)] += 1
+            if actual is None or actual == status:
+                break
+            status = actual
+        trace.final = status
+        trace.elapsed = time.perf_counter() - start
+        if trace.failed is None and status not in self.model:
+            self.end_to_end.add(trace.elapsed)
+        return trace
+
+    def run(self, items: List[Tuple[int, str]], workers: int) -> Dict:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            traces = list(pool.map(lambda item: self.drive(*item), items))
+        elapsed = time.perf_counter() - start
+        completed = [t for t in traces if t.failed is None and t.final not in self.model]
+        transitions = sum(len(t.stages) for t in traces)
+        return {
+            "items": len(items),
+            "completed": len(completed),
+            "failed": sum(1 for t in traces if t.failed),
+            "elapsed": elapsed,
+            "items_per_s": throughput(len(completed), elapsed),
+            "transitions_per_s": throughput(transitions, elapsed),
+            "finals": Counter(t.final for t in traces),
+            "traces": traces,
+        }
+
+
+def select_items(client: ApiClient, statuses, per_status: int) -> List[Tuple[int, str]]:
+    """Записи для прогона: до per_status штук на каждый входной статус модели"""
+    items = []
+    for status in statuses:
+        taken = 0
+        for item in client.iter_items("/cadastre", {"status": status}, page_size=min(per_status, 100)):
+            items.append((item_id(item), status))
+            taken += 1
+            if taken >= per_status:
+                break
+    return items
+
+
+def login_roles(roles=ROLES) -> Dict[str, ApiClient]:
+    clients = {}
+    for role, (username, password) in roles.items():
+        client = ApiClient(username, password)
+        client.login()
+        clients[role] = client
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive cadastre items through the status workflow concurrently")
+    parser.add_argument("--start", action="append", choices=[t.source for t in WORKFLOW],
+                        help="Входные статусы (по умолчанию geometry_fix и edit)")
+    parser.add_argument("--items", type=int, default=10, help="Записей на каждый входной статус")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Доля записей, уходящих из verdict_79 в cadastre_error")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    clients = login_roles()
+    items = select_items(clients["geometry_fix"], args.start or ("geometry_fix", "edit"), args.items)
+    if not items:
+        raise SystemExit("No items in the workflow entry statuses")
+
+    driver = WorkflowDriver(clients, error_rate=args.error_rate, seed=args.seed)
+    result = driver.run(items, args.workers)
+
+    print(f"✓ {result['completed']}/{result['items']} items reached a final status in {result['elapsed']:.2f}s "
+          f"({result['items_per_s']:.2f} items/s, {result['transitions_per_s']:.2f} transitions/s)")
+    print(f"  {driver.end_to_end.format()}")
+    print("  Final statuses: " + ", ".join(f"{s}={n}" for s, n in result["finals"].most_common()))
+    print("\nTime in stage:")
+    for stats in driver.stage.values():
+        if stats.count:
+            print(f"  {stats.format()}")
+    print("\nTransition latency p50 (ms):")
+    print(bar_chart([(name, stats.summary()["p50"] * 1000) for name, stats in driver.transition.items()],
+                    unit="ms"))
+    for (source, expected, actual), count in driver.deviations.most_common():
+        print(f"⚠ model: {source} → expected {expected}, got {actual} ({count}x)")
+    for (source, action, status), count in driver.errors.most_common():
+        print(f"⚠ {action} from {source} returned {status} ({count}x)")
+
+
+if __name__ == "__main__":
+    main()